@@ -0,0 +1,88 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time the Y-fast trie operations that work inside a single subtree at w=64:
+inserts that split subtrees, neighbor queries, and removals that merge subtrees
+
+Values are clustered so many of them land in the same window of representatives,
+which makes subtrees fill up and split, and later empty out and merge, as often as possible
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import YFastTrie
+
+
+def make_workload(values, queries, seed):
+	rng = Random(seed)
+	bases = [rng.getrandbits(64) & ~0xffff for _ in range(max(1, values // 1024))]
+	inserts = list({rng.choice(bases) | rng.getrandbits(16) for _ in range(values)})
+	rng.shuffle(inserts)
+	probes = [rng.choice(bases) | rng.getrandbits(16) for _ in range(queries)]
+	return inserts, probes
+
+
+def run_inserts(t, inserts, probes):
+	for value in inserts:
+		t.insert(value)
+
+	return len(inserts)
+
+
+def run_predecessors(t, inserts, probes):
+	for value in probes:
+		t.predecessor(value)
+
+	return len(probes)
+
+
+def run_successors(t, inserts, probes):
+	for value in probes:
+		t.successor(value)
+
+	return len(probes)
+
+
+def run_removals(t, inserts, probes):
+	for value in inserts:
+		t.remove(value)
+
+	return len(inserts)
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=200000)
+	parser.add_argument("--queries", type=int, default=200000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	inserts, probes = make_workload(args.values, args.queries, args.seed)
+	t = YFastTrie(64)
+
+	print("{:<20} {:>12}".format("", "per op"))
+
+	for (label, runner) in (("insert", run_inserts),
+							("predecessor", run_predecessors),
+							("successor", run_successors),
+							("remove", run_removals)):
+		start = default_timer()
+		ops = runner(t, inserts, probes)
+		finished = default_timer()
+
+		print("{:<20} {:10.2f}us".format(label, (finished - start) / ops * 1e6))
+
+	assert len(t) == 0
+
+
+if __name__ == "__main__":
+	main()
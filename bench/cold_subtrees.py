@@ -0,0 +1,103 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Compare Y-fast tries at w=64 that freeze their cold subtrees against one that doesn't,
+under a skewed workload: most reads and every write go to the newest keys,
+with the occasional read anywhere in the trie
+
+Keys are nanosecond timestamps, so most of the trie is history nobody modifies
+and only the most recent subtrees are hot
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from sys import getsizeof
+from timeit import default_timer
+
+from py_fast_trie import YFastTrie
+
+
+def deep_size(item, seen):
+	if id(item) in seen:
+		return 0
+
+	seen.add(id(item))
+	size = getsizeof(item)
+
+	if isinstance(item, dict):
+		size += sum(deep_size(key, seen) + deep_size(value, seen) for (key, value) in item.items())
+	elif isinstance(item, (list, tuple)):
+		size += sum(deep_size(element, seen) for element in item)
+	elif isinstance(item, (bytes, bytearray)):
+		pass
+	elif hasattr(item, "__dict__"):
+		size += deep_size(vars(item), seen)
+
+	return size
+
+
+def make_timestamps(rng, count):
+	timestamps = []
+	now = rng.getrandbits(60)
+
+	for _ in range(count):
+		now += rng.randrange(1000, 1000000)
+		timestamps.append(now)
+
+	return timestamps
+
+
+def run(t, keys, probes, cold_share, rng):
+	recent = keys[-len(keys) // 100:]
+	now = keys[-1]
+	start = default_timer()
+
+	for probe in probes:
+		if rng.random() < cold_share:
+			t.predecessor(rng.choice(keys))
+		else:
+			t.predecessor(rng.choice(recent))
+
+		now += rng.randrange(1000, 1000000)
+		t.insert(now)
+
+	return (default_timer() - start) / len(probes) * 1e6
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=200000)
+	parser.add_argument("--queries", type=int, default=50000)
+	parser.add_argument("--cold-share", type=float, default=0.05)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	keys = make_timestamps(Random(args.seed), args.values)
+
+	print("{:<24} {:>14} {:>9} {:>13}".format("", "subtrees only", "frozen", "query+insert"))
+
+	for freeze_after in (None, 1000, 10000):
+		t = YFastTrie(64, freeze_after=freeze_after)
+		t.update(keys)
+		per_op = run(t, keys, range(args.queries), args.cold_share, Random(args.seed))
+
+		seen = set()
+		subtrees = sum(deep_size(tree, seen) for tree in t._subtrees.values())
+		frozen = sum(1 for tree in t._subtrees.values() if type(tree).__name__ == "FrozenContainer")
+
+		print("{:<24} {:>12.1f}B/key {:>8.0%} {:>11.2f}us".format(
+			"never frozen" if freeze_after is None else "frozen after {}".format(freeze_after),
+			subtrees / len(t),
+			frozen / len(t._subtrees),
+			per_op))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,113 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Measure how much memory a Y-fast trie at w=64 keeps hold of for keys of different densities:
+sequential identifiers, identifiers with a few gaps, and uniformly random keys
+
+The subtrees pick a container to suit their values, so dense keys should take up
+far less room per key than random ones, which only a sorted array can hold;
+both the whole trie and the subtrees on their own are measured, as the X-fast trie
+of representatives costs the same however the subtrees store their values,
+and keys are made as they are inserted, so any key the trie keeps a reference to counts
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from sys import getsizeof
+from timeit import default_timer
+from tracemalloc import get_traced_memory, start, stop
+
+from py_fast_trie import YFastTrie
+
+
+def make_sequential(rng, count):
+	first = rng.getrandbits(48)
+	return iter(range(first, first + count))
+
+
+def make_gapped(rng, count):
+	value = rng.getrandbits(48)
+
+	for _ in range(count):
+		value += 1 if rng.random() < 0.9 else 2
+		yield value
+
+
+def make_random(rng, count):
+	for _ in range(count):
+		yield rng.getrandbits(64)
+
+
+def deep_size(item, seen):
+	if id(item) in seen:
+		return 0
+
+	seen.add(id(item))
+	size = getsizeof(item)
+
+	if isinstance(item, dict):
+		size += sum(deep_size(key, seen) + deep_size(value, seen) for (key, value) in item.items())
+	elif isinstance(item, (list, tuple)):
+		size += sum(deep_size(element, seen) for element in item)
+	elif hasattr(item, "__dict__"):
+		size += deep_size(vars(item), seen)
+
+	return size
+
+
+def build(keys):
+	t = YFastTrie(64)
+
+	for key in keys:
+		t.insert(key)
+
+	return t
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=200000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	print("{:<12} {:>12} {:>14} {:>11} {:>11}".format("", "bytes/key", "subtrees only", "insert", "successor"))
+
+	for (label, make_keys) in (("sequential", make_sequential),
+							   ("gapped", make_gapped),
+							   ("random", make_random)):
+		start()
+		t = build(make_keys(Random(args.seed), args.values))
+		used, _ = get_traced_memory()
+		stop()
+
+		seen = set()
+		subtrees = sum(deep_size(tree, seen) for tree in t._subtrees.values())
+		del t
+
+		keys = list(make_keys(Random(args.seed), args.values))
+		began = default_timer()
+		t = build(keys)
+		inserted = default_timer()
+
+		for key in keys:
+			t.successor(key)
+
+		queried = default_timer()
+
+		print("{:<12} {:>12.1f} {:>14.1f} {:>9.2f}us {:>9.2f}us".format(
+			label,
+			used / len(keys),
+			subtrees / len(keys),
+			(inserted - began) / len(keys) * 1e6,
+			(queried - inserted) / len(keys) * 1e6))
+
+
+if __name__ == "__main__":
+	main()
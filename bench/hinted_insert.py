@@ -0,0 +1,88 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time building X-fast tries at w=64 one value at a time, with checked and unchecked inserts,
+with and without the last leaf inserted as a hint, and looking up predecessors the same two ways
+
+Values arrive in ascending order, so the last leaf is always next to the new value
+and a hinted insert never searches; each new leaf is still the largest under every one
+of its ancestors, so every insert walks up to the root to repoint them
+"""
+
+from argparse import ArgumentParser
+from gc import collect
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import XFastTrie
+
+
+def insert(values):
+	t = XFastTrie(64)
+
+	for value in values:
+		t.insert(value)
+
+	return t
+
+
+def insert_hinted(values):
+	t = XFastTrie(64)
+
+	for value in values:
+		t.insert(value, hint=t.max_node)
+
+	return t
+
+
+def insert_unchecked(values):
+	t = XFastTrie(64)
+	leaf = None
+
+	for value in values:
+		leaf = t.insert_unchecked(value, leaf)
+
+	return t
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=20000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	# Values climb by small random steps from a random start, like timestamps
+	rng = Random(args.seed)
+	values = [rng.getrandbits(62)]
+
+	for _ in range(args.values - 1):
+		values.append(values[-1] + rng.randint(1, 1000))
+
+	probes = [rng.randint(values[0], values[-1]) for _ in range(args.values)]
+
+	for build in (insert, insert_hinted, insert_unchecked):
+		# Leave the last trie's nodes to be collected before timing the next build
+		t = None
+		collect()
+		began = default_timer()
+		t = build(values)
+		print("{:<20} {:>8.2f}s".format(build.__name__, default_timer() - began))
+
+	for (name, lookup) in (("predecessor", t.predecessor), ("predecessor_unchecked", t.predecessor_unchecked)):
+		began = default_timer()
+
+		for probe in probes:
+			lookup(probe)
+
+		print("{:<20} {:>8.2f}s".format(name, default_timer() - began))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,60 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time single inserts and removals on a Y-fast trie at w=64, with and without a journal
+recording them, for a few sizes of the groups the journal syncs to disk at once
+"""
+
+from argparse import ArgumentParser
+from os.path import join
+from random import Random
+from tempfile import TemporaryDirectory
+from timeit import default_timer
+
+from py_fast_trie import Journal, YFastTrie
+
+
+def run(t, values):
+	start = default_timer()
+
+	for value in values:
+		t.insert(value)
+
+	for value in values:
+		t.remove(value)
+
+	return (default_timer() - start) / (2 * len(values)) * 1e6
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=100000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = Random(args.seed)
+	values = list({rng.getrandbits(64) for _ in range(args.values)})
+	baseline = run(YFastTrie(64), values)
+
+	print("{:<20} {:>12} {:>12}".format("", "per op", "overhead"))
+	print("{:<20} {:10.2f}us".format("no journal", baseline))
+
+	with TemporaryDirectory() as directory:
+		for group_size in (16, 256, 4096):
+			with Journal(join(directory, "{}.journal".format(group_size)), group_size) as journal:
+				per_op = run(YFastTrie(64, journal=journal), values)
+
+			print("{:<20} {:10.2f}us {:10.2f}us".format("group of {}".format(group_size),
+														  per_op,
+														  per_op - baseline))
+
+
+if __name__ == "__main__":
+	main()
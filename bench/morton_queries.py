@@ -0,0 +1,78 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Compare rectangle queries on a Morton index of random points on a 2-D grid
+against walking every key on the Z-order curve between the rectangle's corners
+and filtering out the points outside it
+
+Long, thin rectangles cover the least of the curve between their corners,
+so they should gain the most from jumping back into the rectangle
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import MortonIndex
+
+
+def scan(m, low, high):
+	low_key = m.encode(low)
+	high_key = m.encode(high)
+	key = m._keys.ceiling(low_key)
+
+	while key is not None and key <= high_key:
+		point = m.decode(key)
+
+		if all(l <= c <= h for (l, c, h) in zip(low, point, high)):
+			yield point
+
+		key = m._keys.successor(key)
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--points", type=int, default=100000)
+	parser.add_argument("--queries", type=int, default=200)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = Random(args.seed)
+	side = 2 ** 12
+	m = MortonIndex(24)
+	m.update((rng.randrange(side), rng.randrange(side)) for _ in range(args.points))
+
+	print("{:<12} {:>10} {:>12} {:>12}".format("rectangle", "points", "query", "scan"))
+
+	for (width, height) in ((64, 64), (512, 512), (16, 2048), (2048, 16)):
+		boxes = []
+
+		for _ in range(args.queries):
+			x = rng.randrange(side - width)
+			y = rng.randrange(side - height)
+			boxes.append(((x, y), (x + width - 1, y + height - 1)))
+
+		began = default_timer()
+		found = sum(sum(1 for _ in m.query(low, high)) for (low, high) in boxes)
+		queried = default_timer()
+		scanned = sum(sum(1 for _ in scan(m, low, high)) for (low, high) in boxes)
+		finished = default_timer()
+
+		assert found == scanned
+
+		print("{:<12} {:>10.1f} {:>10.2f}ms {:>10.2f}ms".format(
+			"{}x{}".format(width, height),
+			found / len(boxes),
+			(queried - began) / len(boxes) * 1e3,
+			(finished - queried) / len(boxes) * 1e3))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,57 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time building X-fast and Y-fast tries at w=64 from random keys with a batch update,
+against building them across pools of different numbers of processes
+
+Only laying out nodes and indexing the level tables happens in the pool;
+every node is still created in the building process, which bounds how much faster
+more workers can make a build
+"""
+
+from argparse import ArgumentParser
+from gc import collect
+from os import cpu_count
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import XFastTrie, YFastTrie
+
+
+def time_build(build):
+	# Leave the last trie's nodes to be collected before timing the next build
+	collect()
+	began = default_timer()
+	build()
+	return default_timer() - began
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=100000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = Random(args.seed)
+	keys = [rng.getrandbits(64) for _ in range(args.values)]
+	workers = sorted({1, 2, 4, cpu_count() or 1})
+
+	print("{:<10} {:>10}".format("", "update") + "".join("{:>10}".format("{} workers".format(count))
+														  for count in workers))
+
+	for kind in (XFastTrie, YFastTrie):
+		timings = [time_build(lambda: kind(64).update(keys))]
+		timings.extend(time_build(lambda: kind(64).build_parallel(keys, workers=count)) for count in workers)
+
+		print("{:<10}".format(kind.__name__) + "".join("{:>9.2f}s".format(timing) for timing in timings))
+
+
+if __name__ == "__main__":
+	main()
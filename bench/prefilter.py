@@ -0,0 +1,70 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time membership checks on Y-fast tries at w=64 where most values checked are missing,
+without a prefilter and with prefilters of a few false positive rates,
+one value at a time and in batches
+
+Batches are checked as lists and, if NumPy is installed, as arrays,
+which the prefilter hashes a whole array at a time
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import YFastTrie
+
+try:
+	import numpy
+except ImportError:  # pragma: no cover
+	numpy = None
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=100000)
+	parser.add_argument("--probes", type=int, default=100000)
+	parser.add_argument("--hit-rate", type=float, default=0.1)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = Random(args.seed)
+	keys = [rng.getrandbits(64) for _ in range(args.values)]
+	probes = [rng.choice(keys) if rng.random() < args.hit_rate else rng.getrandbits(64)
+			  for _ in range(args.probes)]
+	batch = numpy.array(probes, dtype=numpy.uint64) if numpy is not None else None
+
+	print("{:<10} {:>12} {:>12} {:>12} {:>12}".format("rate", "filter KiB", "single", "list", "array"))
+
+	for rate in (None, 0.1, 0.01, 0.001):
+		t = YFastTrie(64, prefilter_rate=rate)
+		t.update(keys)
+
+		began = default_timer()
+		single = [probe in t for probe in probes]
+		singled = default_timer()
+		listed = t.contains_many(probes)
+		listed_at = default_timer()
+		arrayed = t.contains_many(batch) if batch is not None else listed
+		finished = default_timer()
+
+		assert single == listed == arrayed
+
+		print("{:<10} {:>12.1f} {:>11.2f}s {:>11.2f}s {:>11.2f}s".format(
+			"none" if rate is None else rate,
+			len(t._prefilter._bits) / 1024 if t._prefilter is not None else 0,
+			singled - began,
+			listed_at - singled,
+			finished - listed_at))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,135 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Compare a Y-fast trie used as an integer priority queue against heapq,
+for a timer wheel that schedules deadlines, reschedules some of them and fires them in order
+
+heapq cannot change the priority of an entry in place, so rescheduling there
+leaves a stale entry behind to be skipped when it reaches the top of the heap
+"""
+
+from argparse import ArgumentParser
+from heapq import heapify, heappop, heappush
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import YFastTrie
+
+
+def make_workload(timers, reschedules, seed):
+	rng = Random(seed)
+	deadlines = rng.sample(range(1 << 32), timers)
+	moves = []
+	live = list(deadlines)
+	taken = set(deadlines)
+
+	for _ in range(reschedules):
+		index = rng.randrange(len(live))
+		new = rng.randrange(1 << 32)
+
+		while new in taken:
+			new = rng.randrange(1 << 32)
+
+		taken.add(new)
+		moves.append((live[index], new))
+		live[index] = new
+
+	return deadlines, moves
+
+
+def build_heap(deadlines):
+	heap = list(deadlines)
+	heapify(heap)
+	return heap
+
+
+def build_negated_heap(deadlines):
+	# heapq only orders by minimum, so popping the largest values needs a heap of negated values
+	heap = [-deadline for deadline in deadlines]
+	heapify(heap)
+	return heap
+
+
+def build_trie(deadlines):
+	t = YFastTrie(32)
+	t.update(deadlines)
+	return t
+
+
+def heapq_reschedule_and_fire(heap, moves):
+	cancelled = set()
+
+	for (old, new) in moves:
+		cancelled.add(old)
+		heappush(heap, new)
+
+	fired = []
+
+	while heap:
+		deadline = heappop(heap)
+
+		if deadline in cancelled:
+			cancelled.discard(deadline)
+		else:
+			fired.append(deadline)
+
+	return fired
+
+
+def trie_reschedule_and_fire(t, moves):
+	for (old, new) in moves:
+		t.replace(old, new)
+
+	fired = []
+
+	while len(t):
+		fired.extend(t.pop_min_many(256))
+
+	return fired
+
+
+def heapq_pop_largest(heap, moves):
+	return [-heappop(heap) for _ in range(len(heap) // 10)]
+
+
+def trie_pop_largest(t, moves):
+	return [t.pop_max() for _ in range(len(t) // 10)]
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--timers", type=int, default=200000)
+	parser.add_argument("--reschedules", type=int, default=200000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	deadlines, moves = make_workload(args.timers, args.reschedules, args.seed)
+	results = {}
+
+	print("{:<40} {:>9} {:>9}".format("", "build", "run"))
+
+	for (label, build, runner) in (("heapq, reschedule lazily and fire", build_heap, heapq_reschedule_and_fire),
+								   ("YFastTrie, replace and pop_min_many", build_trie, trie_reschedule_and_fire),
+								   ("heapq, pop largest tenth", build_negated_heap, heapq_pop_largest),
+								   ("YFastTrie, pop_max largest tenth", build_trie, trie_pop_largest)):
+		start = default_timer()
+		queue = build(deadlines)
+		built = default_timer()
+		results[label] = runner(queue, moves)
+		finished = default_timer()
+
+		print("{:<40} {:8.3f}s {:8.3f}s".format(label, built - start, finished - built))
+
+	assert results["heapq, reschedule lazily and fire"] == results["YFastTrie, replace and pop_min_many"]
+	assert results["heapq, pop largest tenth"] == results["YFastTrie, pop_max largest tenth"]
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,76 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time skewed predecessor, successor and membership queries on X-fast and Y-fast tries at w=64,
+with writes sprinkled between them, without a result cache and with caches
+invalidated by every write or only by writes near the cached values
+
+Queries are drawn from a small hot set, so between writes most of them repeat;
+a write invalidating every result throws away a whole set of queries' worth of work,
+while one invalidating by range only loses the few results around the written value
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import XFastTrie, YFastTrie
+
+
+def run(t, queries, writes, every):
+	began = default_timer()
+
+	for (index, value) in enumerate(queries):
+		if index % every == 0:
+			write = writes[index // every]
+
+			if write in t:
+				t.remove(write)
+			else:
+				t.insert(write)
+
+		t.predecessor(value)
+		t.successor(value)
+		value in t
+
+	return default_timer() - began
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=20000)
+	parser.add_argument("--hot", type=int, default=2000)
+	parser.add_argument("--queries", type=int, default=100000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = Random(args.seed)
+	keys = [rng.getrandbits(64) for _ in range(args.values)]
+	hot = [rng.getrandbits(64) for _ in range(args.hot)]
+	queries = [rng.choice(hot) for _ in range(args.queries)]
+
+	print("{:<10} {:>12} {:>12} {:>12} {:>12}".format("", "write every", "uncached", "epoch", "range"))
+
+	for kind in (XFastTrie, YFastTrie):
+		for every in (100, 1000, 10000):
+			writes = [rng.getrandbits(64) for _ in range(args.queries // every + 1)]
+			timings = []
+
+			for (cache_size, ranged) in ((0, False), (args.hot * 3, False), (args.hot * 3, True)):
+				t = kind(64, cache_size=cache_size, range_invalidation=ranged)
+				t.update(keys)
+				timings.append(run(t, queries, writes, every))
+
+			print("{:<10} {:>12}".format(kind.__name__, every)
+				  + "".join("{:>11.2f}s".format(timing) for timing in timings))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,71 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Measure what each snapshot of a Y-fast trie at w=64 costs on top of the work
+the writer and readers do anyway, at a few million values
+
+Every snapshot makes the writer's next insert copy the table of subtrees,
+and the snapshot's first search sort their representatives;
+both are proportional to the number of subtrees, not the number of values
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import YFastTrie
+
+
+def run(t, rng, cycles):
+	first_write = later_write = first_read = later_read = 0.0
+
+	for _ in range(cycles):
+		snapshot = t.snapshot()
+
+		start = default_timer()
+		t.insert(rng.getrandbits(64))
+		first_write += default_timer() - start
+
+		start = default_timer()
+		t.insert(rng.getrandbits(64))
+		later_write += default_timer() - start
+
+		start = default_timer()
+		snapshot.predecessor(rng.getrandbits(64))
+		first_read += default_timer() - start
+
+		start = default_timer()
+		snapshot.predecessor(rng.getrandbits(64))
+		later_read += default_timer() - start
+
+	return [total / cycles * 1e3 for total in (first_write, later_write, first_read, later_read)]
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, nargs="+", default=[1000000, 5000000])
+	parser.add_argument("--cycles", type=int, default=20)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	print("{:>10} {:>9} {:>12} {:>12} {:>12} {:>12}".format(
+		"values", "subtrees", "first write", "later write", "first read", "later read"))
+
+	for count in args.values:
+		rng = Random(args.seed)
+		t = YFastTrie(64)
+		t.update(rng.getrandbits(64) for _ in range(count))
+
+		print("{:>10} {:>9} {:>10.2f}ms {:>10.2f}ms {:>10.2f}ms {:>10.2f}ms".format(
+			count, len(t._subtrees), *run(t, rng, args.cycles)))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,84 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+"""
+Time Y-fast tries holding sparse 64-bit keys, and report how many values their subtrees hold:
+uniformly random keys, such as hashes, and ever-increasing keys, such as nanosecond timestamps
+
+Keys this sparse almost never share a fixed-width window of values,
+so how well the trie packs them depends entirely on how it picks representatives
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from timeit import default_timer
+
+from py_fast_trie import YFastTrie
+
+
+def make_hashes(rng, count):
+	return [rng.getrandbits(64) for _ in range(count)]
+
+
+def make_timestamps(rng, count):
+	timestamps = []
+	now = rng.getrandbits(60)
+
+	for _ in range(count):
+		now += rng.randrange(1000, 1000000)
+		timestamps.append(now)
+
+	return timestamps
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--values", type=int, default=100000)
+	parser.add_argument("--queries", type=int, default=100000)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	rng = Random(args.seed)
+	probes = make_hashes(rng, args.queries)
+
+	print("{:<12} {:>9} {:>9} {:>11} {:>11} {:>11}".format("", "subtrees", "per tree", "insert", "successor", "remove"))
+
+	for (label, make_keys) in (("hashes", make_hashes), ("timestamps", make_timestamps)):
+		keys = make_keys(rng, args.values)
+		t = YFastTrie(64)
+
+		start = default_timer()
+
+		for key in keys:
+			t.insert(key)
+
+		inserted = default_timer()
+		subtrees = len(t._subtrees)
+
+		for probe in probes:
+			t.successor(probe)
+
+		queried = default_timer()
+
+		for key in keys:
+			t.remove(key)
+
+		removed = default_timer()
+
+		print("{:<12} {:>9} {:>9.1f} {:>9.2f}us {:>9.2f}us {:>9.2f}us".format(
+			label,
+			subtrees,
+			len(keys) / subtrees,
+			(inserted - start) / len(keys) * 1e6,
+			(queried - inserted) / len(probes) * 1e6,
+			(removed - queried) / len(keys) * 1e6))
+
+
+if __name__ == "__main__":
+	main()
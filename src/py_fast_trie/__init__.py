@@ -11,7 +11,19 @@ from io import open
 from os.path import abspath, dirname, join
 
 from py_fast_trie.x_fast import XFastTrie as XFastTrie
+from py_fast_trie.x_fast import XFastTrieMap as XFastTrieMap
 from py_fast_trie.y_fast import YFastTrie as YFastTrie
+from py_fast_trie.y_fast import YFastTrieMap as YFastTrieMap
+from py_fast_trie.y_fast import YFastTrieMapSnapshot as YFastTrieMapSnapshot
+from py_fast_trie.y_fast import YFastTrieSnapshot as YFastTrieSnapshot
+from py_fast_trie.bitset import BitsetTrie as BitsetTrie
+from py_fast_trie.shared import SharedTrie as SharedTrie
+from py_fast_trie.interval import IntervalTrie as IntervalTrie
+from py_fast_trie.morton import MortonIndex as MortonIndex
+from py_fast_trie.prefix import PrefixTable as PrefixTable
+from py_fast_trie.journal import Journal as Journal
+from py_fast_trie.journal import checkpoint as checkpoint
+from py_fast_trie.journal import recover as recover
 
 module_root = dirname(abspath(__file__))
 
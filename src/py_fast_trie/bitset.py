@@ -0,0 +1,400 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from array import array
+from typing import (cast,
+					Iterable,
+					Iterator,
+					List,
+					Optional,
+					Union,
+					)
+
+from py_fast_trie.x_fast import XFastTrie
+
+
+WORD_BITS = 64
+WORD_SHIFT = 6
+WORD_MASK = WORD_BITS - 1
+
+
+class BitsetTrie(object):
+	# Every level is allocated up front, so the bottom level alone needs 2 ** (max_length - 3) bytes
+	max_supported_length = 32
+
+	@staticmethod
+	def _make_levels(max_length: int) -> List["array[int]"]:
+		"""
+		Creates the bitsets used to search for values in the trie;
+		every bit set at one level marks a non-empty word on the level below it
+
+		:param max_length: The maximum bit length of a value in the trie
+		:return: The bitsets for each level of the trie, smallest level last
+		"""
+		levels = []
+		bits = 1 << max_length
+
+		while True:
+			words = max(1, (bits + WORD_MASK) >> WORD_SHIFT)
+			levels.append(array("Q", bytes(8 * words)))
+
+			if words == 1:
+				break
+
+			bits = words
+
+		return levels
+
+	def _next_set(self, value: int) -> Optional[int]:
+		"""
+		Find the smallest value in the trie at least as large as the given value
+
+		:param value: The value to start searching from
+		:return: The smallest value in the trie not less than the given value,
+				 or None if no such value exists
+		"""
+		levels = self._levels
+		level = 0
+		index = value
+
+		# Climb until some word holds a set bit at or after the current index
+		while True:
+			if level == len(levels):
+				return None
+
+			word_index = index >> WORD_SHIFT
+
+			if word_index >= len(levels[level]):
+				return None
+
+			word = levels[level][word_index] >> (index & WORD_MASK)
+
+			if word:
+				index += (word & -word).bit_length() - 1
+				break
+
+			index = word_index + 1
+			level += 1
+
+		# Then follow the lowest set bit of each word back down
+		while level > 0:
+			level -= 1
+			word = levels[level][index]
+			index = (index << WORD_SHIFT) + (word & -word).bit_length() - 1
+
+		return index
+
+	def _prev_set(self, value: int) -> Optional[int]:
+		"""
+		Find the largest value in the trie at most as large as the given value
+
+		:param value: The value to start searching from
+		:return: The largest value in the trie not greater than the given value,
+				 or None if no such value exists
+		"""
+		levels = self._levels
+		level = 0
+		index = value
+
+		# Climb until some word holds a set bit at or before the current index
+		while True:
+			if level == len(levels):
+				return None
+
+			word_index = index >> WORD_SHIFT
+			word = levels[level][word_index] & ((2 << (index & WORD_MASK)) - 1)
+
+			if word:
+				index = (word_index << WORD_SHIFT) + word.bit_length() - 1
+				break
+
+			if word_index == 0:
+				return None
+
+			index = word_index - 1
+			level += 1
+
+		# Then follow the highest set bit of each word back down
+		while level > 0:
+			level -= 1
+			index = (index << WORD_SHIFT) + levels[level][index].bit_length() - 1
+
+		return index
+
+	def _get_nearest(self, value: int) -> int:
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to search for
+		:return: The value in the trie closest to the given value
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		below = self._prev_set(value)
+
+		if below == value:
+			return value
+
+		above = self._next_set(value)
+
+		if above is None or (below is not None and value - below <= above - value):
+			return cast(int, below)
+		else:
+			return above
+
+	def ceiling(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the trie at least as large as the given value,
+		if it exists
+
+		:param value: The value to find the ceiling of
+		:return: The ceiling of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._next_set(value)
+
+	def ceiling_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional[int]]:
+		"""
+		Find the ceilings of a batch of values
+
+		:param values: The values to find the ceilings of
+		:return: The ceiling of each value, in order
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return [self._next_set(value) for value in XFastTrie._to_ints(values, self._maxlen)]
+
+	def clear(self) -> None:
+		"""
+		Remove all values from the trie and return it to its starting state
+		"""
+		self._count = 0
+		self._max: Optional[int] = None
+		self._min: Optional[int] = None
+		self._levels = self._make_levels(self._maxlen)
+
+	def floor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the trie at most as large as the given value,
+		if it exists
+
+		:param value: The value to find the floor of
+		:return: The floor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._prev_set(value)
+
+	def floor_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional[int]]:
+		"""
+		Find the floors of a batch of values
+
+		:param values: The values to find the floors of
+		:return: The floor of each value, in order
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return [self._prev_set(value) for value in XFastTrie._to_ints(values, self._maxlen)]
+
+	def insert(self, value: Union[int, bytes]) -> None:
+		"""
+		Insert a value into the trie
+
+		:param value: The value to insert into the trie
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+		index = value
+
+		for level, bits in enumerate(self._levels):
+			word_index = index >> WORD_SHIFT
+			word = bits[word_index]
+			mask = 1 << (index & WORD_MASK)
+
+			# Do nothing if the value is already in the trie
+			if word & mask:
+				if level == 0:
+					return
+				break
+
+			bits[word_index] = word | mask
+
+			# The levels above already know about a non-empty word
+			if word:
+				break
+
+			index = word_index
+
+		if self._max is None or value > self._max:
+			self._max = value
+
+		if self._min is None or value < self._min:
+			self._min = value
+
+		self._count += 1
+
+	def nearest(self, value: Union[int, bytes]) -> int:
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to find the nearest neighbor of
+		:return: The value in the trie closest to the given value
+		"""
+		return self._get_nearest(XFastTrie._to_int(value, self._maxlen))
+
+	def nearest_many(self, values: Iterable[Union[int, bytes]]) -> List[int]:
+		"""
+		Find the nearest neighbors of a batch of values
+
+		:param values: The values to find the nearest neighbors of
+		:return: The nearest neighbor of each value, in order
+		"""
+		return [self._get_nearest(value) for value in XFastTrie._to_ints(values, self._maxlen)]
+
+	def predecessor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the trie strictly less than the given value,
+		if it exists
+
+		:param value: The value to find the predecessor of
+		:return: The predecessor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._prev_set(value - 1) if value > 0 else None
+
+	def remove(self, value: Union[int, bytes]) -> None:
+		"""
+		Remove the given value from the trie
+
+		:param value: The value to remove from the trie
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+		bottom = self._levels[0]
+
+		if not bottom[value >> WORD_SHIFT] >> (value & WORD_MASK) & 1:
+			raise ValueError("Value does not exist in trie")
+
+		index = value
+		for bits in self._levels:
+			word_index = index >> WORD_SHIFT
+			word = bits[word_index] & ~(1 << (index & WORD_MASK))
+			bits[word_index] = word
+
+			# The word still holds other values, so the levels above stay as they are
+			if word:
+				break
+
+			index = word_index
+
+		self._count -= 1
+
+		if self._count == 0:
+			self._min = self._max = None
+		else:
+			if self._min == value:
+				self._min = self._next_set(value)
+
+			if self._max == value:
+				self._max = self._prev_set(value)
+
+	def successor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value,
+		if it exists
+
+		:param value: The value to find the successor of
+		:return: The successor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._next_set(value + 1)
+
+	@property
+	def max(self) -> Optional[int]:
+		"""
+		The maximum value in the trie
+
+		:return: The maximum value in the trie,
+				 or None if the trie is empty
+		"""
+		return self._max
+
+	@property
+	def min(self) -> Optional[int]:
+		"""
+		The minimum value in the trie
+
+		:return: The minimum value in the trie,
+				 or None if the trie is empty
+		"""
+		return self._min
+
+	def __init__(self, max_length: int=24) -> None:
+		if max_length > self.max_supported_length:
+			raise ValueError("Bitset tries can hold values of at most {} bits"
+							 .format(self.max_supported_length))
+
+		self._maxlen = max_length
+		self.clear()
+
+	def __contains__(self, value: Union[int, bytes]) -> bool:
+		value = XFastTrie._to_int(value, self._maxlen)
+		return bool(self._levels[0][value >> WORD_SHIFT] >> (value & WORD_MASK) & 1)
+
+	def __gt__(self, value: Union[int, bytes]) -> Optional[int]:
+		return self.successor(value)
+
+	def __iadd__(self, value: Union[int, bytes]) -> "BitsetTrie":
+		self.insert(value)
+		return self
+
+	def __isub__(self, value: Union[int, bytes]) -> "BitsetTrie":
+		self.remove(value)
+		return self
+
+	def __iter__(self) -> Iterator[int]:
+		bottom = self._levels[0]
+		value = self._next_set(0)
+
+		# Use the summary levels to skip empty words, then read every bit out of the non-empty ones
+		while value is not None:
+			word_index = value >> WORD_SHIFT
+			base = word_index << WORD_SHIFT
+			word = bottom[word_index]
+
+			while word:
+				low_bit = word & -word
+				yield base + low_bit.bit_length() - 1
+				word ^= low_bit
+
+			value = self._next_set(base + WORD_BITS)
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __lt__(self, value: Union[int, bytes]) -> Optional[int]:
+		return self.predecessor(value)
@@ -0,0 +1,175 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from importlib import import_module
+from math import ceil, log
+from typing import (cast,
+					Any,
+					Iterable,
+					List,
+					Sequence,
+					Tuple,
+					)
+
+
+# Every value is hashed as a single word, folding longer values into one first
+MAX_WORD = (1 << 64) - 1
+
+# The constants of the SplitMix64 finalizer, which scatters nearby values across the whole word
+MIX_INCREMENT = 0x9E3779B97F4A7C15
+MIX_FIRST = 0xBF58476D1CE4E5B9
+MIX_SECOND = 0x94D049BB133111EB
+
+
+class BloomFilter(object):
+	# Every value sets a handful of bits in a bit array, so a value with any of its bits unset
+	# was certainly never added, while one with all its bits set probably was;
+	# the bits of a value are found by double hashing, stepping through the array
+	# from one half of a mixed word by an odd stride taken from the other half,
+	# and the array has a power of two bits so every position is found with a mask.
+	# Values can't be taken back out, so a filter only ever gets less selective
+	# until it is replaced by a new one
+
+	@staticmethod
+	def _mix(value: int) -> Tuple[int, int]:
+		"""
+		Hash a value into the position of its first bit and the stride between its bits
+
+		:param value: The value to hash
+		:return: The unmasked position of the value's first bit, and the stride to its next one
+		"""
+		while value > MAX_WORD:
+			value = (value & MAX_WORD) ^ (value >> 64)
+
+		value = (value + MIX_INCREMENT) & MAX_WORD
+		value = ((value ^ (value >> 30)) * MIX_FIRST) & MAX_WORD
+		value = ((value ^ (value >> 27)) * MIX_SECOND) & MAX_WORD
+		value ^= value >> 31
+
+		return (value & 0xFFFFFFFF, value >> 32 | 1)
+
+	def add(self, value: int) -> None:
+		"""
+		Set every bit of a value; values whose bits were all set already aren't counted again
+
+		:param value: The value to add
+		"""
+		position, stride = self._mix(value)
+		bits = self._bits
+		new = False
+
+		for _ in range(self._hashes):
+			index = position & self._mask
+			mask = 1 << (index & 7)
+
+			if not bits[index >> 3] & mask:
+				bits[index >> 3] |= mask
+				new = True
+
+			position += stride
+
+		if new:
+			self._count += 1
+
+	def add_many(self, values: Iterable[int]) -> None:
+		"""
+		Set the bits of a batch of values
+
+		:param values: The values to add
+		"""
+		for value in values:
+			self.add(value)
+
+	def _contains_array(self, values: Any) -> List[bool]:
+		"""
+		Check a NumPy array of values against the filter, hashing and probing every value at once
+
+		:param values: The values to check, as an array of unsigned or nonnegative integers
+		:return: Whether each value might have been added, in order
+		"""
+		numpy = import_module("numpy")
+		word = numpy.uint64
+		mixed = values.astype(word) + word(MIX_INCREMENT)
+		mixed = (mixed ^ (mixed >> word(30))) * word(MIX_FIRST)
+		mixed = (mixed ^ (mixed >> word(27))) * word(MIX_SECOND)
+		mixed ^= mixed >> word(31)
+
+		# Positions wrap around at 64 bits rather than growing, which the mask doesn't notice
+		position = mixed & word(0xFFFFFFFF)
+		stride = (mixed >> word(32)) | word(1)
+		bits = numpy.frombuffer(self._bits, dtype=numpy.uint8)
+		found = numpy.ones(len(values), dtype=bool)
+
+		for _ in range(self._hashes):
+			index = position & word(self._mask)
+			found &= (bits[index >> word(3)] >> (index & word(7)).astype(numpy.uint8)) & 1 == 1
+			position += stride
+
+		return cast(List[bool], found.tolist())
+
+	def contains_many(self, values: Sequence[int]) -> List[bool]:
+		"""
+		Check a batch of values against the filter; NumPy arrays of integers
+		are hashed and probed a whole array at a time
+
+		:param values: The values to check
+		:return: Whether each value might have been added, in order
+		"""
+		array = cast(Any, values)
+
+		if hasattr(array, "dtype"):
+			if array.dtype.kind in "iu":
+				return self._contains_array(array)
+
+			values = array.tolist()
+
+		return [value in self for value in values]
+
+	@property
+	def full(self) -> bool:
+		"""
+		Whether the filter holds more values than it was sized for,
+		and so misses more often than it was meant to
+
+		:return: Whether the filter has more values than its capacity
+		"""
+		return self._count > self.capacity
+
+	def __init__(self, capacity: int, error_rate: float) -> None:
+		if capacity < 1:
+			raise ValueError("Filter must be able to hold at least one value")
+
+		if not 0 < error_rate < 1:
+			raise ValueError("False positive rate must be between 0 and 1")
+
+		# The optimal number of bits for the capacity is rounded up to a power of two,
+		# which only lowers the false positive rate
+		self.capacity = capacity
+		self.error_rate = error_rate
+		self._count = 0
+		self._hashes = max(1, round(-log(error_rate, 2)))
+		self._mask = (1 << max(6, ceil(log(-capacity * log(error_rate) / log(2) ** 2, 2)))) - 1
+		self._bits = bytearray((self._mask + 1) >> 3)
+
+	def __contains__(self, value: int) -> bool:
+		position, stride = self._mix(value)
+		bits = self._bits
+
+		for _ in range(self._hashes):
+			index = position & self._mask
+
+			if not bits[index >> 3] >> (index & 7) & 1:
+				return False
+
+			position += stride
+
+		return True
+
+	def __len__(self) -> int:
+		return self._count
@@ -0,0 +1,132 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import (Any,
+					Callable,
+					List,
+					Optional,
+					Tuple,
+					Union,
+					)
+
+class ResultCache(object):
+	# Results are kept in least recently used order, keyed by the query and the value
+	# exactly as it was given, alongside the mutation epoch they were found in;
+	# every mutation of the trie starts a new epoch, so results found in an earlier one
+	# are as good as missing, and are evicted in their turn like any other result.
+	# Caches invalidating by range also keep the values every result was found for in order,
+	# so a mutation of a single value drops only the results it could change and
+	# the epoch only moves on for mutations of many values at once
+
+	def _forget(self, entry: Tuple[str, Union[int, bytes]], value: int) -> None:
+		"""
+		Remove a result from the index of values results were found for
+
+		:param entry: The query and the value as given of the result to remove
+		:param value: The value the result was found for
+		"""
+		start = bisect_left(self._values, value)
+		stop = bisect_right(self._values, value, start)
+		position = self._entries_by_value.index(entry, start, stop)
+		del self._entries_by_value[position]
+		del self._values[position]
+
+	def clear(self) -> None:
+		"""
+		Remove every result from the cache
+		"""
+		self._results: "OrderedDict[Tuple[str, Union[int, bytes]], Tuple[int, int, Any]]" = OrderedDict()
+		self._values: List[int] = []
+		self._entries_by_value: List[Tuple[str, Union[int, bytes]]] = []
+
+	def invalidate(self) -> None:
+		"""
+		Start a new mutation epoch, invalidating every result in the cache
+		"""
+		self.epoch += 1
+
+	def invalidate_range(self, low: Optional[int], high: Optional[int]) -> None:
+		"""
+		Remove every result found for a value in the given range, if the cache invalidates by range,
+		or invalidate every result otherwise
+
+		:param low: The smallest value whose results to remove, or None for no lower bound
+		:param high: The largest value whose results to remove, or None for no upper bound
+		"""
+		if not self.ranged:
+			self.invalidate()
+			return
+
+		start = bisect_left(self._values, low) if low is not None else 0
+		stop = bisect_right(self._values, high) if high is not None else len(self._values)
+
+		for entry in self._entries_by_value[start:stop]:
+			del self._results[entry]
+
+		del self._values[start:stop]
+		del self._entries_by_value[start:stop]
+
+	def lookup(self,
+			   operation: str,
+			   value: Union[int, bytes],
+			   convert: Callable[[Union[int, bytes]], int],
+			   query: Callable[[int], Any]) -> Any:
+		"""
+		Find the result of a query in the cache, running the query and caching its result
+		if it isn't there; only ints and byte sequences are looked up, as the values
+		the cache holds results for are compared as given rather than once converted
+
+		:param operation: The name of the query
+		:param value: The value to run the query for, as given
+		:param convert: The function converting the value to the canonical value format
+		:param query: The query, taking the converted value
+		:return: The result of the query
+		"""
+		if not isinstance(value, (int, bytes)):
+			return query(convert(value))
+
+		entry = (operation, value)
+		cached = self._results.get(entry)
+
+		if cached is not None and cached[0] == self.epoch:
+			self._results.move_to_end(entry)
+			return cached[2]
+
+		key = convert(value)
+		result = query(key)
+
+		if cached is None and self.ranged:
+			index = bisect_right(self._values, key)
+			self._values.insert(index, key)
+			self._entries_by_value.insert(index, entry)
+
+		self._results[entry] = (self.epoch, key, result)
+		self._results.move_to_end(entry)
+
+		if len(self._results) > self.capacity:
+			(evicted, (_, evicted_key, _)) = self._results.popitem(last=False)
+
+			if self.ranged:
+				self._forget(evicted, evicted_key)
+
+		return result
+
+	def __init__(self, capacity: int, ranged: bool=False) -> None:
+		if capacity < 1:
+			raise ValueError("Cache must be able to hold at least one result")
+
+		self.capacity = capacity
+		self.epoch = 0
+		self.ranged = ranged
+		self.clear()
+
+	def __len__(self) -> int:
+		return len(self._results)
@@ -0,0 +1,993 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import (cast,
+					Iterable,
+					Iterator,
+					List,
+					Optional,
+					Tuple,
+					Union,
+					)
+
+
+# Values up to this large fit in the unsigned 64-bit words of an array;
+# containers holding larger values fall back to lists
+MAX_WORD = (1 << 64) - 1
+
+# The rough number of bytes each kind of container needs up front,
+# and then for every value, every eight bits of span and every run respectively
+ARRAY_OVERHEAD = 64
+ARRAY_VALUE_BYTES = 8
+BITMAP_OVERHEAD = 28
+RUN_OVERHEAD = 128
+RUN_BYTES = 16
+
+# A frozen container needs about this many bytes besides its encoded values
+FROZEN_OVERHEAD = 48
+
+# Containers are only converted once another kind would take up at most half as much room,
+# so a container on the edge between two kinds doesn't flip back and forth
+REFIT_RATIO = 2
+
+
+def _decode_varints(data: bytes) -> List[int]:
+	"""
+	Decode a run of variable-length integers, seven bits to a byte with the lowest bits first
+
+	:param data: The encoded integers
+	:return: The decoded integers, in order
+	"""
+	result = []
+	number = 0
+	shift = 0
+
+	for byte in data:
+		number |= (byte & 0x7f) << shift
+
+		if byte & 0x80:
+			shift += 7
+		else:
+			result.append(number)
+			number = 0
+			shift = 0
+
+	return result
+
+
+def _encode_varints(numbers: Iterable[int]) -> bytearray:
+	"""
+	Encode nonnegative integers as variable-length integers, seven bits to a byte
+	with the lowest bits first, so small integers take up a single byte
+
+	:param numbers: The integers to encode
+	:return: The encoded integers
+	"""
+	result = bytearray()
+
+	for number in numbers:
+		while number > 0x7f:
+			result.append(number & 0x7f | 0x80)
+			number >>= 7
+
+		result.append(number)
+
+	return result
+
+
+def _make_words(values: List[int]) -> Union["array[int]", List[int]]:
+	"""
+	Store ascending values as compactly as they allow
+
+	:param values: The values to store, in ascending order
+	:return: An array of 64-bit words holding the values, or a list if any is too large
+	"""
+	if values and values[-1] > MAX_WORD:
+		return list(values)
+
+	return array("Q", values)
+
+
+def _popcount(bits: int) -> int:
+	"""
+	Count the set bits of an integer
+
+	:param bits: The integer to count the set bits of
+	:return: The number of set bits
+	"""
+	return bin(bits).count("1")
+
+
+def _costs(count: int, span: int, runs: int) -> Tuple[int, int, int]:
+	"""
+	Estimate how many bytes each kind of container would need to hold some values
+
+	:param count: The number of values
+	:param span: The difference between the largest and smallest values, plus one
+	:param runs: The number of runs of consecutive values
+	:return: The estimated sizes of an array, a bitmap and a run container
+	"""
+	return (ARRAY_OVERHEAD + ARRAY_VALUE_BYTES * count,
+			BITMAP_OVERHEAD + span // 8,
+			RUN_OVERHEAD + RUN_BYTES * runs)
+
+
+def _count_runs(values: Iterable[int]) -> int:
+	"""
+	Count the runs of consecutive values in ascending values
+
+	:param values: The values to count the runs of, in ascending order
+	:return: The number of runs
+	"""
+	runs = 0
+	last = -2
+
+	for value in values:
+		if value != last + 1:
+			runs += 1
+
+		last = value
+
+	return runs
+
+
+def make_container(values: Iterable[int]) -> "Container":
+	"""
+	Store values in whichever kind of container holds them in the least room:
+	a sorted array for sparse values, a bitmap for dense ones,
+	or a list of runs for long runs of consecutive values
+
+	:param values: The values to store, distinct and in ascending order
+	:return: A container holding the values
+	"""
+	values = list(values)
+
+	if not values:
+		return ArrayContainer()
+
+	array_cost, bitmap_cost, run_cost = _costs(len(values), values[-1] - values[0] + 1, _count_runs(values))
+
+	if run_cost <= bitmap_cost and run_cost < array_cost:
+		return RunContainer(values)
+	elif bitmap_cost < array_cost:
+		return BitmapContainer(values)
+	else:
+		return ArrayContainer(values)
+
+
+class Container(ABC):
+	# The values of a Y-fast trie subtree, distinct and in ascending order,
+	# held in whichever representation suits how densely they are packed;
+	# every kind of container can be indexed like a list, and searched like a sorted one
+
+	@abstractmethod
+	def _load(self, values: List[int]) -> None:
+		"""
+		Replace the contents of the container
+
+		:param values: The values to hold, distinct and in ascending order
+		"""
+		raise NotImplementedError  # pragma: no cover
+
+	def _span(self) -> int:
+		"""
+		Find the difference between the largest and smallest values in the container, plus one
+
+		:return: The span of the container, or 0 if it is empty
+		"""
+		return self[-1] - self[0] + 1 if len(self) > 0 else 0
+
+	def _size(self) -> int:
+		"""
+		Estimate how many bytes the container needs to hold its values
+
+		:return: The estimated size of the container
+		"""
+		return _costs(len(self), self._span(), self.runs)[CONTAINER_KINDS.index(type(self))]
+
+	def accepts(self, value: int) -> bool:
+		"""
+		Check whether a value can be added to the container without it growing out of hand
+
+		:param value: The value that would be added
+		:return: Whether the value can be added to the container
+		"""
+		return True
+
+	@abstractmethod
+	def add(self, value: int) -> None:
+		"""
+		Add a value to the container, if it isn't already there
+
+		:param value: The value to add
+		"""
+		raise NotImplementedError  # pragma: no cover
+
+	@abstractmethod
+	def bisect_left(self, value: int) -> int:
+		"""
+		Count the values in the container strictly less than the given value
+
+		:param value: The value to search for
+		:return: The index the given value would be inserted at
+		"""
+		raise NotImplementedError  # pragma: no cover
+
+	def bisect_right(self, value: int) -> int:
+		"""
+		Count the values in the container at most as large as the given value
+
+		:param value: The value to search for
+		:return: The index just past the given value
+		"""
+		return self.bisect_left(value + 1)
+
+	def copy(self) -> "Container":
+		"""
+		Copy the container, so the copy can be modified without affecting the original
+
+		:return: A container of the same kind holding the same values
+		"""
+		return type(self)(list(self))
+
+	def index(self, value: int) -> int:
+		"""
+		Find where a value is in the container
+
+		:param value: The value to search for
+		:return: The index of the given value
+		"""
+		index = self.bisect_left(value)
+
+		if index == len(self) or self[index] != value:
+			raise ValueError("{} is not in container".format(value))
+
+		return index
+
+	def islice(self, start: Optional[int]=None, stop: Optional[int]=None) -> Iterator[int]:
+		"""
+		Iterate over some of the values in the container
+
+		:param start: The index to start at
+		:param stop: The index to stop before
+		:return: The values between the given indices
+		"""
+		return iter(list(self)[start:stop])
+
+	def predecessor(self, value: int) -> Optional[int]:
+		"""
+		Find the largest value in the container strictly less than the given value
+
+		:param value: The value to find the predecessor of
+		:return: The predecessor of the given value, or None if it doesn't exist
+		"""
+		index = self.bisect_left(value)
+		return self[index - 1] if index > 0 else None
+
+	def refit(self) -> "Container":
+		"""
+		Move the values into a different kind of container
+		if it would hold them in much less room than this one
+
+		:return: The container that should hold the values from now on
+		"""
+		costs = _costs(len(self), self._span(), self.runs)
+		best = min(range(len(costs)), key=costs.__getitem__)
+
+		if costs[best] * REFIT_RATIO > costs[CONTAINER_KINDS.index(type(self))]:
+			return self
+
+		return CONTAINER_KINDS[best](list(self))
+
+	def successor(self, value: int) -> Optional[int]:
+		"""
+		Find the smallest value in the container strictly greater than the given value
+
+		:param value: The value to find the successor of
+		:return: The successor of the given value, or None if it doesn't exist
+		"""
+		index = self.bisect_right(value)
+		return self[index] if index < len(self) else None
+
+	@property
+	@abstractmethod
+	def runs(self) -> int:
+		"""
+		The number of runs of consecutive values in the container
+
+		:return: The number of runs in the container
+		"""
+		raise NotImplementedError  # pragma: no cover
+
+	def __init__(self, values: Iterable[int]=()) -> None:
+		self._load(list(values))
+
+	@abstractmethod
+	def __contains__(self, value: object) -> bool:
+		raise NotImplementedError  # pragma: no cover
+
+	@abstractmethod
+	def __delitem__(self, index: Union[int, slice]) -> None:
+		raise NotImplementedError  # pragma: no cover
+
+	@abstractmethod
+	def __getitem__(self, index: int) -> int:
+		raise NotImplementedError  # pragma: no cover
+
+	@abstractmethod
+	def __iter__(self) -> Iterator[int]:
+		raise NotImplementedError  # pragma: no cover
+
+	@abstractmethod
+	def __len__(self) -> int:
+		raise NotImplementedError  # pragma: no cover
+
+	def __repr__(self) -> str:
+		return "{}({})".format(type(self).__name__, list(self))
+
+
+class ArrayContainer(Container):
+	# Values are kept in a sorted array, which suits values too sparse for a bitmap
+
+	def _load(self, values: List[int]) -> None:
+		self._values = _make_words(values)
+		self._runs = _count_runs(values)
+
+	def add(self, value: int) -> None:
+		values = self._values
+		index = bisect_left(values, value)
+
+		if index < len(values) and values[index] == value:
+			return
+
+		self._runs += (1
+					   - (index > 0 and values[index - 1] == value - 1)
+					   - (index < len(values) and values[index] == value + 1))
+
+		if value > MAX_WORD and isinstance(values, array):
+			values = self._values = list(values)
+
+		values.insert(index, value)
+
+	def bisect_left(self, value: int) -> int:
+		return bisect_left(self._values, value)
+
+	def bisect_right(self, value: int) -> int:
+		return bisect_right(self._values, value)
+
+	def islice(self, start: Optional[int]=None, stop: Optional[int]=None) -> Iterator[int]:
+		return iter(self._values[start:stop])
+
+	@property
+	def runs(self) -> int:
+		return self._runs
+
+	def __contains__(self, value: object) -> bool:
+		index = bisect_left(self._values, cast(int, value))
+		return index < len(self._values) and self._values[index] == value
+
+	def __delitem__(self, index: Union[int, slice]) -> None:
+		values = self._values
+
+		if isinstance(index, slice):
+			del values[index]
+			self._runs = _count_runs(values)
+			return
+
+		if index < 0:
+			index += len(values)
+
+		value = values[index]
+		self._runs += ((index > 0 and values[index - 1] == value - 1)
+					   + (index < len(values) - 1 and values[index + 1] == value + 1)
+					   - 1)
+		del values[index]
+
+	def __getitem__(self, index: int) -> int:
+		return self._values[index]
+
+	def __iter__(self) -> Iterator[int]:
+		return iter(self._values)
+
+	def __len__(self) -> int:
+		return len(self._values)
+
+
+class BitmapContainer(Container):
+	# Values are kept as bits set in an integer, offset by the smallest value,
+	# which suits values packed densely but not in long runs;
+	# the smallest value is always the lowest bit, so the bitmap never has leading empty space
+
+	def _load(self, values: List[int]) -> None:
+		self._base = values[0] if values else 0
+		self._count = len(values)
+		self._runs = _count_runs(values)
+
+		# Setting bits one at a time would copy the whole integer for every value
+		bitmap = bytearray((values[-1] - self._base) // 8 + 1 if values else 0)
+
+		for value in values:
+			offset = value - self._base
+			bitmap[offset >> 3] |= 1 << (offset & 7)
+
+		self._bits = int.from_bytes(bitmap, "little")
+
+	def _locate(self, index: int) -> int:
+		"""
+		Find the bit holding the value at an index, working in from whichever end is closer
+
+		:param index: The index of the value, which must be in the container
+		:return: The position of the bit holding the value
+		"""
+		bits = self._bits
+
+		if index <= self._count // 2:
+			for _ in range(index):
+				bits &= bits - 1
+
+			return (bits & -bits).bit_length() - 1
+
+		for _ in range(self._count - 1 - index):
+			bits ^= 1 << (bits.bit_length() - 1)
+
+		return bits.bit_length() - 1
+
+	def _span(self) -> int:
+		return self._bits.bit_length()
+
+	def accepts(self, value: int) -> bool:
+		# A bitmap can hold any value, but stops being worth it once it would outgrow an array
+		if self._count == 0:
+			return True
+
+		span = max(self._base + self._bits.bit_length() - 1, value) - min(self._base, value) + 1
+		array_cost, bitmap_cost, _ = _costs(self._count + 1, span, self._runs + 1)
+		return bitmap_cost <= array_cost
+
+	def add(self, value: int) -> None:
+		if self._count == 0:
+			self._base = value
+			self._bits = 1
+			self._count = 1
+			self._runs = 1
+			return
+
+		offset = value - self._base
+
+		if offset < 0:
+			self._bits <<= -offset
+			self._base = value
+			offset = 0
+		elif self._bits >> offset & 1:
+			return
+
+		bits = self._bits
+		self._runs += 1 - (offset > 0 and bits >> (offset - 1) & 1) - (bits >> (offset + 1) & 1)
+		self._bits = bits | 1 << offset
+		self._count += 1
+
+	def bisect_left(self, value: int) -> int:
+		offset = value - self._base
+
+		if offset <= 0:
+			return 0
+		elif offset >= self._bits.bit_length():
+			return self._count
+
+		return _popcount(self._bits & ((1 << offset) - 1))
+
+	def predecessor(self, value: int) -> Optional[int]:
+		offset = value - self._base
+
+		if offset <= 0:
+			return None
+
+		bits = self._bits & ((1 << offset) - 1) if offset < self._bits.bit_length() else self._bits
+		return self._base + bits.bit_length() - 1 if bits else None
+
+	def successor(self, value: int) -> Optional[int]:
+		offset = value - self._base + 1
+
+		if offset <= 0:
+			return self._base if self._count > 0 else None
+
+		bits = self._bits >> offset
+		return value + (bits & -bits).bit_length() if bits else None
+
+	@property
+	def runs(self) -> int:
+		return self._runs
+
+	def __contains__(self, value: object) -> bool:
+		offset = cast(int, value) - self._base
+		return offset >= 0 and self._bits >> offset & 1 == 1
+
+	def __delitem__(self, index: Union[int, slice]) -> None:
+		if isinstance(index, slice):
+			values = list(self)
+			del values[index]
+			self._load(values)
+			return
+
+		if index < 0:
+			index += self._count
+
+		if not 0 <= index < self._count:
+			raise IndexError("Container index out of range")
+
+		offset = self._locate(index)
+		bits = self._bits
+		self._runs += (offset > 0 and bits >> (offset - 1) & 1) + (bits >> (offset + 1) & 1) - 1
+		bits ^= 1 << offset
+		self._count -= 1
+
+		# Shift the new smallest value down to the lowest bit
+		if offset == 0 and bits:
+			shift = (bits & -bits).bit_length() - 1
+			bits >>= shift
+			self._base += shift
+
+		self._bits = bits
+
+	def __getitem__(self, index: int) -> int:
+		if index < 0:
+			index += self._count
+
+		if not 0 <= index < self._count:
+			raise IndexError("Container index out of range")
+
+		return self._base + self._locate(index)
+
+	def __iter__(self) -> Iterator[int]:
+		bits = self._bits
+
+		while bits:
+			lowest = bits & -bits
+			yield self._base + lowest.bit_length() - 1
+			bits ^= lowest
+
+	def __len__(self) -> int:
+		return self._count
+
+
+class RunContainer(Container):
+	# Values are kept as the first and last values of every run of consecutive values,
+	# which suits long runs like sequential identifiers
+
+	def _load(self, values: List[int]) -> None:
+		starts: List[int] = []
+		ends: List[int] = []
+
+		for value in values:
+			if ends and ends[-1] == value - 1:
+				ends[-1] = value
+			else:
+				starts.append(value)
+				ends.append(value)
+
+		self._starts = _make_words(starts)
+		self._ends = _make_words(ends)
+		self._count = len(values)
+
+	def _find_run(self, value: int) -> int:
+		"""
+		Find the last run starting at or before a value
+
+		:param value: The value to search for
+		:return: The index of the run, or -1 if every run starts after the value
+		"""
+		return bisect_right(self._starts, value) - 1
+
+	def _locate(self, index: int) -> Tuple[int, int]:
+		"""
+		Find the run holding the value at an index
+
+		:param index: The index of the value, which must be in the container
+		:return: The index of the run holding the value, and the value
+		"""
+		for (run, (start, end)) in enumerate(zip(self._starts, self._ends)):
+			length = end - start + 1
+
+			if index < length:
+				return (run, start + index)
+
+			index -= length
+
+		raise IndexError("Container index out of range")
+
+	def _span(self) -> int:
+		return self._ends[-1] - self._starts[0] + 1 if self._count > 0 else 0
+
+	def _walk(self, run: int, value: int, count: int) -> Iterator[int]:
+		"""
+		Iterate over values starting partway through a run
+
+		:param run: The index of the run to start in
+		:param value: The value to start at
+		:param count: The number of values to iterate over
+		:return: The values
+		"""
+		while count > 0:
+			stop = min(self._ends[run] + 1, value + count)
+
+			for current in range(value, stop):
+				yield current
+
+			count -= stop - value
+			run += 1
+
+			if run < len(self._starts):
+				value = self._starts[run]
+
+	def add(self, value: int) -> None:
+		starts = self._starts
+		ends = self._ends
+		run = self._find_run(value)
+
+		if run >= 0 and value <= ends[run]:
+			return
+
+		joins_left = run >= 0 and ends[run] == value - 1
+		joins_right = run + 1 < len(starts) and starts[run + 1] == value + 1
+
+		if (value > MAX_WORD) and isinstance(starts, array):
+			starts = self._starts = list(starts)
+			ends = self._ends = list(ends)
+
+		if joins_left and joins_right:
+			ends[run] = ends[run + 1]
+			del starts[run + 1]
+			del ends[run + 1]
+		elif joins_left:
+			ends[run] = value
+		elif joins_right:
+			starts[run + 1] = value
+		else:
+			starts.insert(run + 1, value)
+			ends.insert(run + 1, value)
+
+		self._count += 1
+
+	def bisect_left(self, value: int) -> int:
+		run = bisect_left(self._ends, value)
+
+		if run == len(self._ends):
+			return self._count
+
+		before = sum(end - start + 1 for (start, end) in zip(self._starts[:run], self._ends[:run]))
+		return before + max(0, value - self._starts[run])
+
+	def islice(self, start: Optional[int]=None, stop: Optional[int]=None) -> Iterator[int]:
+		start, stop, _ = slice(start, stop).indices(self._count)
+
+		if start >= stop:
+			return iter(())
+
+		run, value = self._locate(start)
+		return self._walk(run, value, stop - start)
+
+	def predecessor(self, value: int) -> Optional[int]:
+		run = bisect_left(self._starts, value) - 1
+		return min(self._ends[run], value - 1) if run >= 0 else None
+
+	def successor(self, value: int) -> Optional[int]:
+		run = self._find_run(value)
+
+		if run >= 0 and value < self._ends[run]:
+			return value + 1
+
+		return self._starts[run + 1] if run + 1 < len(self._starts) else None
+
+	@property
+	def runs(self) -> int:
+		return len(self._starts)
+
+	def __contains__(self, value: object) -> bool:
+		run = self._find_run(cast(int, value))
+		return run >= 0 and cast(int, value) <= self._ends[run]
+
+	def __delitem__(self, index: Union[int, slice]) -> None:
+		if isinstance(index, slice):
+			values = list(self)
+			del values[index]
+			self._load(values)
+			return
+
+		if index < 0:
+			index += self._count
+
+		if not 0 <= index < self._count:
+			raise IndexError("Container index out of range")
+
+		run, value = self._locate(index)
+		starts = self._starts
+		ends = self._ends
+
+		if starts[run] == ends[run]:
+			del starts[run]
+			del ends[run]
+		elif value == starts[run]:
+			starts[run] = value + 1
+		elif value == ends[run]:
+			ends[run] = value - 1
+		else:
+			starts.insert(run + 1, value + 1)
+			ends.insert(run + 1, ends[run])
+			ends[run] = value - 1
+
+		self._count -= 1
+
+	def __getitem__(self, index: int) -> int:
+		if index < 0:
+			index += self._count
+
+		if not 0 <= index < self._count:
+			raise IndexError("Container index out of range")
+
+		# Values past the middle are found walking back from the last run
+		if index > self._count // 2:
+			back = self._count - 1 - index
+
+			for run in range(len(self._starts) - 1, -1, -1):
+				length = self._ends[run] - self._starts[run] + 1
+
+				if back < length:
+					break
+
+				back -= length
+
+			return self._ends[run] - back
+
+		return self._locate(index)[1]
+
+	def __iter__(self) -> Iterator[int]:
+		for (start, end) in zip(self._starts, self._ends):
+			for value in range(start, end + 1):
+				yield value
+
+	def __len__(self) -> int:
+		return self._count
+
+
+class DecodeCache(object):
+	# The values decoded so far from the frozen containers read most recently,
+	# so containers that keep being read are only decoded once;
+	# the cache may be shared with snapshots read from other threads,
+	# so entries are replaced rather than modified in place
+
+	def clear(self) -> None:
+		"""
+		Forget every decoded container
+		"""
+		self._entries.clear()
+
+	def discard(self, container: "FrozenContainer") -> None:
+		"""
+		Forget the values decoded from a container
+
+		:param container: The container to forget
+		"""
+		self._entries.pop(container, None)
+
+	def get(self, container: "FrozenContainer") -> Tuple[List[int], int]:
+		"""
+		Find how much of a container has been decoded, marking it as read most recently
+
+		:param container: The container to look up
+		:return: The values decoded from the container so far,
+				 and the position in its encoded values where decoding stopped
+		"""
+		entry = self._entries.pop(container, None)
+
+		if entry is None:
+			return ([], 0)
+
+		self._entries[container] = entry
+		return entry
+
+	def put(self, container: "FrozenContainer", values: List[int], offset: int) -> None:
+		"""
+		Remember the values decoded from a container,
+		forgetting the container read least recently if the cache is full
+
+		:param container: The container the values were decoded from
+		:param values: The values decoded so far
+		:param offset: The position in the encoded values where decoding stopped
+		"""
+		if self._capacity == 0:
+			return
+
+		self._entries.pop(container, None)
+		self._entries[container] = (values, offset)
+
+		while len(self._entries) > self._capacity:
+			try:
+				self._entries.popitem(last=False)
+			except KeyError:  # pragma: no cover
+				break
+
+	def __init__(self, capacity: int) -> None:
+		self._capacity = capacity
+		self._entries: "OrderedDict[FrozenContainer, Tuple[List[int], int]]" = OrderedDict()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+
+class FrozenContainer(Container):
+	# Values are kept as the gaps between them, encoded as variable-length integers
+	# in a single bytes object, which suits values that are rarely read and never modified;
+	# reads only decode as far as they need to, and remember what they decoded in a cache
+	# shared by every frozen container of a trie, so values read often aren't decoded every time
+
+	def _decode(self, value: Optional[int]=None, count: int=0) -> List[int]:
+		"""
+		Decode values from the start of the container until reaching
+		the first value at least as large as a given value, or a given number of values
+
+		:param value: The value to decode up to, if any
+		:param count: The number of values to decode, at least
+		:return: The values decoded, which may go past what was asked for
+		"""
+		values, offset = self._cache.get(self) if self._cache is not None else ([], 0)
+		blob = self._blob
+
+		if offset == len(blob) or (len(values) >= count and (value is None or (values and values[-1] >= value))):
+			return values
+
+		# Cached values may be being read elsewhere, so they are extended in a copy
+		values = list(values)
+		last = values[-1] if values else 0
+
+		while offset < len(blob) and (len(values) < count or (value is not None and (not values or last < value))):
+			number = 0
+			shift = 0
+
+			while True:
+				byte = blob[offset]
+				offset += 1
+				number |= (byte & 0x7f) << shift
+
+				if byte < 0x80:
+					break
+
+				shift += 7
+
+			last += number
+			values.append(last)
+
+		if self._cache is not None:
+			self._cache.put(self, values, offset)
+
+		return values
+
+	def _load(self, values: List[int]) -> None:
+		if not values:
+			raise ValueError("Frozen containers must hold at least one value")
+
+		self._first = values[0]
+		self._last = values[-1]
+		self._count = len(values)
+		self._blob = bytes(_encode_varints(value - previous for (previous, value) in zip([0] + values, values)))
+
+	def _size(self) -> int:
+		return FROZEN_OVERHEAD + len(self._blob)
+
+	def _span(self) -> int:
+		return self._last - self._first + 1
+
+	def accepts(self, value: int) -> bool:
+		return False
+
+	def add(self, value: int) -> None:
+		raise TypeError("Frozen containers cannot be modified")
+
+	def bisect_left(self, value: int) -> int:
+		if value <= self._first:
+			return 0
+		elif value > self._last:
+			return self._count
+
+		return bisect_left(self._decode(value), value)
+
+	def bisect_right(self, value: int) -> int:
+		if value < self._first:
+			return 0
+		elif value >= self._last:
+			return self._count
+
+		return bisect_right(self._decode(value + 1), value)
+
+	def copy(self) -> Container:
+		return self.thaw()
+
+	def islice(self, start: Optional[int]=None, stop: Optional[int]=None) -> Iterator[int]:
+		start, stop, _ = slice(start, stop).indices(self._count)
+		return iter(self._decode(count=stop)[start:stop])
+
+	def predecessor(self, value: int) -> Optional[int]:
+		if value <= self._first:
+			return None
+		elif value > self._last:
+			return self._last
+
+		values = self._decode(value)
+		return values[bisect_left(values, value) - 1]
+
+	def refit(self) -> Container:
+		return self
+
+	def successor(self, value: int) -> Optional[int]:
+		if value < self._first:
+			return self._first
+		elif value >= self._last:
+			return None
+
+		values = self._decode(value + 1)
+		return values[bisect_right(values, value)]
+
+	def thaw(self) -> Container:
+		"""
+		Move the values into a container that can be modified
+
+		:return: A container of whichever kind suits the values best
+		"""
+		if self._cache is not None:
+			self._cache.discard(self)
+
+		return make_container(self)
+
+	@property
+	def runs(self) -> int:
+		return _count_runs(self)
+
+	def __init__(self, values: Iterable[int]=(), cache: Optional[DecodeCache]=None) -> None:
+		self._cache = cache
+		self._load(list(values))
+
+	def __contains__(self, value: object) -> bool:
+		value = cast(int, value)
+
+		if not self._first <= value <= self._last:
+			return False
+
+		values = self._decode(value)
+		return values[bisect_left(values, value)] == value
+
+	def __delitem__(self, index: Union[int, slice]) -> None:
+		raise TypeError("Frozen containers cannot be modified")
+
+	def __getitem__(self, index: int) -> int:
+		if index < 0:
+			index += self._count
+
+		if not 0 <= index < self._count:
+			raise IndexError("Container index out of range")
+		elif index == 0:
+			return self._first
+		elif index == self._count - 1:
+			return self._last
+
+		return self._decode(count=index + 1)[index]
+
+	def __iter__(self) -> Iterator[int]:
+		# Reading every value is left out of the cache, so a scan doesn't push out the values being read often
+		return accumulate(_decode_varints(self._blob))
+
+	def __len__(self) -> int:
+		return self._count
+
+
+# The kinds of container in the order their estimated sizes are returned
+CONTAINER_KINDS = (ArrayContainer, BitmapContainer, RunContainer)
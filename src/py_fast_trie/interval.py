@@ -0,0 +1,169 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from sys import maxsize
+from typing import (cast,
+					Any,
+					Iterable,
+					Iterator,
+					List,
+					Optional,
+					Tuple,
+					Union,
+					)
+
+from py_fast_trie.x_fast import XFastTrie
+from py_fast_trie.y_fast import YFastTrieMap
+
+
+class IntervalTrie(object):
+	def _find(self, point: int) -> Optional[Tuple[int, int, Any]]:
+		"""
+		Find the range containing the given point, assuming the point has already been validated
+
+		:param point: The point to search for
+		:return: The start, end and value of the range containing the given point,
+				 or None if no range contains it
+		"""
+		if len(self._ranges) == 0:
+			return None
+
+		item = self._ranges.floor_item(point)
+
+		if item is None or item[1][0] < point:
+			return None
+
+		start, (end, value) = item
+		return (start, end, value)
+
+	def add(self, start: Union[int, bytes], end: Union[int, bytes], value: Any) -> None:
+		"""
+		Map every point from the given start up to and including the given end to a value
+
+		:param start: The first point in the range
+		:param end: The last point in the range
+		:param value: The value to map the range to
+		"""
+		start = XFastTrie._to_int(start, self._maxlen)
+		end = XFastTrie._to_int(end, self._maxlen)
+
+		if start > end:
+			raise ValueError("Range cannot end before it starts")
+
+		# Ranges are disjoint, so the only range that could overlap the new one
+		# is the one starting closest to, but not after, the new range's end
+		if len(self._ranges) > 0:
+			overlap = self._ranges.floor_item(end)
+
+			if overlap is not None and overlap[1][0] >= start:
+				raise ValueError("Range overlaps the range starting at {}".format(overlap[0]))
+
+		if self._coalesce and len(self._ranges) > 0:
+			before = self._ranges.pred_item(start)
+			after = self._ranges.get(end + 1) if end < self._max_point else None
+
+			if before is not None and before[1][0] == start - 1 and before[1][1] == value:
+				del self._ranges[before[0]]
+				start = before[0]
+
+			if after is not None and after[1] == value:
+				del self._ranges[end + 1]
+				end = after[0]
+
+		self._ranges[start] = (end, value)
+
+	def clear(self) -> None:
+		"""
+		Remove all ranges from the trie and return it to its starting state
+		"""
+		self._ranges.clear()
+
+	def find(self, point: Union[int, bytes]) -> Optional[Tuple[int, int, Any]]:
+		"""
+		Find the range containing the given point
+
+		:param point: The point to search for
+		:return: The start, end and value of the range containing the given point,
+				 or None if no range contains it
+		"""
+		return self._find(XFastTrie._to_int(point, self._maxlen))
+
+	def find_many(self, points: Iterable[Union[int, bytes]]) -> List[Optional[Tuple[int, int, Any]]]:
+		"""
+		Find the ranges containing a batch of points
+
+		:param points: The points to search for
+		:return: The start, end and value of the range containing each point,
+				 or None for points no range contains, in order
+		"""
+		return [self._find(point) for point in XFastTrie._to_ints(points, self._maxlen)]
+
+	def get(self, point: Union[int, bytes], default: Any=None) -> Any:
+		"""
+		Retrieve the value of the range containing the given point
+
+		:param point: The point to look up
+		:param default: The value to return if no range contains the point
+		:return: The value of the range containing the given point, or the default
+		"""
+		found = self.find(point)
+		return found[2] if found is not None else default
+
+	def get_many(self, points: Iterable[Union[int, bytes]], default: Any=None) -> List[Any]:
+		"""
+		Retrieve the values of the ranges containing a batch of points
+
+		:param points: The points to look up
+		:param default: The value to use for points no range contains
+		:return: The value of the range containing each point, in order
+		"""
+		return [found[2] if found is not None else default for found in self.find_many(points)]
+
+	def remove(self, point: Union[int, bytes]) -> Tuple[int, int, Any]:
+		"""
+		Remove the range containing the given point
+
+		:param point: A point in the range to remove
+		:return: The start, end and value of the removed range
+		"""
+		found = self.find(point)
+
+		if found is None:
+			raise ValueError("No range contains the given point")
+
+		del self._ranges[found[0]]
+		return found
+
+	def __init__(self,
+				 max_length: int=(maxsize.bit_length() + 1),
+				 coalesce: bool=False) -> None:
+		# Ranges are stored by their start point, alongside their end point and value;
+		# adjacent ranges with equal values are merged on insertion if coalescing
+		self._maxlen = max_length
+		self._max_point = 2 ** max_length - 1
+		self._coalesce = coalesce
+		self._ranges = YFastTrieMap(max_length)
+
+	def __contains__(self, point: Union[int, bytes]) -> bool:
+		return self.find(point) is not None
+
+	def __getitem__(self, point: Union[int, bytes]) -> Any:
+		found = self.find(point)
+
+		if found is None:
+			raise KeyError(point)
+
+		return found[2]
+
+	def __iter__(self) -> Iterator[Tuple[int, int, Any]]:
+		for (start, (end, value)) in self._ranges.items():
+			yield (start, cast(int, end), value)
+
+	def __len__(self) -> int:
+		return len(self._ranges)
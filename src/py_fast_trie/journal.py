@@ -0,0 +1,434 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from os import fsync, replace
+from os.path import exists
+from struct import Struct
+from types import TracebackType
+from typing import (Iterable,
+					List,
+					Optional,
+					Tuple,
+					Type,
+					Union,
+					)
+from zlib import crc32
+
+from py_fast_trie.containers import _decode_varints, _encode_varints
+from py_fast_trie.x_fast import XFastTrie, XFastTrieMap
+from py_fast_trie.y_fast import YFastTrie, YFastTrieMap
+
+
+# Journals start with their magic and the generation of the snapshot they follow on from;
+# every group of records after that is framed by its length and checksum
+JOURNAL_HEADER = Struct("<8sQ")
+JOURNAL_MAGIC = b"pyftjrnl"
+FRAME_HEADER = Struct("<II")
+
+# Snapshots start with their magic, their generation, the shape of the trie
+# and how many values it held; then come the gaps between its values in ascending order
+# and a checksum of those gaps
+SNAPSHOT_HEADER = Struct("<8sQHBQ")
+SNAPSHOT_MAGIC = b"pyftsnap"
+SNAPSHOT_TRAILER = Struct("<I")
+
+# The shape of the trie holds its maximum bit length and these flags
+SNAPSHOT_MULTISET = 1
+SNAPSHOT_ADAPTIVE = 2
+
+# Every record is a variable-length integer holding a value shifted past the record's kind;
+# removing a range takes a second integer holding the end of the range
+RECORD_INSERT = 0
+RECORD_REMOVE = 1
+RECORD_RANGE = 2
+RECORD_CLEAR = 3
+
+
+def _read_snapshot(path: str) -> Tuple[int, int, bool, bool, List[int]]:
+	"""
+	Read every value out of a snapshot
+
+	:param path: The path of the snapshot
+	:return: The generation of the snapshot, the maximum bit length, multiset flag
+			 and adaptive flag of the trie it was taken of, and its values in ascending order
+	"""
+	with open(path, "rb") as snapshot_file:
+		data = snapshot_file.read()
+
+	if len(data) < SNAPSHOT_HEADER.size + SNAPSHOT_TRAILER.size:
+		raise ValueError("File {} is not a trie snapshot".format(path))
+
+	magic, generation, max_length, flags, count = SNAPSHOT_HEADER.unpack_from(data)
+	body = data[SNAPSHOT_HEADER.size:-SNAPSHOT_TRAILER.size]
+
+	if magic != SNAPSHOT_MAGIC:
+		raise ValueError("File {} is not a trie snapshot".format(path))
+
+	if SNAPSHOT_TRAILER.unpack_from(data, len(data) - SNAPSHOT_TRAILER.size)[0] != crc32(body):
+		raise ValueError("Snapshot {} is corrupt".format(path))
+
+	values = _decode_varints(body)
+	value = 0
+
+	for (index, gap) in enumerate(values):
+		value += gap
+		values[index] = value
+
+	if len(values) != count:
+		raise ValueError("Snapshot {} is corrupt".format(path))
+
+	return (generation,
+			max_length,
+			bool(flags & SNAPSHOT_MULTISET),
+			bool(flags & SNAPSHOT_ADAPTIVE),
+			values)
+
+
+def _replay(trie: Union[XFastTrie, YFastTrie], records: List[int]) -> None:
+	"""
+	Apply journalled changes to a trie, gathering every run of insertions or removals
+	into a single sorted batch
+
+	:param trie: The trie to change
+	:param records: The journalled records, in the order they were made
+	"""
+	batch: List[int] = []
+	batch_kind = RECORD_INSERT
+	position = 0
+
+	while position < len(records):
+		record = records[position]
+		kind = record & 3
+		position += 1
+
+		# Insertions and removals of the same value don't commute,
+		# so a batch ends whenever the kind of record changes
+		if batch and kind != batch_kind:
+			_replay_batch(trie, batch_kind, batch)
+			batch = []
+
+		if kind == RECORD_RANGE:
+			trie._remove_range(record >> 2, records[position])
+			position += 1
+		elif kind == RECORD_CLEAR:
+			trie.clear()
+		else:
+			batch.append(record >> 2)
+			batch_kind = kind
+
+	if batch:
+		_replay_batch(trie, batch_kind, batch)
+
+
+def _replay_batch(trie: Union[XFastTrie, YFastTrie], kind: int, values: List[int]) -> None:
+	"""
+	Apply a run of journalled insertions or removals to a trie in one sorted sweep
+
+	:param trie: The trie to change
+	:param kind: The kind of every record in the run
+	:param values: The values the records hold
+	"""
+	keys = sorted(trie._to_keys(values))
+
+	if kind == RECORD_INSERT:
+		trie._insert_sorted(trie._fit_all(keys))
+	else:
+		trie._remove_sorted(keys)
+
+
+def checkpoint(trie: Union[XFastTrie, YFastTrie], snapshot: str) -> None:
+	"""
+	Write every value in a trie to a new snapshot, replacing any older one,
+	then empty the trie's journal, since the snapshot holds every change it recorded
+
+	:param trie: The trie to take a snapshot of
+	:param snapshot: The path to write the snapshot to
+	"""
+	journal = trie._journal
+	generation = journal._generation + 1 if journal is not None else 0
+	values = list(trie)
+	gaps = [value - previous for (value, previous) in zip(values, [0] + values)]
+	body = _encode_varints(gaps)
+	temporary = snapshot + ".tmp"
+
+	with open(temporary, "wb") as snapshot_file:
+		snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC,
+												 generation,
+												 trie._length_limit,
+												 ((SNAPSHOT_MULTISET if trie._multiset else 0)
+												  | (SNAPSHOT_ADAPTIVE if trie._adaptive else 0)),
+												 len(values)))
+		snapshot_file.write(body)
+		snapshot_file.write(SNAPSHOT_TRAILER.pack(crc32(body)))
+		snapshot_file.flush()
+		fsync(snapshot_file.fileno())
+
+	# The old snapshot is only replaced once the new one is safely written,
+	# and a journal left over from a crash before it is emptied is older than the snapshot
+	# and so is skipped by recovery
+	replace(temporary, snapshot)
+
+	if journal is not None:
+		journal._reset(generation)
+
+
+def recover(snapshot: str,
+			journal: "Journal",
+			trie: Optional[Union[XFastTrie, YFastTrie]]=None) -> Union[XFastTrie, YFastTrie]:
+	"""
+	Rebuild a trie by loading its last snapshot and replaying every change journalled since,
+	then attach the journal to the trie so later changes are journalled as well
+
+	:param snapshot: The path of the snapshot written by the last checkpoint;
+					 a missing snapshot is treated as one of an empty trie
+	:param journal: The journal of changes made since the snapshot was written
+	:param trie: The empty trie to load the values into, which must be a multiset
+				 exactly when the trie the snapshot was taken of was one,
+				 and must allow values at least as long as that trie did;
+				 or None to create a Y-fast trie like the one the snapshot was taken of
+	:return: The recovered trie
+	"""
+	if exists(snapshot):
+		generation, max_length, multiset, adaptive, values = _read_snapshot(snapshot)
+	elif trie is not None:
+		generation, max_length, multiset, adaptive, values = (0, trie._length_limit, trie._multiset, trie._adaptive, [])
+	else:
+		raise ValueError("Snapshot {} does not exist, so a trie to recover into is needed".format(snapshot))
+
+	if trie is None:
+		trie = YFastTrie(max_length, multiset=multiset, adaptive=adaptive)
+	elif isinstance(trie, (XFastTrieMap, YFastTrieMap)):
+		raise TypeError("Only tries of values can be journalled, not maps")
+	elif len(trie) > 0:
+		raise ValueError("Tries can only be recovered into while empty")
+	elif trie._multiset != multiset:
+		raise ValueError("Snapshot {} was taken of a trie with a different multiset flag".format(snapshot))
+	elif trie._length_limit < max_length:
+		raise ValueError("Snapshot {} was taken of a trie allowing longer values".format(snapshot))
+
+	trie._journal = None
+
+	if values:
+		trie._insert_sorted(trie._fit_all(trie._to_keys(values)))
+
+	if journal._generation == generation:
+		_replay(trie, journal._read_records())
+	else:
+		journal._reset(generation)
+
+	trie._journal = journal
+	return trie
+
+
+class Journal(object):
+	# Changes to a trie are held in memory and appended to the journal file
+	# a group at a time, and the file is synced to disk after every group;
+	# a crash loses at most the changes in the group being gathered,
+	# and a group torn by a crash is cut off the end of the file when it is next opened
+	_pending: List[int]
+
+	def _append(self, record: int) -> None:
+		"""
+		Add a record to the group being gathered, writing the group out once it is full
+
+		:param record: The record to add
+		"""
+		self._pending.append(record)
+
+		if len(self._pending) >= self._group_size:
+			self.flush()
+
+	def _append_many(self, records: List[int]) -> None:
+		"""
+		Add several records to the group being gathered, writing the group out once it is full;
+		the records are always written out in the same group
+
+		:param records: The records to add
+		"""
+		self._pending.extend(records)
+
+		if len(self._pending) >= self._group_size:
+			self.flush()
+
+	def _read_records(self) -> List[int]:
+		"""
+		Read every record written to the journal file
+
+		:return: The records, in the order they were made
+		"""
+		self.flush()
+		self._file.seek(0)
+		records, _ = self._scan(self._file.read())
+		return records
+
+	def _reset(self, generation: int) -> None:
+		"""
+		Empty the journal so it follows on from a new snapshot
+
+		:param generation: The generation of the snapshot
+		"""
+		self._pending = []
+		self._generation = generation
+		self._file.seek(0)
+		self._file.truncate()
+		self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, generation))
+		self._file.flush()
+		fsync(self._file.fileno())
+
+	def _scan(self, data: bytes) -> Tuple[List[int], int]:
+		"""
+		Decode every whole, uncorrupted group in the contents of a journal file
+
+		:param data: The contents of the journal file
+		:return: The records in the file, and the length of the file
+				 up to the end of the last group that could be read
+		"""
+		magic, _ = JOURNAL_HEADER.unpack_from(data)
+
+		if magic != JOURNAL_MAGIC:
+			raise ValueError("File {} is not a trie journal".format(self._path))
+
+		records = []
+		end = JOURNAL_HEADER.size
+
+		while end + FRAME_HEADER.size <= len(data):
+			length, checksum = FRAME_HEADER.unpack_from(data, end)
+			start = end + FRAME_HEADER.size
+			body = data[start:start + length]
+
+			if len(body) < length or crc32(body) != checksum:
+				break
+
+			records.extend(_decode_varints(body))
+			end = start + length
+
+		return (records, end)
+
+	def close(self) -> None:
+		"""
+		Write out any changes still being gathered and close the journal file
+		"""
+		if not self._file.closed:
+			self.flush()
+			self._file.close()
+
+	def flush(self) -> None:
+		"""
+		Write out the changes being gathered as a group, without waiting for the group to fill up,
+		and sync the journal file to disk
+		"""
+		if not self._pending:
+			return
+
+		body = _encode_varints(self._pending)
+		self._pending = []
+		self._file.seek(0, 2)
+		self._file.write(FRAME_HEADER.pack(len(body), crc32(body)))
+		self._file.write(body)
+		self._file.flush()
+		fsync(self._file.fileno())
+
+	def _log_clear(self) -> None:
+		"""
+		Record that every value was removed from the trie
+		"""
+		self._append(RECORD_CLEAR)
+
+	def _log_insert(self, value: int) -> None:
+		"""
+		Record that a value was added to the trie
+
+		:param value: The value added
+		"""
+		self._append(value << 2)
+
+	def _log_insert_many(self, values: Iterable[int]) -> None:
+		"""
+		Record that a batch of values was added to the trie
+
+		:param values: The values added
+		"""
+		self._append_many([value << 2 for value in values])
+
+	def _log_remove(self, value: int) -> None:
+		"""
+		Record that a value was removed from the trie
+
+		:param value: The value removed
+		"""
+		self._append(value << 2 | RECORD_REMOVE)
+
+	def _log_remove_many(self, values: Iterable[int]) -> None:
+		"""
+		Record that a batch of values was removed from the trie
+
+		:param values: The values removed
+		"""
+		self._append_many([value << 2 | RECORD_REMOVE for value in values])
+
+	def _log_remove_range(self, low: int, high: int) -> None:
+		"""
+		Record that every value from the given lower bound up to,
+		but not including, the given upper bound was removed from the trie
+
+		:param low: The smallest value removed
+		:param high: The value removal stopped at
+		"""
+		self._append_many([low << 2 | RECORD_RANGE, high])
+
+	@property
+	def path(self) -> str:
+		"""
+		The path of the journal file
+
+		:return: The path of the journal file
+		"""
+		return self._path
+
+	def __init__(self, path: str, group_size: int=64) -> None:
+		if group_size < 1:
+			raise ValueError("Groups must hold at least one change")
+
+		self._group_size = group_size
+		self._path = path
+		self._pending = []
+
+		if exists(path):
+			self._file = open(path, "r+b")
+			data = self._file.read()
+
+			if len(data) < JOURNAL_HEADER.size:
+				self._file.close()
+				raise ValueError("File {} is not a trie journal".format(path))
+
+			_, self._generation = JOURNAL_HEADER.unpack_from(data)
+
+			try:
+				_, end = self._scan(data)
+			except ValueError:
+				self._file.close()
+				raise
+
+			# Drop any group torn by a crash, so new groups can be read after the groups before it
+			if end < len(data):
+				self._file.truncate(end)
+				self._file.flush()
+				fsync(self._file.fileno())
+		else:
+			self._file = open(path, "w+b")
+			self._reset(0)
+
+	def __enter__(self) -> "Journal":
+		return self
+
+	def __exit__(self,
+				 exc_type: Optional[Type[BaseException]],
+				 exc_value: Optional[BaseException],
+				 traceback: Optional[TracebackType]) -> None:
+		self.close()
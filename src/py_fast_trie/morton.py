@@ -0,0 +1,316 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from sys import maxsize
+from typing import (Iterable,
+					Iterator,
+					List,
+					Sequence,
+					Tuple,
+					Union,
+					)
+
+from py_fast_trie.x_fast import XFastTrie
+from py_fast_trie.y_fast import YFastTrie
+
+
+def _make_spread_table(dimensions: int) -> List[int]:
+	"""
+	Build the table spreading the bits of a byte out so there are
+	enough empty bits between them to fit the other coordinates of a point
+
+	:param dimensions: The number of coordinates in a point
+	:return: The spread value of every byte
+	"""
+	return [sum(((byte >> bit) & 1) << (bit * dimensions) for bit in range(8)) for byte in range(256)]
+
+
+def _make_compact_table(dimensions: int) -> List[List[Tuple[int, ...]]]:
+	"""
+	Build the tables gathering the bits of each coordinate back out of a byte of a key;
+	the bytes of a key repeat every so many bytes in which coordinate their first bit belongs to,
+	so there is one table for each byte in that cycle
+
+	:param dimensions: The number of coordinates in a point
+	:return: For each byte in the cycle, the bits every byte holds of each coordinate,
+			 shifted into place among the 8 bits each coordinate has in the cycle
+	"""
+	tables = []
+
+	for phase in range(dimensions):
+		table = []
+
+		for byte in range(256):
+			coords = [0] * dimensions
+
+			for bit in range(8):
+				position = phase * 8 + bit
+				coords[position % dimensions] |= ((byte >> bit) & 1) << (position // dimensions)
+
+			table.append(tuple(coords))
+
+		tables.append(table)
+
+	return tables
+
+
+_SPREAD_TABLES = {dimensions: _make_spread_table(dimensions) for dimensions in (2, 3)}
+_COMPACT_TABLES = {dimensions: _make_compact_table(dimensions) for dimensions in (2, 3)}
+
+
+class MortonIndex(object):
+	def _bigmin(self, key: int, low: int, high: int) -> int:
+		"""
+		Find the smallest key after the given key belonging to a point in a box,
+		given a key between the box's corners belonging to a point outside it
+
+		:param key: The key outside the box
+		:param low: The key of the box's lowest corner
+		:param high: The key of the box's highest corner
+		:return: The smallest key after the given key whose point is in the box
+		"""
+		bigmin = high
+
+		# The key and the corners agree on every bit above the highest one they don't,
+		# and there's no choosing between halves of the box until they disagree
+		for position in range(((key ^ low) | (key ^ high)).bit_length() - 1, -1, -1):
+			bit = 1 << position
+			below = self._masks[position % self._dimensions] & (bit - 1)
+
+			if key & bit == 0:
+				if low & bit:
+					return low
+				elif high & bit:
+					# The box straddles this bit; the smallest key in its upper half
+					# is a candidate, but the key might still lead to the lower half
+					bigmin = (low | bit) & ~below
+					high = (high & ~bit) | below
+			elif high & bit == 0:
+				return bigmin
+			elif low & bit == 0:
+				low = (low | bit) & ~below
+
+		return bigmin
+
+	def clear(self) -> None:
+		"""
+		Remove all points from the index and return it to its starting state
+		"""
+		self._keys.clear()
+
+	def decode(self, key: int) -> Tuple[int, ...]:
+		"""
+		Recover the point whose coordinates were interleaved into the given key
+
+		:param key: The Morton key to decode
+		:return: The point the key belongs to
+		"""
+		tables = _COMPACT_TABLES[self._dimensions]
+		coords = [0] * self._dimensions
+		shift = 0
+
+		while key:
+			for table in tables:
+				for (dimension, bits) in enumerate(table[key & 0xFF]):
+					coords[dimension] |= bits << shift
+
+				key >>= 8
+
+			shift += 8
+
+		return tuple(coords)
+
+	def encode(self, point: Sequence[Union[int, bytes]]) -> int:
+		"""
+		Interleave the bits of a point's coordinates into a single Morton key,
+		ordering points along a Z-order curve; the first coordinate
+		takes the lowest bit of every group of interleaved bits
+
+		:param point: The point to encode
+		:return: The Morton key of the given point
+		"""
+		if len(point) != self._dimensions:
+			raise ValueError("Points must have {} coordinates".format(self._dimensions))
+
+		table = _SPREAD_TABLES[self._dimensions]
+		stride = 8 * self._dimensions
+		key = 0
+
+		for (dimension, coord) in enumerate(point):
+			coord = XFastTrie._to_int(coord, self._coord_length)
+			shift = dimension
+
+			while coord:
+				key |= table[coord & 0xFF] << shift
+				coord >>= 8
+				shift += stride
+
+		return key
+
+	def _in_box(self, key: int, corners: List[Tuple[int, int]]) -> bool:
+		"""
+		Determine whether the point with the given key is in a box; the bits of
+		a coordinate keep their order when interleaved, so coordinates
+		can be compared without decoding the key
+
+		:param key: The key of the point to check
+		:param corners: The interleaved bits of each coordinate of the box's
+						lowest and highest corners, alongside each coordinate's mask
+		:return: Whether the point is in the box
+		"""
+		for ((low, high), mask) in zip(corners, self._masks):
+			if not low <= key & mask <= high:
+				return False
+
+		return True
+
+	def insert(self, point: Sequence[Union[int, bytes]]) -> None:
+		"""
+		Add the given point to the index
+
+		:param point: The point to add to the index
+		"""
+		self._keys.insert(self.encode(point))
+
+	def _litmax(self, key: int, low: int, high: int) -> int:
+		"""
+		Find the largest key before the given key belonging to a point in a box,
+		given a key between the box's corners belonging to a point outside it
+
+		:param key: The key outside the box
+		:param low: The key of the box's lowest corner
+		:param high: The key of the box's highest corner
+		:return: The largest key before the given key whose point is in the box
+		"""
+		litmax = low
+
+		for position in range(((key ^ low) | (key ^ high)).bit_length() - 1, -1, -1):
+			bit = 1 << position
+			below = self._masks[position % self._dimensions] & (bit - 1)
+
+			if key & bit:
+				if high & bit == 0:
+					return high
+				elif low & bit == 0:
+					# The box straddles this bit; the largest key in its lower half
+					# is a candidate, but the key might still lead to the upper half
+					litmax = (high & ~bit) | below
+					low = (low | bit) & ~below
+			elif low & bit:
+				return litmax
+			elif high & bit:
+				high = (high & ~bit) | below
+
+		return litmax
+
+	def query(self,
+			  low: Sequence[Union[int, bytes]],
+			  high: Sequence[Union[int, bytes]],
+			  reverse: bool=False) -> Iterator[Tuple[int, ...]]:
+		"""
+		Generate the points in a box, in Z-order; whenever the curve leaves the box,
+		the search jumps straight to the next key on the curve back inside it
+		rather than passing over every point between
+
+		:param low: The lowest corner of the box, inclusive
+		:param high: The highest corner of the box, inclusive
+		:param reverse: Whether to generate the points in reverse Z-order
+		:return: The points in the box
+		"""
+		low_key = self.encode(low)
+		high_key = self.encode(high)
+		corners = [(low_key & mask, high_key & mask) for mask in self._masks]
+
+		if any(first > last for (first, last) in corners):
+			raise ValueError("Box cannot end before it starts")
+
+		return self._search(low_key, high_key, corners, reverse)
+
+	def remove(self, point: Sequence[Union[int, bytes]]) -> None:
+		"""
+		Remove the given point from the index
+
+		:param point: The point to remove from the index
+		"""
+		key = self.encode(point)
+
+		if key not in self._keys:
+			raise ValueError("Point does not exist in index")
+
+		self._keys.remove(key)
+
+	def _search(self,
+				low: int,
+				high: int,
+				corners: List[Tuple[int, int]],
+				reverse: bool) -> Iterator[Tuple[int, ...]]:
+		"""
+		Generate the points in a box, one trie search at a time; every search
+		starts from the last key found, so the index can change between points
+
+		:param low: The key of the box's lowest corner
+		:param high: The key of the box's highest corner
+		:param corners: The interleaved bits of each coordinate of the box's
+						lowest and highest corners
+		:param reverse: Whether to generate the points in reverse Z-order
+		:return: The points in the box
+		"""
+		if len(self._keys) == 0:
+			return
+
+		key = self._keys.floor(high) if reverse else self._keys.ceiling(low)
+
+		while key is not None and low <= key <= high:
+			if not self._in_box(key, corners):
+				key = (self._keys.floor(self._litmax(key, low, high)) if reverse
+					   else self._keys.ceiling(self._bigmin(key, low, high)))
+				continue
+
+			yield self.decode(key)
+
+			if len(self._keys) == 0:
+				return
+
+			key = self._keys.predecessor(key) if reverse else self._keys.successor(key)
+
+	def update(self, points: Iterable[Sequence[Union[int, bytes]]]) -> None:
+		"""
+		Add a batch of points to the index
+
+		:param points: The points to add to the index
+		"""
+		self._keys.update([self.encode(point) for point in points])
+
+	def __init__(self,
+				 max_length: int=(maxsize.bit_length() + 1),
+				 dimensions: int=2) -> None:
+		if dimensions not in _SPREAD_TABLES:
+			raise ValueError("Points must have 2 or 3 coordinates")
+
+		if max_length < dimensions:
+			raise ValueError("Keys must have at least one bit for each coordinate")
+
+		# Every coordinate gets an equal share of the bits of a key, and the bits
+		# of the key left over once every coordinate has its share go unused;
+		# the masks pick the bits of each coordinate out of a key
+		self._dimensions = dimensions
+		self._coord_length = max_length // dimensions
+		self._masks = [sum(1 << (bit * dimensions + dimension) for bit in range(self._coord_length))
+					   for dimension in range(dimensions)]
+		self._keys = YFastTrie(self._coord_length * dimensions)
+
+	def __contains__(self, point: Sequence[Union[int, bytes]]) -> bool:
+		return self.encode(point) in self._keys
+
+	def __iter__(self) -> Iterator[Tuple[int, ...]]:
+		for key in self._keys:
+			yield self.decode(key)
+
+	def __len__(self) -> int:
+		return len(self._keys)
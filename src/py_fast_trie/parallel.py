@@ -0,0 +1,215 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from array import array
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from gc import disable, enable, isenabled
+from typing import (Any,
+					Callable,
+					Iterable,
+					Iterator,
+					List,
+					Optional,
+					Sequence,
+					Tuple,
+					TypeVar,
+					)
+
+from py_hopscotch_dict import HopscotchDict
+
+from py_fast_trie.containers import Container, make_container
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+# The prefixes of every node on a level of a shard, the nodes each one points to on its left and right,
+# and the number of values under each, if the trie tracks it; a node's children are given by their position
+# on the level below, and descendant pointers by the position of their leaf, bitwise inverted
+ShardLevel = Tuple[Sequence[int], "array[int]", "array[int]", Optional["array[int]"]]
+
+
+def adopt_values(table: HopscotchDict, values: List[Any]) -> HopscotchDict:
+	"""
+	Swap the values of a table built by index_table for the objects at those indices;
+	tables keep their values in insertion order, so only the list of values need change,
+	as in the pinned version of HopscotchDict
+
+	:param table: The table mapping every key to its position
+	:param values: The value for each key, in the order the table's keys were given
+	:return: The given table, now mapping every key to its value
+	"""
+	if len(table) != len(values):
+		raise ValueError("Table needs exactly one value for every key")
+
+	table._values = values
+	return table
+
+
+def build_containers(task: Tuple[Sequence[int], List[int]]) -> List[Container]:
+	"""
+	Build the subtrees of a run of sorted values
+
+	:param task: The values, and the position of the first value of every subtree among them
+	:return: The subtrees holding the given values, in ascending order
+	"""
+	values, starts = task
+	stops = starts[1:] + [len(values)]
+	return [make_container(values[start:stop]) for (start, stop) in zip(starts, stops)]
+
+
+def build_shard(task: Tuple[Sequence[int], Optional[Sequence[int]], int, int, bool]) -> List[ShardLevel]:
+	"""
+	Lay out every internal node of an X-fast trie holding a shard of values, from the leaves up
+	to the level holding prefixes of a given length; every value in the shard must share
+	a prefix of that length, so no node below it has values outside the shard
+
+	:param task: The values in the shard in ascending order without repeats,
+				 the number of times each value is held if not just once,
+				 the bit length of the trie, the length of the shortest prefix to lay out,
+				 and whether to count the values under every node
+	:return: The layout of every level of the shard, from the top down
+	"""
+	values, counts, length, top, track = task
+	prefixes: Sequence[int] = values
+	first = list(range(len(values)))
+	last = first
+	sizes: Optional[List[int]] = None
+
+	if track:
+		sizes = list(counts) if counts is not None else [1] * len(values)
+
+	levels: List[ShardLevel] = []
+
+	for _ in range(top, length):
+		parents: List[int] = []
+		lefts = array("q")
+		rights = array("q")
+		parent_first: List[int] = []
+		parent_last: List[int] = []
+		parent_sizes: Optional[List[int]] = [] if sizes is not None else None
+		index = 0
+
+		# A missing child is replaced by a descendant pointer
+		# to the closest leaf on the other leg
+		while index < len(prefixes):
+			prefix = prefixes[index]
+			pair = prefix & 1 == 0 and index + 1 < len(prefixes) and prefixes[index + 1] == prefix | 1
+			stop = index + 1 if pair else index
+
+			parents.append(prefix >> 1)
+			lefts.append(~first[index] if prefix & 1 else index)
+			rights.append(stop if pair or prefix & 1 else ~last[index])
+			parent_first.append(first[index])
+			parent_last.append(last[stop])
+
+			if parent_sizes is not None and sizes is not None:
+				parent_sizes.append(sizes[index] + sizes[stop] if pair else sizes[index])
+
+			index = stop + 1
+
+		levels.append((pack_values(parents, length), lefts, rights,
+					   array("q", parent_sizes) if parent_sizes is not None else None))
+		prefixes = parents
+		first = parent_first
+		last = parent_last
+		sizes = parent_sizes
+
+	levels.reverse()
+	return levels
+
+
+def copy_table(table: HopscotchDict) -> HopscotchDict:
+	"""
+	Copy a table by copying its layout as it is, rather than inserting every key
+	into a new table one at a time; this relies on the internals
+	of the pinned version of HopscotchDict, which test_parallel checks
+
+	:param table: The table to copy
+	:return: A new table holding the same entries as the given one
+	"""
+	copy = HopscotchDict()
+	copy._keys = list(table._keys)
+	copy._values = list(table._values)
+	copy._count = table._count
+	copy._size = table._size
+	copy._nbhd_size = table._nbhd_size
+	copy._indices = table._indices[:]
+	copy._nbhds = table._nbhds[:]
+	return copy
+
+
+def index_table(keys: Iterable[int]) -> HopscotchDict:
+	"""
+	Build a table mapping every key to its position among the given keys,
+	for adopt_values to fill in with the actual values later;
+	the table is sized for every key up front and then laid out in one go,
+	rather than growing as each key is inserted; this relies on the internals
+	of the pinned version of HopscotchDict, which test_parallel checks
+
+	:param keys: The keys of the table, without repeats
+	:return: The table mapping every key to its position
+	"""
+	table = HopscotchDict()
+	table._keys = list(keys)
+	table._values = list(range(len(table._keys)))
+	table._count = len(table._keys)
+	size = 8
+
+	while table._count >= size * table.MAX_DENSITY:
+		size *= 2
+
+	# Keys crowding into one neighborhood can keep the table from being laid out
+	# at a given size, which just needs a larger one
+	while True:
+		try:
+			table._resize(size)
+			return table
+		except RuntimeError:
+			size *= 2
+
+
+def pack_values(values: List[int], length: int) -> Sequence[int]:
+	"""
+	Pack values into an array of machine words if they fit, to send them between processes cheaply
+
+	:param values: The values to pack
+	:param length: The bit length of the largest value that could be given
+	:return: The given values, in an array if they fit in one
+	"""
+	return array("Q", values) if length <= 64 else values
+
+
+@contextmanager
+def paused_collection() -> Iterator[None]:
+	"""
+	Keep the cyclic garbage collector from running while a trie is built;
+	every node created would otherwise count towards the next collection,
+	and each collection would visit every node created so far
+	"""
+	enabled = isenabled()
+	disable()
+
+	try:
+		yield
+	finally:
+		if enabled:
+			enable()
+
+
+def run_tasks(pool: Optional[Executor], function: Callable[[T], U], tasks: Iterable[T]) -> List[U]:
+	"""
+	Run a function over a batch of tasks, across a pool of processes if given
+
+	:param pool: The pool to run the tasks in, or None to run them in this process
+	:param function: The function to run on every task
+	:param tasks: The arguments to the function for every task
+	:return: The result of every task, in order
+	"""
+	return list(map(function, tasks) if pool is None else pool.map(function, tasks))
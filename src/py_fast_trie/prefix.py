@@ -0,0 +1,310 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from bisect import bisect_left
+from typing import (cast,
+					Any,
+					Iterable,
+					Iterator,
+					List,
+					Optional,
+					Tuple,
+					Union,
+					)
+
+from py_hopscotch_dict import HopscotchDict
+
+from py_fast_trie.x_fast import XFastTrie
+
+
+class PrefixTable(object):
+	# Lookups binary search over every prefix length, not just the lengths in use,
+	# so the lengths a search passes through on its way to a prefix never change
+	# and the markers for each prefix can be kept up to date as prefixes come and go;
+	# every entry in the search tables holds the longest stored prefix matching it,
+	# so a search knows its best match so far whenever it moves on to longer prefixes,
+	# and counts the stored prefixes it is kept for, so it is dropped with the last of them
+	_entry_keys: List[List[int]]
+	_references: List[HopscotchDict]
+	_search_tables: List[HopscotchDict]
+
+	def _add_entry(self, key: int, length: int) -> None:
+		"""
+		Keep an entry in the search tables for one more stored prefix,
+		creating it with its longest match if no stored prefix needed it yet
+
+		:param key: The value of the leading bits the entry covers
+		:param length: The number of bits the entry covers
+		"""
+		references = self._references[length]
+
+		if key in references:
+			references[key] += 1
+		else:
+			references[key] = 1
+			self._search_tables[length][key] = self._longest_match(key, length)
+			keys = self._entry_keys[length]
+			keys.insert(bisect_left(keys, key), key)
+
+	def _covered_entries(self, prefix: int, length: int) -> Iterator[Tuple[HopscotchDict, int]]:
+		"""
+		Find the entries in the search tables longer than the given prefix that start with it
+
+		:param prefix: The prefix, as the value of its leading bits
+		:param length: The number of bits in the prefix
+		:return: The search table and key of every entry starting with the prefix
+		"""
+		for longer in range(length + 1, self._maxlen + 1):
+			keys = self._entry_keys[longer]
+			shift = longer - length
+			start = bisect_left(keys, prefix << shift)
+			end = bisect_left(keys, (prefix + 1) << shift, start)
+
+			for key in keys[start:end]:
+				yield (self._search_tables[longer], key)
+
+	def _drop_entry(self, key: int, length: int) -> None:
+		"""
+		Keep an entry in the search tables for one fewer stored prefix,
+		removing it once no stored prefix needs it
+
+		:param key: The value of the leading bits the entry covers
+		:param length: The number of bits the entry covers
+		"""
+		references = self._references[length]
+		references[key] -= 1
+
+		if references[key] == 0:
+			del references[key]
+			del self._search_tables[length][key]
+			keys = self._entry_keys[length]
+			del keys[bisect_left(keys, key)]
+
+	def _longest_match(self, prefix: int, length: int) -> Optional[Tuple[int, int]]:
+		"""
+		Find the longest stored prefix matching the start of the given prefix, by brute force
+
+		:param prefix: The prefix to match, as the value of its leading bits
+		:param length: The number of bits in the prefix to match
+		:return: The matching prefix's value and length,
+				 or None if no stored prefix matches
+		"""
+		for shorter in range(length, -1, -1):
+			candidate = prefix >> (length - shorter)
+
+			if candidate in self._prefixes[shorter]:
+				return (candidate, shorter)
+
+		return None
+
+	def _lookup(self, address: int) -> Optional[Tuple[int, int, Any]]:
+		"""
+		Find the longest stored prefix of an address, assuming it has already been validated
+
+		:param address: The address to match
+		:return: The matching prefix's value, length and payload,
+				 or None if no stored prefix matches
+		"""
+		tables = self._search_tables
+		best = None
+		low = 0
+		high = self._maxlen
+
+		while low <= high:
+			length = (low + high) // 2
+			prefix = address >> (self._maxlen - length)
+
+			if prefix in tables[length]:
+				best = tables[length][prefix] or best
+				low = length + 1
+			else:
+				high = length - 1
+
+		if best is None:
+			return None
+
+		prefix, length = best
+		return (prefix, length, self._prefixes[length][prefix])
+
+	def _marker_lengths(self, length: int) -> List[int]:
+		"""
+		Find the shorter lengths a search passes through on its way to the given length,
+		where a prefix of that length needs a marker to lead the search on
+
+		:param length: The length of a prefix
+		:return: The lengths the prefix needs markers on
+		"""
+		result: List[int] = []
+		low = 0
+		high = self._maxlen
+
+		while True:
+			middle = (low + high) // 2
+
+			if middle == length:
+				return result
+			elif middle < length:
+				result.append(middle)
+				low = middle + 1
+			else:
+				high = middle - 1
+
+	def _to_prefix(self, prefix: Union[int, bytes], length: int) -> int:
+		"""
+		Confirm a prefix could be stored in the table,
+		then convert it to the value of its leading bits
+
+		:param prefix: The prefix, as an address whose bits past the prefix length are unset
+		:param length: The number of bits in the prefix
+		:return: The value of the leading bits of the prefix
+		"""
+		address = XFastTrie._to_int(prefix, self._maxlen)
+
+		if not 0 <= length <= self._maxlen:
+			raise ValueError("Prefix length must be between 0 and {}".format(self._maxlen))
+
+		if address & ((1 << (self._maxlen - length)) - 1):
+			raise ValueError("Prefix has bits set past its length")
+
+		return address >> (self._maxlen - length)
+
+	def clear(self) -> None:
+		"""
+		Remove all prefixes from the table and return it to its starting state
+		"""
+		self._count = 0
+		self._prefixes = XFastTrie._make_level_tables(self._maxlen + 1)
+		self._search_tables = XFastTrie._make_level_tables(self._maxlen + 1)
+		self._references = XFastTrie._make_level_tables(self._maxlen + 1)
+		self._entry_keys = [[] for _ in range(self._maxlen + 1)]
+
+	def get(self, prefix: Union[int, bytes], length: int, default: Any=None) -> Any:
+		"""
+		Retrieve the value stored under exactly the given prefix
+
+		:param prefix: The prefix, as an address whose bits past the prefix length are unset
+		:param length: The number of bits in the prefix
+		:param default: The value to return if the prefix is not in the table
+		:return: The value stored under the given prefix, or the default
+		"""
+		return self._prefixes[length].get(self._to_prefix(prefix, length), default)
+
+	def insert(self, prefix: Union[int, bytes], length: int, value: Any) -> None:
+		"""
+		Store a value under a prefix, replacing any value already stored under it
+
+		:param prefix: The prefix, as an address whose bits past the prefix length are unset
+		:param length: The number of bits in the prefix
+		:param value: The value to store
+		"""
+		key = self._to_prefix(prefix, length)
+
+		# Search entries only refer to stored prefixes, so replacing a value leaves them alone
+		if key in self._prefixes[length]:
+			self._prefixes[length][key] = value
+			return
+
+		self._count += 1
+		self._prefixes[length][key] = value
+
+		for marker_length in self._marker_lengths(length):
+			self._add_entry(key >> (length - marker_length), marker_length)
+
+		self._add_entry(key, length)
+		self._search_tables[length][key] = (key, length)
+
+		# The new prefix is now the longest match of the entries under it
+		# that only matched shorter prefixes before
+		for (table, marker) in self._covered_entries(key, length):
+			best = table[marker]
+
+			if best is None or best[1] < length:
+				table[marker] = (key, length)
+
+	def lookup(self, address: Union[int, bytes], default: Any=None) -> Any:
+		"""
+		Find the value of the longest prefix in the table matching the given address,
+		in a number of hash table probes logarithmic in the address length
+
+		:param address: The address to match
+		:param default: The value to return if no prefix matches
+		:return: The value of the longest matching prefix, or the default
+		"""
+		match = self._lookup(XFastTrie._to_int(address, self._maxlen))
+		return match[2] if match is not None else default
+
+	def lookup_many(self, addresses: Iterable[Union[int, bytes]], default: Any=None) -> List[Any]:
+		"""
+		Find the values of the longest matching prefixes of a batch of addresses
+
+		:param addresses: The addresses to match
+		:param default: The value to use for addresses no prefix matches
+		:return: The value of the longest prefix matching each address, in order
+		"""
+		matches = [self._lookup(address) for address in XFastTrie._to_ints(addresses, self._maxlen)]
+		return [match[2] if match is not None else default for match in matches]
+
+	def lookup_prefix(self, address: Union[int, bytes]) -> Optional[Tuple[int, int, Any]]:
+		"""
+		Find the longest prefix in the table matching the given address
+
+		:param address: The address to match
+		:return: The matching prefix as an address, its length and its value,
+				 or None if no prefix matches
+		"""
+		match = self._lookup(XFastTrie._to_int(address, self._maxlen))
+
+		if match is None:
+			return None
+
+		prefix, length, value = match
+		return (prefix << (self._maxlen - length), length, value)
+
+	def remove(self, prefix: Union[int, bytes], length: int) -> None:
+		"""
+		Remove the given prefix from the table
+
+		:param prefix: The prefix, as an address whose bits past the prefix length are unset
+		:param length: The number of bits in the prefix
+		"""
+		key = self._to_prefix(prefix, length)
+
+		if key not in self._prefixes[length]:
+			raise ValueError("Prefix does not exist in table")
+
+		del self._prefixes[length][key]
+		self._count -= 1
+
+		# Entries that matched the removed prefix best now match the next longest prefix
+		# matching it instead, which is the same for all of them
+		replacement = self._longest_match(key, length)
+
+		for (table, marker) in self._covered_entries(key, length):
+			if table[marker] == (key, length):
+				table[marker] = replacement
+
+		self._drop_entry(key, length)
+
+		if key in self._search_tables[length]:
+			self._search_tables[length][key] = replacement
+
+		for marker_length in self._marker_lengths(length):
+			self._drop_entry(key >> (length - marker_length), marker_length)
+
+	def __init__(self, max_length: int=32) -> None:
+		self._maxlen = max_length
+		self.clear()
+
+	def __iter__(self) -> Iterator[Tuple[int, int, Any]]:
+		for (length, table) in enumerate(self._prefixes):
+			for prefix in sorted(cast(Iterable[int], table.keys())):
+				yield (prefix << (self._maxlen - length), length, table[prefix])
+
+	def __len__(self) -> int:
+		return self._count
@@ -0,0 +1,179 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from bisect import bisect_left, bisect_right
+from typing import (Iterable,
+					List,
+					Tuple,
+					)
+
+
+# Blocks are split in half once they hold twice this many subtrees
+BLOCK_SIZE = 64
+
+
+class RankIndex(object):
+	# The subtrees of a trie are kept in order of representative in a list of blocks,
+	# each holding a sorted run of representatives and the number of values in each subtree,
+	# with a Fenwick tree over the totals of the blocks counting the values before any block;
+	# subtrees come and go by inserting into or deleting from a single block,
+	# and the Fenwick tree, with only one entry per block, is only rebuilt
+	# when a block is split or emptied
+
+	def _find(self, rep: int) -> Tuple[int, int]:
+		"""
+		Find where a representative goes in the index
+
+		:param rep: The representative to find
+		:return: The position of the block the representative goes in,
+				 and its position in that block
+		"""
+		block = max(bisect_right(self._firsts, rep) - 1, 0)
+		return (block, bisect_left(self._reps[block], rep))
+
+	def _adjust(self, block: int, delta: int) -> None:
+		"""
+		Account for a change in the total of a block in the Fenwick tree
+
+		:param block: The position of the block that changed
+		:param delta: The change in the number of values in the block
+		"""
+		position = block + 1
+
+		while position < len(self._tree):
+			self._tree[position] += delta
+			position += position & -position
+
+	def _rebuild(self) -> None:
+		"""
+		Rebuild the first representative of every block and the Fenwick tree over their totals
+		after blocks are added or dropped
+		"""
+		self._firsts = [reps[0] for reps in self._reps]
+		tree = [0] * (len(self._reps) + 1)
+
+		for (position, weights) in enumerate(self._weights, 1):
+			tree[position] += sum(weights)
+			parent = position + (position & -position)
+
+			if parent < len(tree):
+				tree[parent] += tree[position]
+
+		self._tree = tree
+
+	def add(self, rep: int, delta: int) -> None:
+		"""
+		Account for values added to or removed from a subtree
+
+		:param rep: The representative of the subtree that changed
+		:param delta: The change in the number of values in the subtree
+		"""
+		block, position = self._find(rep)
+		self._weights[block][position] += delta
+		self._adjust(block, delta)
+
+	def count_before(self, rep: int) -> int:
+		"""
+		Count the values in every subtree before a subtree
+
+		:param rep: The representative of the subtree
+		:return: The number of values in subtrees with smaller representatives
+		"""
+		block, position = self._find(rep)
+		result = sum(self._weights[block][:position])
+
+		while block > 0:
+			result += self._tree[block]
+			block -= block & -block
+
+		return result
+
+	def insert(self, rep: int, weight: int) -> None:
+		"""
+		Add a subtree to the index
+
+		:param rep: The representative of the subtree
+		:param weight: The number of values in the subtree
+		"""
+		if not self._reps:
+			self._reps.append([rep])
+			self._weights.append([weight])
+			self._rebuild()
+			return
+
+		block, position = self._find(rep)
+		reps = self._reps[block]
+		reps.insert(position, rep)
+		self._weights[block].insert(position, weight)
+
+		if len(reps) > 2 * BLOCK_SIZE:
+			weights = self._weights[block]
+			self._reps[block:block + 1] = [reps[:BLOCK_SIZE], reps[BLOCK_SIZE:]]
+			self._weights[block:block + 1] = [weights[:BLOCK_SIZE], weights[BLOCK_SIZE:]]
+			self._rebuild()
+		else:
+			self._firsts[block] = reps[0]
+			self._adjust(block, weight)
+
+	def locate(self, rank: int) -> Tuple[int, int]:
+		"""
+		Find the subtree holding the value with the given rank
+
+		:param rank: The number of values smaller than the desired one,
+					 less than the number of values in the index
+		:return: The representative of the subtree holding the desired value,
+				 and the number of values in that subtree smaller than it
+		"""
+		block = 0
+		step = 1 << (len(self._tree) - 1).bit_length()
+
+		# Descend the Fenwick tree to the last block whose predecessors hold at most rank values
+		while step > 0:
+			next_block = block + step
+
+			if next_block < len(self._tree) and self._tree[next_block] <= rank:
+				block = next_block
+				rank -= self._tree[next_block]
+
+			step >>= 1
+
+		for (rep, weight) in zip(self._reps[block], self._weights[block]):
+			if rank < weight:
+				break
+
+			rank -= weight
+
+		return (rep, rank)
+
+	def remove(self, rep: int) -> None:
+		"""
+		Drop a subtree from the index
+
+		:param rep: The representative of the subtree
+		"""
+		block, position = self._find(rep)
+		reps = self._reps[block]
+		del reps[position]
+		weight = self._weights[block].pop(position)
+
+		if not reps:
+			del self._reps[block]
+			del self._weights[block]
+			self._rebuild()
+		else:
+			self._firsts[block] = reps[0]
+			self._adjust(block, -weight)
+
+	def __init__(self, subtrees: Iterable[Tuple[int, int]]=()) -> None:
+		entries = list(subtrees)
+		self._reps: List[List[int]] = [[rep for (rep, _) in entries[start:start + BLOCK_SIZE]]
+									   for start in range(0, len(entries), BLOCK_SIZE)]
+		self._weights: List[List[int]] = [[weight for (_, weight) in entries[start:start + BLOCK_SIZE]]
+										  for start in range(0, len(entries), BLOCK_SIZE)]
+		self._rebuild()
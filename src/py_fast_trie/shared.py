@@ -0,0 +1,394 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from array import array
+from bisect import bisect_left, bisect_right
+from sys import maxsize
+from types import TracebackType
+from typing import (cast,
+					Iterable,
+					Iterator,
+					List,
+					Optional,
+					Type,
+					Union,
+					)
+
+from py_fast_trie.x_fast import XFastTrie
+
+try:
+	from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # pragma: no cover
+	SharedMemory = None  # type: ignore
+
+
+# Marks a shared memory block as holding a trie, and the version of its layout
+SHARED_TRIE_MAGIC = 0x7079667374726901
+HEADER_WORDS = 4
+
+
+class SharedTrie(object):
+	# The block holds a header, then every value in ascending order split into buckets
+	# like the subtrees of a Y-fast trie, then the largest value of every bucket;
+	# queries search the bucket maxima and then a single bucket in place,
+	# so attaching processes never build objects of their own from the block
+	_block: "SharedMemory"
+	_closed: bool
+	_keys: memoryview
+	_reps: memoryview
+	_words: memoryview
+
+	# Every value is stored as an unsigned 64-bit word
+	max_supported_length = 64
+
+	@classmethod
+	def attach(cls, name: str) -> "SharedTrie":
+		"""
+		Open a trie another process has published
+
+		:param name: The name of the shared memory block holding the trie
+		:return: A view of the published trie
+		"""
+		if SharedMemory is None:  # pragma: no cover
+			raise RuntimeError("Shared tries require multiprocessing.shared_memory (Python 3.8+)")
+
+		return cls(SharedMemory(name=name), False)
+
+	@classmethod
+	def publish(cls,
+				values: Iterable[Union[int, bytes]],
+				max_length: int=(maxsize.bit_length() + 1),
+				name: Optional[str]=None) -> "SharedTrie":
+		"""
+		Copy a collection of values, such as another trie, into a new block of shared memory;
+		the publishing process owns the block and should unlink it once every process is done with it
+
+		:param values: The values to publish
+		:param max_length: The maximum bit length of a value in the trie
+		:param name: The name to give the shared memory block,
+					 or None to have one chosen at random
+		:return: A view of the published trie
+		"""
+		if SharedMemory is None:  # pragma: no cover
+			raise RuntimeError("Shared tries require multiprocessing.shared_memory (Python 3.8+)")
+
+		if max_length > cls.max_supported_length:
+			raise ValueError("Shared tries can hold values of at most {} bits".format(cls.max_supported_length))
+
+		keys = sorted(XFastTrie._to_ints(values, max_length))
+		bucket_size = 2 * max_length
+		reps = keys[bucket_size - 1::bucket_size]
+
+		if len(keys) % bucket_size:
+			reps.append(keys[-1])
+
+		words = array("Q", [SHARED_TRIE_MAGIC, max_length, len(keys), bucket_size] + keys + reps)
+		block = SharedMemory(name=name, create=True, size=len(words) * words.itemsize)
+		cast(memoryview, block.buf)[:len(words) * words.itemsize] = words.tobytes()
+
+		return cls(block, True)
+
+	def _index_left(self, value: int) -> int:
+		"""
+		Find how many values in the trie are strictly less than the given value
+
+		:param value: The value to search for
+		:return: The index of the first value not less than the given value
+		"""
+		bucket = bisect_left(self._reps, value)
+
+		if bucket == len(self._reps):
+			return self._count
+
+		start = bucket * self._bucket_size
+		return bisect_left(self._keys, value, start, min(start + self._bucket_size, self._count))
+
+	def _index_right(self, value: int) -> int:
+		"""
+		Find how many values in the trie are at most as large as the given value
+
+		:param value: The value to search for
+		:return: The index of the first value greater than the given value
+		"""
+		bucket = bisect_right(self._reps, value)
+
+		if bucket == len(self._reps):
+			return self._count
+
+		start = bucket * self._bucket_size
+		return bisect_right(self._keys, value, start, min(start + self._bucket_size, self._count))
+
+	def _key(self, index: int) -> Optional[int]:
+		"""
+		Read the value at the given position in the trie, if the position exists
+
+		:param index: The position of the value, in ascending order
+		:return: The value at the given position, or None if there is no such position
+		"""
+		return self._keys[index] if 0 <= index < self._count else None
+
+	def _get_nearest(self, value: int) -> int:
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to search for
+		:return: The value in the trie closest to the given value
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		index = self._index_left(value)
+		below = self._key(index - 1)
+		above = self._key(index)
+
+		if above is None or (below is not None and value - below <= above - value):
+			return cast(int, below)
+		else:
+			return above
+
+	def ceiling(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the trie at least as large as the given value,
+		if it exists
+
+		:param value: The value to find the ceiling of
+		:return: The ceiling of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._key(self._index_left(value))
+
+	def ceiling_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional[int]]:
+		"""
+		Find the ceilings of a batch of values
+
+		:param values: The values to find the ceilings of
+		:return: The ceiling of each value, in order
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return [self._key(self._index_left(value)) for value in XFastTrie._to_ints(values, self._maxlen)]
+
+	def close(self) -> None:
+		"""
+		Stop using the shared memory block in this process;
+		the trie cannot be queried afterwards, but the block can still be unlinked
+		"""
+		if not self._closed:
+			for view in (self._keys, self._reps, self._words):
+				view.release()
+
+			self._block.close()
+			self._closed = True
+
+	def count(self, value: Union[int, bytes]) -> int:
+		"""
+		Count how many times the given value is held in the trie
+
+		:param value: The value to count
+		:return: The multiplicity of the given value in the trie
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+		return self._index_right(value) - self._index_left(value)
+
+	def floor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the trie at most as large as the given value,
+		if it exists
+
+		:param value: The value to find the floor of
+		:return: The floor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._key(self._index_right(value) - 1)
+
+	def floor_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional[int]]:
+		"""
+		Find the floors of a batch of values
+
+		:param values: The values to find the floors of
+		:return: The floor of each value, in order
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return [self._key(self._index_right(value) - 1) for value in XFastTrie._to_ints(values, self._maxlen)]
+
+	def nearest(self, value: Union[int, bytes]) -> int:
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to find the nearest neighbor of
+		:return: The value in the trie closest to the given value
+		"""
+		return self._get_nearest(XFastTrie._to_int(value, self._maxlen))
+
+	def nearest_many(self, values: Iterable[Union[int, bytes]]) -> List[int]:
+		"""
+		Find the nearest neighbors of a batch of values
+
+		:param values: The values to find the nearest neighbors of
+		:return: The nearest neighbor of each value, in order
+		"""
+		return [self._get_nearest(value) for value in XFastTrie._to_ints(values, self._maxlen)]
+
+	def predecessor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the trie strictly less than the given value,
+		if it exists
+
+		:param value: The value to find the predecessor of
+		:return: The predecessor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._key(self._index_left(value) - 1)
+
+	def rank(self, value: Union[int, bytes]) -> int:
+		"""
+		Count the values in the trie strictly less than the given value
+
+		:param value: The value to find the rank of
+		:return: The number of values in the trie smaller than the given value
+		"""
+		return self._index_left(XFastTrie._to_int(value, self._maxlen))
+
+	def select(self, rank: int) -> int:
+		"""
+		Find the value with the given rank in the trie
+
+		:param rank: The position of the value in ascending order;
+					 negative ranks count back from the largest value
+		:return: The value with the given rank
+		"""
+		if rank < 0:
+			rank += self._count
+
+		if not 0 <= rank < self._count:
+			raise IndexError("Rank out of range")
+
+		return self._keys[rank]
+
+	def successor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value,
+		if it exists
+
+		:param value: The value to find the successor of
+		:return: The successor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._key(self._index_right(value))
+
+	def unlink(self) -> None:
+		"""
+		Destroy the shared memory block once every process has closed it;
+		only the publishing process should do this, before or after closing the trie itself
+		"""
+		if not self._owner:
+			raise ValueError("Only the process that published the trie can unlink it")
+
+		self._block.unlink()
+
+	@property
+	def max(self) -> Optional[int]:
+		"""
+		The maximum value in the trie
+
+		:return: The maximum value in the trie,
+				 or None if the trie is empty
+		"""
+		return self._key(self._count - 1)
+
+	@property
+	def min(self) -> Optional[int]:
+		"""
+		The minimum value in the trie
+
+		:return: The minimum value in the trie,
+				 or None if the trie is empty
+		"""
+		return self._key(0)
+
+	@property
+	def name(self) -> str:
+		"""
+		The name other processes use to attach to the trie
+
+		:return: The name of the shared memory block holding the trie
+		"""
+		return self._name
+
+	def __init__(self, block: "SharedMemory", owner: bool) -> None:
+		words = cast(memoryview, block.buf).cast("Q")
+
+		if words[0] != SHARED_TRIE_MAGIC:
+			words.release()
+			block.close()
+			raise ValueError("Shared memory block {} does not hold a trie".format(block.name))
+
+		self._block = block
+		self._closed = False
+		self._name = block.name
+		self._owner = owner
+		self._maxlen = words[1]
+		self._count = words[2]
+		self._bucket_size = words[3]
+		self._words = words
+		self._keys = words[HEADER_WORDS:HEADER_WORDS + self._count]
+		self._reps = words[HEADER_WORDS + self._count:
+						   HEADER_WORDS + self._count + -(-self._count // self._bucket_size)]
+
+	def __contains__(self, value: Union[int, bytes]) -> bool:
+		return self.count(value) > 0
+
+	def __enter__(self) -> "SharedTrie":
+		return self
+
+	def __exit__(self,
+				 exc_type: Optional[Type[BaseException]],
+				 exc_value: Optional[BaseException],
+				 traceback: Optional[TracebackType]) -> None:
+		self.close()
+
+	def __getitem__(self, index: Union[int, slice]) -> Union[int, List[int]]:
+		if isinstance(index, slice):
+			return self._keys[index].tolist()
+
+		return self.select(index)
+
+	def __gt__(self, value: Union[int, bytes]) -> Optional[int]:
+		return self.successor(value)
+
+	def __iter__(self) -> Iterator[int]:
+		for key in self._keys:
+			yield key
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __lt__(self, value: Union[int, bytes]) -> Optional[int]:
+		return self.predecessor(value)
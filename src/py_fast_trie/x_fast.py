@@ -7,19 +7,67 @@
 #       Released under version 3.0 of the Non-Profit Open Source License       #
 ################################################################################
 
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import chain
+from os import cpu_count
 from sys import maxsize
 from typing import (cast,
+					Any,
 					Iterable,
+					Iterator,
 					List,
+					Mapping,
 					Optional,
 					Tuple,
+					TYPE_CHECKING,
 					Union,
 					)
 
 from py_hopscotch_dict import HopscotchDict
 
+from py_fast_trie.cache import ResultCache
+from py_fast_trie.parallel import (adopt_values,
+								   build_shard,
+								   index_table,
+								   pack_values,
+								   paused_collection,
+								   run_tasks,
+								   )
+
+if TYPE_CHECKING:  # pragma: no cover
+	from py_fast_trie.journal import Journal
+
+
+# The number of levels adaptive tries start with, before any value needs more
+ADAPTIVE_INITIAL_LENGTH = 8
+
 
 class TrieNode(object):
+	# Only leaves of mapping tries carry data, and only leaves of multisets
+	# hold a value more than once, so most nodes fall back to the class defaults;
+	# internal nodes only track the size of their subtree if the trie asks them to
+	_data: Any = None
+	_multiplicity = 1
+	_size = 0
+
+	def _get_count(self) -> int:
+		"""
+		The number of times the value of the current node is held, if it is a leaf
+
+		:return: The current node's multiplicity
+		"""
+		return self._multiplicity
+
+	def _get_data(self) -> Any:
+		"""
+		The data associated with the current node, if it is a leaf in a mapping trie
+
+		:return: The current node's data, or None
+		"""
+		return self._data
+
 	def _get_leaf(self) -> bool:
 		"""
 		Indicated whether or not the node is a leaf
@@ -61,6 +109,15 @@ class TrieNode(object):
 		"""
 		return self._right
 
+	def _get_size(self) -> int:
+		"""
+		The number of values held under the current node, if it is an internal node
+		of a trie that tracks the size of its prefixes
+
+		:return: The size of the current node's subtree
+		"""
+		return self._size
+
 	def _get_value(self) -> Optional[int]:
 		"""
 		The value of the current node, expressed as an integer
@@ -84,6 +141,22 @@ class TrieNode(object):
 
 		return "".join(reversed(result))
 
+	def _set_count(self, new_count: int) -> None:
+		"""
+		Sets the number of times the value of the current node is held
+
+		:param new_count: The current node's multiplicity
+		"""
+		self._multiplicity = new_count
+
+	def _set_data(self, new_data: Any) -> None:
+		"""
+		Sets the data associated with the current node
+
+		:param new_data: The data the current node should carry
+		"""
+		self._data = new_data
+
 	def _set_left(self, new_left: Optional["TrieNode"]) -> None:
 		"""
 		Sets the left child of the current node
@@ -100,6 +173,14 @@ class TrieNode(object):
 		"""
 		self._parent = new_parent
 
+	def _set_size(self, new_size: int) -> None:
+		"""
+		Sets the number of values held under the current node
+
+		:param new_size: The size of the current node's subtree
+		"""
+		self._size = new_size
+
 	def _set_right(self, new_right: Optional["TrieNode"]) -> None:
 		"""
 		Sets the left child of the current node
@@ -108,7 +189,10 @@ class TrieNode(object):
 		"""
 		self._right = new_right
 
+	count = property(_get_count, _set_count)
+	data = property(_get_data, _set_data)
 	leaf = property(_get_leaf)
+	size = property(_get_size, _set_size)
 	value = property(_get_value)
 	value_bits = property(_get_value_bitstring)
 	parent = property(_get_parent, _set_parent)
@@ -133,6 +217,10 @@ class TrieNode(object):
 
 
 class XFastTrie(object):
+	_adaptive: bool
+	_cache: Optional[ResultCache] = None
+	_journal: Optional["Journal"] = None
+
 	@staticmethod
 	def _make_level_tables(levels: int) -> List[HopscotchDict]:
 		"""
@@ -172,16 +260,114 @@ class XFastTrie(object):
 		else:
 			raise TypeError("Only integers and byte sequences can be stored in trie")
 
+	@staticmethod
+	def _to_ints(values: Iterable[Union[int, bytes]],
+				 length: int) -> List[int]:
+		"""
+		Convert a batch of values to the canonical value format,
+		validating all of them before any is used
+
+		:param values: The values to be converted; array-likes such as NumPy arrays
+					   are converted to lists of Python integers first
+		:param length: The maximum bit length of a value in the trie
+		:return: The values converted to ints, in their original order
+		"""
+		if hasattr(values, "tolist"):
+			values = values.tolist()
+
+		return [XFastTrie._to_int(value, length) for value in values]
+
 	def clear(self) -> None:
 		"""
 		Empty the trie of all values
 		"""
+		if self._adaptive:
+			self._maxlen = min(self._length_limit, ADAPTIVE_INITIAL_LENGTH)
+
 		self._count = 0
 		self._level_tables = self._make_level_tables(self._maxlen)
 		self._min: Optional["TrieNode"] = None
 		self._max: Optional["TrieNode"] = None
 		self._root = TrieNode(None, False)
 
+		if self._journal is not None:
+			self._journal._log_clear()
+
+		if self._cache is not None:
+			self._cache.clear()
+
+	def _to_key(self, value: Union[int, bytes]) -> int:
+		"""
+		Convert a value to the canonical value format; an adaptive trie accepts values
+		too big for its current levels, which are larger than every value in the trie
+
+		:param value: The value to be converted
+		:return: The value converted to an int
+		"""
+		return self._to_int(value, self._length_limit)
+
+	def _fit(self, value: int) -> int:
+		"""
+		Widen an adaptive trie first if a value about to be added
+		is too big for its current levels
+
+		:param value: The value the trie needs to hold, in the canonical value format
+		:return: The given value
+		"""
+		if value.bit_length() > self._maxlen:
+			self._widen(value.bit_length())
+
+		return value
+
+	def _fit_all(self, values: List[int]) -> List[int]:
+		"""
+		Widen an adaptive trie first if any of a batch of values about to be added
+		is too big for its current levels
+
+		:param values: The values the trie needs to hold, in the canonical value format
+		:return: The given values
+		"""
+		length = max(values).bit_length() if values else 0
+
+		if length > self._maxlen:
+			self._widen(length)
+
+		return values
+
+	def _to_keys(self, values: Iterable[Union[int, bytes]]) -> List[int]:
+		"""
+		Convert a batch of values to the canonical value format
+
+		:param values: The values to be converted
+		:return: The values converted to ints, in their original order
+		"""
+		return self._to_ints(values, self._length_limit)
+
+	def _widen(self, length: int) -> None:
+		"""
+		Add levels to the top of an adaptive trie so it can hold values of the given bit length;
+		the trie at least doubles in length each time, so it widens only a few times in its life
+
+		:param length: The bit length of the largest value the trie needs to hold
+		"""
+		length = min(self._length_limit, max(length, 2 * self._maxlen))
+		added = length - self._maxlen
+
+		# Every value in the trie is too short to set any of the new leading bits,
+		# so existing nodes keep their prefixes and only move down the trie,
+		# under a chain of new nodes for the prefix 0 built by repairing the paths
+		# to the smallest and largest values
+		self._level_tables[:0] = self._make_level_tables(added)
+		self._maxlen = length
+
+		if self._count > 0:
+			self._repair_prefixes(sorted({cast(int, cast(TrieNode, self._min).value),
+										  cast(int, cast(TrieNode, self._max).value)}))
+
+			if self._track_prefixes:
+				for table in self._level_tables[:added]:
+					table[0].size = self._count
+
 	def _get_closest_ancestor(self, value: int) -> Tuple[TrieNode, int]:
 		"""
 		Find the node in the trie with the longest prefix that matches the given value
@@ -217,6 +403,11 @@ class XFastTrie(object):
 		:return: The leaf with the closest value to the given value
 		"""
 		result = None
+
+		# Values too big for an adaptive trie's current levels are larger than every leaf
+		if value >> self._maxlen:
+			return self._max
+
 		ancestor, level = self._get_closest_ancestor(value)
 
 		# The value is stored in the trie and therefore is the closest leaf to itself
@@ -240,22 +431,436 @@ class XFastTrie(object):
 					result = candidate
 		return result
 
-	def insert(self, value: Union[int, bytes]) -> None:
+	def _get_nearest_leaf(self, value: int) -> "TrieNode":
 		"""
-		Add the given value to the trie
+		Find the leaf with the value closest to the given value,
+		preferring the smaller value if two leaves are equally close
+
+		:param value: The value to search for
+		:return: The leaf with the value closest to the given value
+		"""
+		node = self._get_closest_leaf(value)
+
+		if node is None:
+			raise ValueError("No values exist in trie")
+
+		# The search only guarantees a closest leaf, so settle ties in favor of the smaller one
+		if node.value > value and node.pred is not None:
+			if value - node.pred.value <= node.value - value:
+				node = node.pred
+
+		elif node.value < value and node.succ is not None:
+			if node.succ.value - value < value - node.value:
+				node = node.succ
+
+		return node
+
+	def _get_ceiling_leaf(self, value: int) -> Optional["TrieNode"]:
+		"""
+		Find the leaf with the smallest value at least as large as the given value
+
+		:param value: The value to search for
+		:return: The leaf with the smallest value not less than the given value,
+				 or None if no such leaf exists
+		"""
+		node = self._get_closest_leaf(value)
+
+		if node is None:
+			raise ValueError("No values exist in trie")
+
+		return node if node.value >= value else node.succ
+
+	def _get_floor_leaf(self, value: int) -> Optional["TrieNode"]:
+		"""
+		Find the leaf with the largest value at most as large as the given value
+
+		:param value: The value to search for
+		:return: The leaf with the largest value not greater than the given value,
+				 or None if no such leaf exists
+		"""
+		node = self._get_closest_leaf(value)
+
+		if node is None:
+			raise ValueError("No values exist in trie")
+
+		return node if node.value <= value else node.pred
+
+	def _get_prefix_node(self,
+						 prefix: Union[int, bytes],
+						 bits: int) -> Tuple[Optional["TrieNode"], int, int]:
+		"""
+		Validate a prefix, then find the node holding every value in the trie that starts with it
+
+		:param prefix: The prefix, as the value of the leading bits it covers
+		:param bits: The number of bits in the prefix
+		:return: The node for the given prefix, or None if no value starts with it,
+				 and the prefix and its length in bits as seen by the trie's current levels
+		"""
+		if not 0 < bits <= self._length_limit:
+			raise ValueError("Prefix length must be between 1 and {}".format(self._length_limit))
+
+		prefix = self._to_int(prefix, bits)
+
+		# Prefixes are relative to the full value length, but an adaptive trie
+		# has no levels for leading bits none of its values have set yet
+		bits -= self._length_limit - self._maxlen
+
+		if bits > 0:
+			return (self._level_tables[bits - 1].get(prefix) if prefix >> bits == 0 else None, prefix, bits)
+		else:
+			return (self._root if prefix == 0 and self._count > 0 else None, 0, 0)
+
+	def _get_prefix_min_leaf(self, prefix: Union[int, bytes], bits: int) -> Optional["TrieNode"]:
+		"""
+		Find the leaf with the smallest value in the trie starting with the given prefix
+
+		:param prefix: The prefix, as the value of the leading bits it covers
+		:param bits: The number of bits in the prefix
+		:return: The leaf with the smallest value starting with the given prefix,
+				 or None if no value in the trie starts with it
+		"""
+		node, prefix, bits = self._get_prefix_node(prefix, bits)
+
+		if node is None or node.leaf:
+			return node
+
+		# A node without a left child points straight at the smallest leaf under it
+		elif node.left.parent is not node:
+			return cast(TrieNode, node.left)
+
+		# Otherwise the deepest node on the path to the prefix followed by all 0s
+		# is missing its left child, and points at the same leaf instead
+		ancestor, _ = self._get_closest_ancestor(prefix << (self._maxlen - bits))
+		return cast(TrieNode, ancestor if ancestor.leaf else ancestor.left)
+
+	def _adjust_prefix_sizes(self, value: int, delta: int) -> None:
+		"""
+		Update the subtree size of every internal node above the given value,
+		assuming the trie tracks prefix sizes and the nodes above the value are up to date
+
+		:param value: The value added to or removed from the trie
+		:param delta: The change in the number of times the value is held
+		"""
+		for level in range(self._maxlen - 1):
+			node = self._level_tables[level].get(value >> (self._maxlen - level - 1))
+
+			# Nodes left without values have already been removed from the trie
+			if node is None:
+				break
+
+			node.size += delta
+
+	def _insert_sorted(self, values: List[int]) -> None:
+		"""
+		Add a batch of values to the trie, splicing every new leaf into the leaf list first
+		and only then creating and repointing the internal nodes above them
+
+		:param values: The values to add to the trie, validated and in ascending order
+		"""
+		if self._journal is not None:
+			self._journal._log_insert_many(values)
+
+		if self._cache is not None:
+			self._cache.invalidate()
+
+		leaves = self._level_tables[-1]
+		added = []
+		counted = []
+		last_added: Optional[TrieNode] = None
+
+		for value in values:
+			leaf_node = leaves.get(value)
+
+			if leaf_node is not None:
+				if self._multiset:
+					leaf_node.count += 1
+					self._count += 1
+					counted.append(value)
+				continue
+
+			# Internal nodes are not updated until the end of the batch,
+			# so the search only sees the leaves that were in the trie beforehand;
+			# the descendant pointer it ends at is one of the value's neighbors among them
+			ancestor, level = self._get_closest_ancestor(value)
+			direction = value >> (self._maxlen - level - 2) & 1
+			descendant = ancestor.left if direction == 0 else ancestor.right
+
+			if descendant is None:
+				leaf_pred = last_added
+			elif descendant.value > value:
+				leaf_pred = descendant.pred
+			elif last_added is not None and last_added.value > descendant.value:
+				leaf_pred = last_added
+			else:
+				leaf_pred = descendant
+
+			leaf_succ = leaf_pred.succ if leaf_pred is not None else self._min
+			leaf_node = TrieNode(value, True, leaf_pred, leaf_succ)
+			leaves[value] = leaf_node
+
+			if leaf_pred is not None:
+				leaf_pred.succ = leaf_node
+			else:
+				self._min = leaf_node
+
+			if leaf_succ is not None:
+				leaf_succ.pred = leaf_node
+			else:
+				self._max = leaf_node
+
+			added.append(value)
+			counted.append(value)
+			last_added = leaf_node
+			self._count += 1
+
+		if added:
+			self._repair_prefixes(added)
+
+		if self._track_prefixes:
+			for value in counted:
+				self._adjust_prefix_sizes(value, 1)
+
+	def _remove_sorted(self, values: List[int]) -> None:
+		"""
+		Remove a batch of values from the trie, cutting every leaf out of the leaf list first
+		and only then repointing and deleting the internal nodes above them;
+		values not in the trie are ignored
+
+		:param values: The values to remove from the trie, validated and in ascending order
+		"""
+		if self._journal is not None:
+			self._journal._log_remove_many(values)
+
+		if self._cache is not None:
+			self._cache.invalidate()
+
+		leaves = self._level_tables[-1]
+		removed = []
+		counted = []
+
+		for value in values:
+			leaf_node = leaves.get(value)
+
+			if leaf_node is None:
+				continue
+
+			self._count -= 1
+			counted.append(value)
+
+			if leaf_node.count > 1:
+				leaf_node.count -= 1
+				continue
+
+			leaf_pred = leaf_node.pred
+			leaf_succ = leaf_node.succ
+			del leaves[value]
+
+			if leaf_pred is not None:
+				leaf_pred.succ = leaf_succ
+			else:
+				self._min = leaf_succ
+
+			if leaf_succ is not None:
+				leaf_succ.pred = leaf_pred
+			else:
+				self._max = leaf_pred
+
+			removed.append(value)
+
+		if removed:
+			self._repair_prefixes(removed)
+
+		if self._track_prefixes:
+			for value in counted:
+				self._adjust_prefix_sizes(value, -1)
+
+	def _remove_range(self, low: int, high: int) -> int:
+		"""
+		Remove every value in the trie from the given lower bound up to, but not including,
+		the given upper bound, assuming both have already been validated
+
+		:param low: The smallest value to remove
+		:param high: The value to stop removing at
+		:return: The number of values removed
+		"""
+		if self._count == 0 or low >= high:
+			return 0
+
+		first = self._get_ceiling_leaf(low)
+
+		if first is None or cast(int, first.value) >= high:
+			return 0
+
+		if self._journal is not None:
+			self._journal._log_remove_range(low, high)
+
+		if self._cache is not None:
+			self._invalidate_results(low, high - 1)
+
+		leaf_pred = first.pred
+		leaf_succ: Optional[TrieNode] = first
+		leaves = self._level_tables[-1]
+		values = []
+		counts = []
+		removed = 0
+
+		# Only the leaves themselves are visited one by one
+		while leaf_succ is not None and cast(int, leaf_succ.value) < high:
+			values.append(cast(int, leaf_succ.value))
+			counts.append(leaf_succ.count)
+			removed += leaf_succ.count
+			del leaves[leaf_succ.value]
+			leaf_succ = leaf_succ.succ
+
+		# Cut the removed leaves out of the linked list in one go
+		if leaf_pred is not None:
+			leaf_pred.succ = leaf_succ
+		else:
+			self._min = leaf_succ
+
+		if leaf_succ is not None:
+			leaf_succ.pred = leaf_pred
+		else:
+			self._max = leaf_pred
+
+		self._repair_prefixes(values)
+		self._count -= removed
+
+		if self._track_prefixes:
+			for (value, count) in zip(values, counts):
+				self._adjust_prefix_sizes(value, -count)
+
+		return removed
+
+	def _repair_prefixes(self, values: List[int]) -> None:
+		"""
+		Bring every internal node above the given leaves in line with the leaf table,
+		creating, repointing and deleting nodes as necessary;
+		each affected prefix is visited once, lowest level first,
+		so every node can rely on the nodes below it being correct
+
+		:param values: The values of leaves added to or removed from the trie, in ascending order
+		"""
+		prefixes = values
+
+		for level in reversed(range(self._maxlen - 1)):
+			table = self._level_tables[level]
+			children = self._level_tables[level + 1]
+			parent_prefixes: List[int] = []
+
+			for prefix in prefixes:
+				prefix >>= 1
+
+				if parent_prefixes and parent_prefixes[-1] == prefix:
+					continue
+
+				parent_prefixes.append(prefix)
+				left_child = children.get(prefix << 1)
+				right_child = children.get(prefix << 1 | 1)
+				node = table.get(prefix)
+
+				# Node has no children, delete it
+				if left_child is None and right_child is None:
+					if node is not None:
+						del table[prefix]
+					continue
+
+				if node is None:
+					node = TrieNode(prefix, False)
+					table[prefix] = node
+
+				# A missing child is replaced by a descendant pointer
+				# to the closest leaf on the other leg
+				if left_child is not None:
+					node.left = left_child
+					left_child.parent = node
+				else:
+					descendant = right_child
+					while not descendant.leaf:
+						descendant = descendant.left
+					node.left = descendant
+
+				if right_child is not None:
+					node.right = right_child
+					right_child.parent = node
+				else:
+					descendant = left_child
+					while not descendant.leaf:
+						descendant = descendant.right
+					node.right = descendant
+
+			prefixes = parent_prefixes
+
+		root_left = self._level_tables[0].get(0)
+		root_right = self._level_tables[0].get(1)
+
+		self._root.left = root_left if root_left is not None else self._min
+		self._root.right = root_right if root_right is not None else self._max
+
+		if root_left is not None:
+			root_left.parent = self._root
+
+		if root_right is not None:
+			root_right.parent = self._root
+
+	def _get_neighbor_leaves(self,
+							 value: int,
+							 hint: Optional["TrieNode"]=None) -> Tuple[Optional["TrieNode"], Optional["TrieNode"]]:
+		"""
+		Find the leaves on either side of a value not in the trie, with a single search for the closest one,
+		or without searching at all if given a leaf in the trie next to the value
+
+		:param value: The value to find the neighbors of
+		:param hint: A leaf possibly next to the value
+		:return: The leaves with the largest value less than the given value and the smallest value greater,
+				 either of which may be None
+		"""
+		if self._count == 0:
+			return (None, None)
+
+		# A hint removed from the trie or from another trie altogether may still look like a neighbor
+		if hint is not None and self._level_tables[-1].get(hint.value) is hint:
+			if cast(int, hint.value) < value and (hint.succ is None or hint.succ.value > value):
+				return (hint, hint.succ)
+			elif cast(int, hint.value) > value and (hint.pred is None or hint.pred.value < value):
+				return (hint.pred, hint)
+
+		node = cast(TrieNode, self._get_closest_leaf(value))
+		return (node, node.succ) if cast(int, node.value) < value else (node.pred, node)
+
+	def _insert(self, value: int, hint: Optional["TrieNode"]=None) -> "TrieNode":
+		"""
+		Add the given value to the trie, assuming it has already been validated
 
 		:param value: The value to add to the trie
+		:param hint: A leaf possibly next to the value, to skip searching for its neighbors
+		:return: The leaf holding the given value
 		"""
-		value = self._to_int(value, self._maxlen)
+		if self._journal is not None:
+			self._journal._log_insert(value)
 
-		# Do nothing if the value is already in the trie
-		if value in self._level_tables[-1]:
-			return
+		leaf_node = self._level_tables[-1].get(value)
 
-		leaf_pred = self.predecessor(value) if self._count > 0 else None
-		leaf_succ = self.successor(value) if self._count > 0 else None
+		# Do nothing if the value is already in the trie,
+		# besides counting it again if the trie is a multiset
+		if leaf_node is not None:
+			if self._multiset:
+				leaf_node.count += 1
+				self._count += 1
+
+				if self._track_prefixes:
+					self._adjust_prefix_sizes(value, 1)
+
+			return cast(TrieNode, leaf_node)
+
+		leaf_pred, leaf_succ = self._get_neighbor_leaves(value, hint)
 		leaf_node = TrieNode(value, True, leaf_pred, leaf_succ)
 
+		# The neighbors of the new leaf bound the cached results it can change
+		if self._cache is not None:
+			self._cache.invalidate_range(leaf_pred.value if leaf_pred is not None else None,
+										 leaf_succ.value if leaf_succ is not None else None)
+
 		# Wire the new leaf into the linked list and add to the leaf dict
 		self._level_tables[-1][value] = leaf_node
 
@@ -274,62 +879,70 @@ class XFastTrie(object):
 
 		# Walk up the trie from the leaf node, creating internal nodes as necessary
 		last_inserted = leaf_node
+		shift = 1
+
 		for level in reversed(range(self._maxlen - 1)):
-			node_value = int(value >> (self._maxlen - level - 1))
+			node_value = int(value >> shift)
 			node = self._level_tables[level].get(node_value)
 
-			if node is None:
-				# Determine which leg the last node inserted into the trie was on relative the one to be created,
-				# and find the corresponding leaf to use for the descendant pointer
-				last_inserted_leg = cast(int, last_inserted.value) & 1
-				descendant_direction = "right" if last_inserted_leg == 0 else "left"
-				descendant = last_inserted
-				while not descendant.leaf:
-					# If this loop ends up following a descendant pointer,
-					# it means there was no intermediate node to follow instead;
-					# a pointer on the left leg would lead to the smallest leaf of the node's right subtree,
-					# which would also be the smallest leaf of the original node and the desired node,
-					# and likewise for a descendant pointer on the right leg.
-					descendant = getattr(descendant, descendant_direction)
-
-				if last_inserted_leg == 0:
-					node_left = last_inserted
-					node_right = descendant
-				else:
-					node_right = last_inserted
-					node_left = descendant
-
-				# Create the new node, insert it into its respective dict and update pointers
-				node = TrieNode(node_value, False, node_left, node_right)
-				self._level_tables[level][node_value] = node
+			if node is not None:
+				break
+
+			# Determine which leg the last node inserted into the trie was on relative the one to be created,
+			# and find the corresponding leaf to use for the descendant pointer
+			last_inserted_leg = cast(int, last_inserted.value) & 1
+			descendant_direction = "right" if last_inserted_leg == 0 else "left"
+			descendant = last_inserted
+			while not descendant.leaf:
+				# If this loop ends up following a descendant pointer,
+				# it means there was no intermediate node to follow instead;
+				# a pointer on the left leg would lead to the smallest leaf of the node's right subtree,
+				# which would also be the smallest leaf of the original node and the desired node,
+				# and likewise for a descendant pointer on the right leg.
+				descendant = getattr(descendant, descendant_direction)
+
+			if last_inserted_leg == 0:
+				node_left = last_inserted
+				node_right = descendant
+			else:
+				node_right = last_inserted
+				node_left = descendant
+
+			# Create the new node, insert it into its respective dict and update pointers
+			node = TrieNode(node_value, False, node_left, node_right)
+			self._level_tables[level][node_value] = node
+			last_inserted.parent = node
+			last_inserted = node
+			shift += 1
+		else:
+			node = self._root
+
+		# The ancestors above the new nodes already exist, so they are reached by parent pointers;
+		# each one takes the node below it on the new leaf's leg, and has its descendant pointer
+		# on a leg with no child moved to the new leaf if the leaf is now the nearest one there,
+		# which can't happen at or above an ancestor both of the new leaf's neighbors are under
+		while node is not self._root:
+			if last_inserted.parent is None:
 				last_inserted.parent = node
-				last_inserted = node
+
+			if cast(int, last_inserted.value) & 1:
+				node.right = last_inserted
+
+				if node.left.leaf and node.left.value > value:
+					node.left = leaf_node
 			else:
-				# Update the last node that was inserted to point to its newly-found parent
-				if last_inserted.parent is None:
-					last_inserted.parent = node
+				node.left = last_inserted
 
-				# Update the current node to know about its potential children
-				left_child_value = node.value << 1 & -2
-				right_child_value = node.value << 1 | 1
-				left_child = self._level_tables[level + 1].get(left_child_value)
-				right_child = self._level_tables[level + 1].get(right_child_value)
+				if node.right.leaf and node.right.value < value:
+					node.right = leaf_node
 
-				if node.left is left_child:
-					pass
-				elif left_child is not None:
-					node.left = left_child
-				else:
-					if node.left.value > value:
-						node.left = leaf_node
+			if (leaf_pred is not None and leaf_succ is not None
+				and leaf_pred.value >> shift == node.value == leaf_succ.value >> shift):
+				break
 
-				if node.right is right_child:
-					pass
-				elif right_child is not None:
-					node.right = right_child
-				else:
-					if node.right.value < value:
-						node.right = leaf_node
+			last_inserted = node
+			node = node.parent
+			shift += 1
 
 		if self._root.left is None or self._root.left.leaf:
 			root_left = self._level_tables[0].get(0)
@@ -345,15 +958,306 @@ class XFastTrie(object):
 
 		self._count += 1
 
-	def predecessor(self, value: int) -> Optional["TrieNode"]:
+		if self._track_prefixes:
+			self._adjust_prefix_sizes(value, 1)
+
+		return leaf_node
+
+	def apply_batch(self,
+					inserts: Iterable[Union[int, bytes]]=(),
+					removes: Iterable[Union[int, bytes]]=()) -> None:
 		"""
-		Find the largest value in the trie strictly less than the given value
+		Remove and add batches of values in one sorted sweep each,
+		updating every affected internal node once rather than once per value;
+		every value is validated before the trie is modified,
+		removals are applied before insertions,
+		and values to remove that are not in the trie are ignored
+
+		:param inserts: The values to add to the trie
+		:param removes: The values to remove from the trie
+		"""
+		insert_values = sorted(self._to_keys(inserts))
+		remove_values = sorted(self._to_keys(removes))
+
+		if remove_values:
+			self._remove_sorted(remove_values)
+
+		if insert_values:
+			self._insert_sorted(self._fit_all(insert_values))
+
+	def _build_sorted(self, values: List[int], pool: Optional[Executor], shards: int) -> None:
+		"""
+		Fill an empty trie with a batch of values, split into shards by the first few bits
+		after the ones every value shares; the nodes below those bits are laid out shard by shard
+		and the level tables are indexed level by level, across the pool if there is one,
+		so all that's left to do here is create the nodes and stitch the top levels together
+
+		:param values: The values to add to the trie, validated and in ascending order
+		:param pool: The pool of processes to build the trie in, or None to build it in this process
+		:param shards: The number of shards to aim for
+		"""
+		if self._journal is not None:
+			self._journal._log_insert_many(values)
+
+		if self._cache is not None:
+			self._cache.invalidate()
+
+		if not values:
+			return
+
+		keys = [value for (index, value) in enumerate(values) if index == 0 or values[index - 1] != value]
+		counts = None
+
+		if self._multiset:
+			multiplicities = Counter(values)
+			counts = [multiplicities[key] for key in keys]
+
+		# No node below the shard bits has values in two shards
+		length = self._maxlen
+		top = max(1, min(length - 1, length - (keys[0] ^ keys[-1]).bit_length() + shards.bit_length()))
+		shift = length - top
+		groups = [0]
+
+		while True:
+			start = bisect_left(keys, ((keys[groups[-1]] >> shift) + 1) << shift, groups[-1])
+
+			if start == len(keys):
+				break
+
+			groups.append(start)
+
+		bounds = [0]
+
+		for start in groups[1:]:
+			if start - bounds[-1] >= len(keys) / shards:
+				bounds.append(start)
+
+		bounds.append(len(keys))
+		tasks = [(pack_values(keys[start:stop], length),
+				  counts[start:stop] if counts is not None else None,
+				  length,
+				  top,
+				  self._track_prefixes)
+				 for (start, stop) in zip(bounds, bounds[1:])]
+
+		leaves = [TrieNode(key, True) for key in keys]
+		level_nodes: List[List[TrieNode]] = [[] for _ in range(top, length)]
+
+		for (leaf_pred, leaf_succ) in zip(leaves, leaves[1:]):
+			leaf_pred.succ = leaf_succ
+			leaf_succ.pred = leaf_pred
+
+		if counts is not None:
+			for (leaf_node, count) in zip(leaves, counts):
+				leaf_node.count = count
+
+		shard_levels = run_tasks(pool, build_shard, tasks)
+
+		for (start, stop, levels) in zip(bounds, bounds[1:], shard_levels):
+			shard_leaves = leaves[start:stop]
+			children = shard_leaves
+
+			for (depth, (prefixes, lefts, rights, sizes)) in reversed(list(enumerate(levels))):
+				nodes = []
+
+				for (prefix, left, right) in zip(prefixes, lefts, rights):
+					left_node = children[left] if left >= 0 else shard_leaves[~left]
+					right_node = children[right] if right >= 0 else shard_leaves[~right]
+					node = TrieNode(prefix, False, left_node, right_node)
+
+					if left >= 0:
+						left_node.parent = node
+
+					if right >= 0:
+						right_node.parent = node
+
+					nodes.append(node)
+
+				if sizes is not None:
+					for (node, size) in zip(nodes, sizes):
+						node.size = size
+
+				level_nodes[depth].extend(nodes)
+				children = nodes
+
+		level_nodes.append(leaves)
+		level_keys = [list(chain.from_iterable(levels[depth][0] for levels in shard_levels))
+					  for depth in range(length - top)]
+		level_keys.append(keys)
+		tables = run_tasks(pool, index_table, [pack_values(prefixes, length) for prefixes in level_keys])
+
+		for (level, (table, nodes)) in enumerate(zip(tables, level_nodes), top - 1):
+			self._level_tables[level] = adopt_values(table, nodes)
+
+		self._count = len(values) if self._multiset else len(keys)
+		self._min = leaves[0]
+		self._max = leaves[-1]
+
+		# The nodes above the shard bits are the ones above the first value of each group of values
+		# sharing the same shard bits, which are few enough to create one by one
+		self._repair_prefixes([keys[start] for start in groups])
+
+		if self._track_prefixes:
+			for level in reversed(range(top - 1)):
+				children_table = self._level_tables[level + 1]
+
+				for node in self._level_tables[level].values():
+					node.size = sum(child.size
+									for child in (children_table.get(node.value << 1),
+												  children_table.get(node.value << 1 | 1))
+									if child is not None)
+
+	def build_parallel(self, values: Iterable[Union[int, bytes]], workers: Optional[int]=None) -> None:
+		"""
+		Replace the contents of the trie with a batch of values,
+		laying out the trie across a pool of processes;
+		every value is validated before the trie is modified
+
+		:param values: The values to fill the trie with
+		:param workers: The number of processes to build the trie with, one for every CPU by default;
+						a single worker builds the trie in this process
+		"""
+		if workers is not None and workers < 1:
+			raise ValueError("Trie must be built by at least one worker")
+
+		keys = self._to_ints(values, self._length_limit)
+		self.clear()
+		keys = sorted(self._fit_all(keys))
+		workers = workers or cpu_count() or 1
+
+		# Shards vary in size, so there are a few for every worker to even out the load
+		with paused_collection():
+			if workers == 1:
+				self._build_sorted(keys, None, 1)
+			else:
+				with ProcessPoolExecutor(workers) as pool:
+					self._build_sorted(keys, pool, 4 * workers)
+
+	def ceiling(self, value: Union[int, bytes]) -> Optional["TrieNode"]:
+		"""
+		Find the smallest value in the trie at least as large as the given value
+
+		:param value: The value to find the ceiling of
+		:return: The leaf with the smallest value not less than the given value,
+				 or None if the value is larger than the value of the largest leaf
+		"""
+		return self._get_ceiling_leaf(self._to_key(value))
+
+	def ceiling_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional["TrieNode"]]:
+		"""
+		Find the ceilings of a batch of values
+
+		:param values: The values to find the ceilings of
+		:return: The ceiling of each value, in order
+		"""
+		return [self._get_ceiling_leaf(value) for value in self._to_keys(values)]
+
+	def _contains(self, value: int) -> bool:
+		"""
+		Check whether the given value is in the trie, assuming it has already been validated
+
+		:param value: The value to look for
+		:return: Whether the value is in the trie
+		"""
+		return value in self._level_tables[-1]
+
+	def difference_update(self, values: Iterable[Union[int, bytes]]) -> None:
+		"""
+		Remove a batch of values from the trie, ignoring those not in the trie
+
+		:param values: The values to remove from the trie
+		"""
+		self.apply_batch(removes=values)
+
+	def floor(self, value: Union[int, bytes]) -> Optional["TrieNode"]:
+		"""
+		Find the largest value in the trie at most as large as the given value
+
+		:param value: The value to find the floor of
+		:return: The leaf with the largest value not greater than the given value,
+				 or None if the value is smaller than the value of the smallest leaf
+		"""
+		return self._get_floor_leaf(self._to_key(value))
+
+	def floor_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional["TrieNode"]]:
+		"""
+		Find the floors of a batch of values
+
+		:param values: The values to find the floors of
+		:return: The floor of each value, in order
+		"""
+		return [self._get_floor_leaf(value) for value in self._to_keys(values)]
+
+	def insert(self, value: Union[int, bytes], hint: Optional["TrieNode"]=None) -> None:
+		"""
+		Add the given value to the trie
+
+		:param value: The value to add to the trie
+		:param hint: A leaf next to where the value goes, such as the largest leaf
+					 when adding values in ascending order, to skip searching for the value's neighbors;
+					 leaves that turn out not to be next to the value are ignored
+		"""
+		self._insert(self._fit(self._to_key(value)), hint)
+
+	def insert_unchecked(self, value: int, hint: Optional["TrieNode"]=None) -> "TrieNode":
+		"""
+		Add a value to the trie without converting or validating it first,
+		for callers that already hold values in the canonical value format
+
+		:param value: The value to add to the trie, a nonnegative int no longer than the trie allows
+		:param hint: A leaf next to where the value goes, to skip searching for the value's neighbors
+		:return: The leaf holding the given value, which can hint where the next value goes
+		"""
+		return self._insert(self._fit(value), hint)
+
+	def _invalidate_results(self, low: int, high: int) -> None:
+		"""
+		Drop every cached result that adding or removing values in the given range could change;
+		those are the results for values from the closest value in the trie below the range
+		to the closest one above it, or every result if the cache doesn't invalidate by range
+
+		:param low: The smallest value being added or removed
+		:param high: The largest value being added or removed
+		"""
+		cache = cast(ResultCache, self._cache)
+
+		if not cache.ranged or self._count == 0:
+			cache.invalidate()
+			return
+
+		below = self._predecessor(low)
+		above = self._successor(high)
+		cache.invalidate_range(below.value if below is not None else None,
+							   above.value if above is not None else None)
+
+	def nearest(self, value: Union[int, bytes]) -> "TrieNode":
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to find the nearest neighbor of
+		:return: The leaf with the value closest to the given value
+		"""
+		return self._get_nearest_leaf(self._to_key(value))
+
+	def nearest_many(self, values: Iterable[Union[int, bytes]]) -> List["TrieNode"]:
+		"""
+		Find the nearest neighbors of a batch of values
+
+		:param values: The values to find the nearest neighbors of
+		:return: The nearest neighbor of each value, in order
+		"""
+		return [self._get_nearest_leaf(value) for value in self._to_keys(values)]
+
+	def _predecessor(self, value: int) -> Optional["TrieNode"]:
+		"""
+		Find the largest value in the trie strictly less than the given value,
+		assuming it has already been validated
 
 		:param value: The value to find the predecessor for
 		:return: The leaf with the largest value strictly less than the given value,
 				 or None if the value is at most the value of the smallest leaf
 		"""
-		value = self._to_int(value, self._maxlen)
 		node = self._get_closest_leaf(value)
 
 		# This should only happen if there are no values in the trie,
@@ -364,19 +1268,137 @@ class XFastTrie(object):
 		else:
 			return node.pred if node.value >= value else node
 
-	def remove(self, value: Union[int, bytes]) -> None:
+	def predecessor(self, value: Union[int, bytes]) -> Optional["TrieNode"]:
 		"""
-		Remove the given value from the trie
+		Find the largest value in the trie strictly less than the given value
+
+		:param value: The value to find the predecessor for
+		:return: The leaf with the largest value strictly less than the given value,
+				 or None if the value is at most the value of the smallest leaf
+		"""
+		if self._cache is not None:
+			return cast(Optional[TrieNode], self._cache.lookup("predecessor", value, self._to_key, self._predecessor))
+
+		return self._predecessor(self._to_key(value))
+
+	def predecessor_unchecked(self, value: int) -> Optional["TrieNode"]:
+		"""
+		Find the largest value in the trie strictly less than the given value
+		without converting or validating it first, or consulting the result cache
+
+		:param value: The value to find the predecessor for, a nonnegative int no longer than the trie allows
+		:return: The leaf with the largest value strictly less than the given value,
+				 or None if the value is at most the value of the smallest leaf
+		"""
+		return self._predecessor(value)
+
+	def prefix_count(self, prefix: Union[int, bytes], bits: int) -> int:
+		"""
+		Count the values in the trie starting with the given prefix;
+		tries that track prefix sizes answer from the prefix's node,
+		others count the values one by one
+
+		:param prefix: The prefix, as the value of the leading bits it covers
+		:param bits: The number of bits in the prefix
+		:return: The number of values in the trie starting with the given prefix
+		"""
+		node, _, _ = self._get_prefix_node(prefix, bits)
+
+		if node is None:
+			return 0
+		elif node.leaf:
+			return cast(int, node.count)
+		elif node is self._root:
+			return self._count
+		elif self._track_prefixes:
+			return cast(int, node.size)
+		else:
+			return sum(1 for _ in self.prefix_iter(prefix, bits))
+
+	def prefix_iter(self, prefix: Union[int, bytes], bits: int) -> Iterator[int]:
+		"""
+		Iterate over the values in the trie starting with the given prefix, in ascending order
+
+		:param prefix: The prefix, as the value of the leading bits it covers
+		:param bits: The number of bits in the prefix
+		:return: The values in the trie starting with the given prefix
+		"""
+		node = self._get_prefix_min_leaf(prefix, bits)
+		_, prefix, bits = self._get_prefix_node(prefix, bits)
+		shift = self._maxlen - bits
+
+		while node is not None and node.value >> shift == prefix:
+			for _ in range(node.count):
+				yield cast(int, node.value)
+
+			node = node.succ
+
+	def prefix_max(self, prefix: Union[int, bytes], bits: int) -> Optional[int]:
+		"""
+		Find the largest value in the trie starting with the given prefix
+
+		:param prefix: The prefix, as the value of the leading bits it covers
+		:param bits: The number of bits in the prefix
+		:return: The largest value starting with the given prefix,
+				 or None if no value in the trie starts with it
+		"""
+		node, prefix, bits = self._get_prefix_node(prefix, bits)
+
+		if node is None:
+			return None
+		elif node.leaf:
+			return cast(int, node.value)
+
+		# A node without a right child points straight at the largest leaf under it
+		elif node.right.parent is not node:
+			return cast(int, node.right.value)
+
+		# Otherwise the deepest node on the path to the prefix followed by all 1s
+		# is missing its right child, and points at the same leaf instead
+		shift = self._maxlen - bits
+		ancestor, _ = self._get_closest_ancestor(prefix << shift | ((1 << shift) - 1))
+		return cast(int, ancestor.value if ancestor.leaf else ancestor.right.value)
+
+	def prefix_min(self, prefix: Union[int, bytes], bits: int) -> Optional[int]:
+		"""
+		Find the smallest value in the trie starting with the given prefix
+
+		:param prefix: The prefix, as the value of the leading bits it covers
+		:param bits: The number of bits in the prefix
+		:return: The smallest value starting with the given prefix,
+				 or None if no value in the trie starts with it
+		"""
+		node = self._get_prefix_min_leaf(prefix, bits)
+		return cast(int, node.value) if node is not None else None
+
+	def _remove(self, value: int) -> None:
+		"""
+		Remove the given value from the trie, assuming it has already been validated
 
 		:param value: The value to remove from the trie
 		"""
-		value = self._to_int(value, self._maxlen)
+		node = self._level_tables[-1].get(value)
+
+		if node is not None and self._journal is not None:
+			self._journal._log_remove(value)
+
+		if node is not None and self._cache is not None:
+			self._invalidate_results(value, value)
 
 		# Error when trying to remove a value that hasn't been added
-		if value not in self._level_tables[-1]:
+		if node is None:
 			raise ValueError("Value does not exist in trie")
+		# Multisets only need to give up the leaf once its last copy is removed
+		elif node.count > 1:
+			node.count -= 1
+			self._count -= 1
+
+			if self._track_prefixes:
+				self._adjust_prefix_sizes(value, -1)
+
+			return
+
 		else:
-			node = self._level_tables[-1][value]
 			leaf_pred = node.pred
 			leaf_succ = node.succ
 
@@ -444,15 +1466,46 @@ class XFastTrie(object):
 
 		self._count -= 1
 
-	def successor(self, value: int) -> Optional["TrieNode"]:
+		if self._track_prefixes:
+			self._adjust_prefix_sizes(value, -1)
+
+	def remove(self, value: Union[int, bytes]) -> None:
 		"""
-		Find the smallest value in the trie strictly greater than the given value
+		Remove the given value from the trie
+
+		:param value: The value to remove from the trie
+		"""
+		self._remove(self._to_key(value))
+
+	def remove_unchecked(self, value: int) -> None:
+		"""
+		Remove a value from the trie without converting or validating it first,
+		for callers that already hold values in the canonical value format
+
+		:param value: The value to remove from the trie, a nonnegative int no longer than the trie allows
+		"""
+		self._remove(value)
+
+	def remove_range(self, low: Union[int, bytes], high: Union[int, bytes]) -> int:
+		"""
+		Remove every value in the trie from the given lower bound up to,
+		but not including, the given upper bound
+
+		:param low: The smallest value to remove
+		:param high: The value to stop removing at
+		:return: The number of values removed
+		"""
+		return self._remove_range(self._to_key(low), self._to_key(high))
+
+	def _successor(self, value: int) -> Optional["TrieNode"]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value,
+		assuming it has already been validated
 
 		:param value: The value to find the successor for
 		:return: The leaf with the smallest value strictly greater than the given value,
 				 or None if the value is at least the value of the largest leaf
 		"""
-		value = self._to_int(value, self._maxlen)
 		node = self._get_closest_leaf(value)
 
 		# This should only happen if there are no values in the trie,
@@ -463,6 +1516,66 @@ class XFastTrie(object):
 		else:
 			return node.succ if node.value <= value else node
 
+	def successor(self, value: Union[int, bytes]) -> Optional["TrieNode"]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value
+
+		:param value: The value to find the successor for
+		:return: The leaf with the smallest value strictly greater than the given value,
+				 or None if the value is at least the value of the largest leaf
+		"""
+		if self._cache is not None:
+			return cast(Optional[TrieNode], self._cache.lookup("successor", value, self._to_key, self._successor))
+
+		return self._successor(self._to_key(value))
+
+	def successor_unchecked(self, value: int) -> Optional["TrieNode"]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value
+		without converting or validating it first, or consulting the result cache
+
+		:param value: The value to find the successor for, a nonnegative int no longer than the trie allows
+		:return: The leaf with the smallest value strictly greater than the given value,
+				 or None if the value is at least the value of the largest leaf
+		"""
+		return self._successor(value)
+
+	def count(self, value: Union[int, bytes]) -> int:
+		"""
+		Count how many times the given value is held in the trie
+
+		:param value: The value to count
+		:return: The multiplicity of the given value in the trie
+		"""
+		node = self._level_tables[-1].get(self._to_key(value))
+		return node.count if node is not None else 0
+
+	def truncate_above(self, value: Union[int, bytes]) -> int:
+		"""
+		Remove every value in the trie strictly greater than the given value
+
+		:param value: The largest value to keep
+		:return: The number of values removed
+		"""
+		return self._remove_range(self._to_key(value) + 1, 1 << self._maxlen)
+
+	def truncate_below(self, value: Union[int, bytes]) -> int:
+		"""
+		Remove every value in the trie strictly less than the given value
+
+		:param value: The smallest value to keep
+		:return: The number of values removed
+		"""
+		return self._remove_range(0, self._to_key(value))
+
+	def update(self, values: Iterable[Union[int, bytes]]) -> None:
+		"""
+		Add a batch of values to the trie
+
+		:param values: The values to add to the trie
+		"""
+		self.apply_batch(inserts=values)
+
 	@property
 	def max(self) -> Optional[int]:
 		"""
@@ -504,39 +1617,206 @@ class XFastTrie(object):
 		return self._min
 
 	def __init__(self,
-				 max_length: int=(maxsize.bit_length() + 1)) -> None:
+				 max_length: int=(maxsize.bit_length() + 1),
+				 multiset: bool=False,
+				 track_prefixes: bool=False,
+				 adaptive: bool=False,
+				 journal: Optional["Journal"]=None,
+				 cache_size: int=0,
+				 range_invalidation: bool=False) -> None:
+		if cache_size < 0:
+			raise ValueError("Number of cached results must be nonnegative")
+
+		# Tracking prefix sizes lets prefix counts skip visiting every value,
+		# at the cost of updating a node on every level whenever a value is added or removed;
+		# adaptive tries start with only a few levels and add more as larger values arrive,
+		# up to the maximum length; every change is recorded in the journal, if there is one;
+		# tries given a cache size keep that many of the latest predecessor, successor
+		# and membership results until a change could affect them, either any change at all
+		# or, with range invalidation, one between the neighbors of the value queried
+		self._length_limit = max_length
 		self._maxlen = max_length
+		self._adaptive = adaptive
+		self._multiset = multiset
+		self._track_prefixes = track_prefixes
 		self.clear()
+		self._journal = journal
+		self._cache = ResultCache(cache_size, range_invalidation) if cache_size > 0 else None
 
 	def __contains__(self, value: Union[int, bytes]) -> bool:
-		value = self._to_int(value, self._maxlen)
-		return value in self._level_tables[-1]
+		if self._cache is not None:
+			return cast(bool, self._cache.lookup("contains", value, self._to_key, self._contains))
+
+		return self._contains(self._to_key(value))
 
 	def __gt__(self, value: Union[int, bytes]) -> Optional[int]:
-		value = self._to_int(value, self._maxlen)
 		result = self.successor(value)
 		return result.value if result is not None else result
 
 	def __iadd__(self, value: Union[int, bytes]) -> "XFastTrie":
-		value = self._to_int(value, self._maxlen)
 		self.insert(value)
 		return self
 
 	def __isub__(self, value: Union[int, bytes]) -> "XFastTrie":
-		value = self._to_int(value, self._maxlen)
 		self.remove(value)
 		return self
 
-	def __iter__(self) -> Iterable[int]:
+	def __iter__(self) -> Iterator[int]:
 		node = self._min
 		while node is not None:
-			yield cast(int, node.value)
+			if self._multiset:
+				for _ in range(node.count):
+					yield cast(int, node.value)
+			else:
+				yield cast(int, node.value)
+
 			node = node.succ
 
 	def __len__(self) -> int:
 		return self._count
 
 	def __lt__(self, value: Union[int, bytes]) -> Optional[int]:
-		value = self._to_int(value, self._maxlen)
 		result = self.predecessor(value)
 		return result.value if result is not None else result
+
+
+class XFastTrieMap(XFastTrie):
+	@staticmethod
+	def _node_item(node: Optional["TrieNode"]) -> Optional[Tuple[int, Any]]:
+		"""
+		Express a leaf as a key/value pair
+
+		:param node: The leaf to convert, or None
+		:return: The leaf's value and the data it carries,
+				 or None if there is no leaf
+		"""
+		return (cast(int, node.value), node.data) if node is not None else None
+
+	def ceiling_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the smallest key at least as large as the given key
+
+		:param key: The key to search for
+		:return: The key/value pair with the smallest key not less than the given key,
+				 or None if it doesn't exist
+		"""
+		return self._node_item(self._get_ceiling_leaf(self._to_key(key)))
+
+	def floor_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the largest key at most as large as the given key
+
+		:param key: The key to search for
+		:return: The key/value pair with the largest key not greater than the given key,
+				 or None if it doesn't exist
+		"""
+		return self._node_item(self._get_floor_leaf(self._to_key(key)))
+
+	def get(self, key: Union[int, bytes], default: Any=None) -> Any:
+		"""
+		Retrieve the value stored under the given key
+
+		:param key: The key to look up
+		:param default: The value to return if the key is not in the trie
+		:return: The value stored under the given key, or the default
+		"""
+		node = self._level_tables[-1].get(self._to_key(key))
+		return node.data if node is not None else default
+
+	def items(self) -> Iterable[Tuple[int, Any]]:
+		"""
+		Iterate over the entries in the trie in key order
+
+		:return: The key/value pairs in the trie
+		"""
+		node = self._min
+		while node is not None:
+			yield (cast(int, node.value), node.data)
+			node = node.succ
+
+	def keys(self) -> Iterable[int]:
+		"""
+		Iterate over the keys in the trie in order
+
+		:return: The keys in the trie
+		"""
+		for key in self:
+			yield key
+
+	def pred_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the largest key strictly less than the given key
+
+		:param key: The key to find the predecessor of
+		:return: The key/value pair preceding the given key, or None if it doesn't exist
+		"""
+		return self._node_item(self.predecessor(key))
+
+	def succ_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the smallest key strictly greater than the given key
+
+		:param key: The key to find the successor of
+		:return: The key/value pair following the given key, or None if it doesn't exist
+		"""
+		return self._node_item(self.successor(key))
+
+	def update(self,					   # type: ignore
+			   items: Union[Mapping[Union[int, bytes], Any], Iterable[Tuple[Union[int, bytes], Any]]]) -> None:
+		"""
+		Store a batch of entries in the trie,
+		replacing the values of keys already in the trie
+
+		:param items: A mapping, or an iterable of key/value pairs;
+					  the last value given for a key is kept
+		"""
+		pairs = [(self._to_key(key), value)
+				 for (key, value) in (items.items() if isinstance(items, Mapping) else items)]
+
+		if pairs:
+			self._insert_sorted(sorted(self._fit_all([key for (key, _) in pairs])))
+
+		leaves = self._level_tables[-1]
+		for (key, value) in pairs:
+			leaves[key].data = value
+
+	def values(self) -> Iterable[Any]:
+		"""
+		Iterate over the values in the trie in key order
+
+		:return: The values in the trie
+		"""
+		for (_, value) in self.items():
+			yield value
+
+	def __init__(self,
+				 max_length: int=(maxsize.bit_length() + 1),
+				 track_prefixes: bool=False,
+				 adaptive: bool=False,
+				 cache_size: int=0,
+				 range_invalidation: bool=False) -> None:
+		super(XFastTrieMap, self).__init__(max_length,
+										   track_prefixes=track_prefixes,
+										   adaptive=adaptive,
+										   cache_size=cache_size,
+										   range_invalidation=range_invalidation)
+
+	def __delitem__(self, key: Union[int, bytes]) -> None:
+		key = self._to_key(key)
+
+		if key not in self._level_tables[-1]:
+			raise KeyError(key)
+
+		self._remove(key)
+
+	def __getitem__(self, key: Union[int, bytes]) -> Any:
+		key = self._to_key(key)
+		node = self._level_tables[-1].get(key)
+
+		if node is None:
+			raise KeyError(key)
+
+		return node.data
+
+	def __setitem__(self, key: Union[int, bytes], value: Any) -> None:
+		self._insert(self._fit(self._to_key(key))).data = value
@@ -7,40 +7,73 @@
 #       Released under version 3.0 of the Non-Profit Open Source License       #
 ################################################################################
 
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import chain
+from os import cpu_count
 from sys import maxsize
 from typing import (cast,
+					Any,
 					Iterable,
+					Iterator,
+					List,
+					Mapping,
 					Optional,
+					Set,
 					Tuple,
+					TYPE_CHECKING,
 					Union,
 					)
 
 from py_hopscotch_dict import HopscotchDict
-from sortedcontainers import SortedList							  # type: ignore
 
 from py_fast_trie import XFastTrie
-from py_fast_trie.x_fast import TrieNode
+from py_fast_trie.bloom import BloomFilter
+from py_fast_trie.cache import ResultCache
+from py_fast_trie.containers import (ArrayContainer,
+									 Container,
+									 DecodeCache,
+									 FROZEN_OVERHEAD,
+									 FrozenContainer,
+									 make_container,
+									 )
+from py_fast_trie.parallel import (adopt_values,
+								   build_containers,
+								   copy_table,
+								   index_table,
+								   pack_values,
+								   paused_collection,
+								   run_tasks,
+								   )
+from py_fast_trie.rank import RankIndex
+from py_fast_trie.x_fast import ADAPTIVE_INITIAL_LENGTH, TrieNode
+
+if TYPE_CHECKING:  # pragma: no cover
+	from py_fast_trie.journal import Journal
+
+# Prefilters are sized for at least this many values, so a small trie doesn't rebuild its prefilter
+# every few insertions; a filter this size takes up a few kilobytes
+PREFILTER_MIN_CAPACITY = 1024
 
 class YFastTrie(object):
+	# Subtrees are represented by the largest value they could hold:
+	# one less than the smallest value in the next subtree,
+	# or the largest value the trie can hold for the last subtree;
+	# subtrees are split at their medians, so how many values each holds
+	# depends only on the bit length, however sparse the values are;
+	# each subtree is kept in whichever kind of container holds its values in the least room
+
+	# Whether every value in the trie carries a payload, stored in parallel with the subtrees;
+	# multisets store the multiplicity of every value the same way
+	_stores_payloads = False
+	_cache: Optional[ResultCache] = None
+	_journal: Optional["Journal"] = None
 
 	@staticmethod
-	def _calculate_representative(value: int, max_length: int) -> int:
-		"""
-		Calculate the smallest value that would exist in _partitions
-		the given value could belong to
-
-		:param val: The value to calculate the representative for
-		:param max_length: The bit length of the largest possible representative
-
-		:return: The closest possible representative to the given number
-		"""
-		result = min(max_length * (value // max_length) + (-1 % max_length), 2 ** max_length - 1)
-		return cast(int, result)
-
-	@staticmethod
-	def _merge_subtrees(left_tree: SortedList,
-						right_tree: SortedList,
-						max_size: int) -> Tuple[SortedList, Optional[SortedList]]:
+	def _merge_subtrees(left_tree: Container,
+						right_tree: Container,
+						max_size: int) -> Tuple[Container, Optional[Container]]:
 		"""
 		Combine the elements of two trees into one larger tree,
 		splitting them again if the larger tree exceeds a given size
@@ -52,62 +85,172 @@ class YFastTrie(object):
 				 less than max_size, the tree with the smaller elements
 				 and the tree with the larger elements otherwise
 		"""
-		if len(left_tree) + len(right_tree) <= max_size:
-			left_tree.update(right_tree)
-			result = (left_tree, None)
-		else:
-			total_median = (len(left_tree) + len(right_tree)) // 2 - 1
-			if total_median < len(left_tree):
-				total_median = left_tree[total_median]
-			else:
-				total_median = right_tree[total_median - len(left_tree)]
+		values = list(left_tree)
+		values.extend(right_tree)
 
-			# Taking advantage of the fact the number of elements in a subtree can only
-			# be twice the bit length of the maximum element before splitting
-			median_rep = YFastTrie._calculate_representative(total_median, max_size // 2)
+		# The combined values may suit a different kind of container than either tree,
+		# so the trees are rebuilt rather than moved between in place
+		if len(values) <= max_size:
+			return (make_container(values), None)
 
-			if median_rep <= max(left_tree):
-				from_tree = left_tree
-				to_tree = right_tree
-				side = -1
-			else:
-				from_tree = right_tree
-				to_tree = left_tree
-				side = 0
-
-			while max(left_tree) > median_rep or min(right_tree) <= median_rep:
-				to_tree.add(from_tree.pop(side))
-
-			result = (left_tree, right_tree)
-
-		return result
+		half = len(values) // 2
+		return (make_container(values[:half]), make_container(values[half:]))
 
 	@staticmethod
-	def _split_subtree(tree: SortedList, max_length: int) -> Tuple[SortedList, SortedList]:
+	def _split_subtree(tree: Container) -> Tuple[Container, Container]:
 		"""
 		Split a tree by its median element into two smaller trees
 
 		:param tree: The tree to split
-		:param max_length: The size of the largest possible element in the trie in bits
 		:return: The tree with the smaller elements,
 				 and the tree with the larger elements
 		"""
-		median = tree.bisect_right(YFastTrie._calculate_representative(tree[len(tree) // 2], max_length))
-		return SortedList(tree.islice(stop=median)), SortedList(tree.islice(start=median))
+		median = len(tree) // 2
+		return make_container(tree.islice(stop=median)), make_container(tree.islice(start=median))
 
 	def clear(self) -> None:
 		"""
 		Remove all values from the trie and return it to its starting state
 		"""
+		if self._adaptive:
+			self._set_length(min(self._length_limit, ADAPTIVE_INITIAL_LENGTH))
+
 		self._count = 0
 		self._max: Optional[int] = None
 		self._min: Optional[int] = None
 		self._partitions = XFastTrie(self._maxlen)
 		self._subtrees = HopscotchDict()
+		self._payloads: Optional[HopscotchDict] = (HopscotchDict()
+													if self._stores_payloads or self._multiset
+													else None)
+		self._rank_index: Optional[RankIndex] = None
+		self._shared = False
+		self._owned: Optional[Set[int]] = None
+		self._decoded = DecodeCache(self._hot_subtrees)
+		self._warm: Optional[Set[int]] = set() if self._freeze_after is not None else None
+		self._until_freeze = self._freeze_after
+		self._prefilter = (BloomFilter(PREFILTER_MIN_CAPACITY, self._prefilter_rate)
+						   if self._prefilter_rate is not None
+						   else None)
+
+		if self._journal is not None:
+			self._journal._log_clear()
+
+		if self._cache is not None:
+			self._cache.clear()
+
+	def _build_rank_index(self) -> RankIndex:
+		"""
+		Index the number of values in each subtree by representative
+		the first time the trie is asked for ranks; from then on the index is kept up to date
+		as subtrees change size, split and merge, until the trie is compacted or cleared
+
+		:return: The index of subtree sizes
+		"""
+		if self._rank_index is None:
+			self._rank_index = RankIndex((rep, self._subtree_weight(rep)) for rep in self._partitions)
+
+		return self._rank_index
+
+	def _count_before(self, rep: int, index: int) -> int:
+		"""
+		Count the values in the trie smaller than a value in a subtree
+
+		:param rep: The representative of the subtree holding the value
+		:param index: The position of the value in its subtree
+		:return: The number of values in the trie smaller than the given value
+		"""
+		result = self._build_rank_index().count_before(rep)
+
+		if self._multiset:
+			result += sum(cast(HopscotchDict, self._payloads)[rep][:index])
+		else:
+			result += index
+
+		return result
+
+	def _evict_subtree(self, rep: int) -> Tuple[Container, Optional[List[Any]]]:
+		"""
+		Remove a subtree and its representative from the trie
+
+		:param rep: The representative of the subtree to remove
+		:return: The removed subtree, and its payloads if the trie stores them
+		"""
+		tree = self._subtrees[rep]
+		del self._subtrees[rep]
+		self._partitions -= rep
+
+		if self._rank_index is not None:
+			self._rank_index.remove(rep)
+
+		payload = None
+		if self._payloads is not None:
+			payload = self._payloads[rep]
+			del self._payloads[rep]
+
+		return (tree, payload)
+
+	def _get_ceiling_slot(self, value: int) -> Optional[Tuple[int, int]]:
+		"""
+		Find where the smallest value at least as large as the given value is stored
+
+		:param value: The value to search for
+		:return: The representative of the subtree holding the smallest value
+				 not less than the given value and its index in that subtree,
+				 or None if no such value exists
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		subtree, rep_node = self._get_value_subtree(value)
+
+		# The value is larger than every representative, and therefore every value
+		if subtree is None:
+			return None
+
+		rep_node = cast(TrieNode, rep_node)
+		index = subtree.bisect_left(value)
+
+		if index < len(subtree):
+			return (cast(int, rep_node.value), index)
+		elif rep_node.succ is not None:
+			return (cast(int, rep_node.succ.value), 0)
+		else:
+			return None
+
+	def _get_floor_slot(self, value: int) -> Optional[Tuple[int, int]]:
+		"""
+		Find where the largest value at most as large as the given value is stored
+
+		:param value: The value to search for
+		:return: The representative of the subtree holding the largest value
+				 not greater than the given value and its index in that subtree,
+				 or None if no such value exists
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		subtree, rep_node = self._get_value_subtree(value)
+
+		# The value is larger than every representative, and therefore every value
+		if subtree is None:
+			rep_node = cast(TrieNode, self._partitions.max_node)
+			return (cast(int, rep_node.value), len(self._subtrees[rep_node.value]) - 1)
+
+		rep_node = cast(TrieNode, rep_node)
+		index = subtree.bisect_right(value) - 1
+
+		if index >= 0:
+			return (cast(int, rep_node.value), index)
+		elif rep_node.pred is not None:
+			pred_rep = cast(int, rep_node.pred.value)
+			return (pred_rep, len(self._subtrees[pred_rep]) - 1)
+		else:
+			return None
 
 	def _get_value_subtree(self,
 						   value: int,
-						   create_subtree: bool=False) -> Tuple[Optional[SortedList], Optional["TrieNode"]]:
+						   create_subtree: bool=False) -> Tuple[Optional[Container], Optional["TrieNode"]]:
 		"""
 		Find the subtree that would hold the given value
 
@@ -129,231 +272,2152 @@ class YFastTrie(object):
 			# the wrong representative will be returned if the one being searched for
 			# is not the largest, and no representative will be returned at all if it is;
 			# so subtract one before searching for the successor
-			rep_node = self._partitions.successor(value - 1)
+			rep_node = self._partitions.successor_unchecked(value - 1)
 
 		if rep_node is None:
 			if create_subtree:
-				rep = self._calculate_representative(value, self._maxlen)
-				self._partitions += rep
-				rep_node = self._partitions.successor(rep - 1)
-				self._subtrees[rep] = result = SortedList()
+				rep = self._top_rep
+				rep_node = self._partitions.insert_unchecked(rep)
+				self._subtrees[rep] = result = ArrayContainer()
+
+				if self._rank_index is not None:
+					self._rank_index.insert(rep, 0)
+
+				if self._owned is not None:
+					self._owned.add(rep)
+
+				if self._payloads is not None:
+					self._payloads[rep] = []
 		else:
-			# Every representative in the X-fast trie should have a corresponding SortedList;
+			# Every representative in the X-fast trie should have a corresponding container;
 			# the code should blow up if it doesn't
 			result = self._subtrees[rep_node.value]
 
 		return (result, rep_node)
 
-	def insert(self, value: Union[int, bytes]) -> None:
+	def _insert(self, value: int, payload: Any=None, replace: bool=False) -> None:
 		"""
-		Insert a value into the trie
+		Insert a value into the trie, assuming it has already been validated
 
 		:param value: The value to insert into the trie
+		:param payload: The payload to store alongside the value, if the trie stores them
+		:param replace: Whether to overwrite the payload of a value already in the trie
 		"""
-		value = XFastTrie._to_int(value, self._maxlen)
+		if self._journal is not None:
+			self._journal._log_insert(value)
+
+		self._unshare_subtrees()
 		subtree, rep_node = self._get_value_subtree(value, True)
-		subtree = cast(SortedList, subtree)
 		rep_node = cast(TrieNode, rep_node)
-		# Do nothing if the value is already in the trie
+		subtree = self._own_subtree(cast(int, rep_node.value))
+
+		# Do nothing if the value is already in the trie,
+		# besides counting it again if the trie is a multiset
 		if value in subtree:
+			if self._multiset:
+				cast(HopscotchDict, self._payloads)[rep_node.value][subtree.bisect_left(value)] += 1
+				self._update_rank_index(cast(int, rep_node.value), 1)
+				self._count += 1
+			elif replace and self._payloads is not None:
+				self._payloads[rep_node.value][subtree.bisect_left(value)] = payload
 			return
 
+		if self._cache is not None:
+			self._invalidate_results(value, value)
+
 		if self._max is None or value > self._max:
 			self._max = value
 
 		if self._min is None or value < self._min:
 			self._min = value
 
+		# A bitmap would grow out of hand holding a value far from the rest
+		if not subtree.accepts(value):
+			self._subtrees[rep_node.value] = subtree = ArrayContainer(subtree)
+
 		subtree.add(value)
 
+		if self._payloads is not None:
+			self._payloads[rep_node.value].insert(subtree.bisect_left(value), 1 if self._multiset else payload)
+
+		self._update_rank_index(cast(int, rep_node.value), 1)
+
 		if len(subtree) > self._max_subtree_size:
 			# Out with the old
-			del self._subtrees[rep_node.value]
-			self._partitions -= rep_node.value
+			_, old_payload = self._evict_subtree(cast(int, rep_node.value))
 
 			# In with the new
-			for tree in self._split_subtree(subtree, self._maxlen):
-				rep = self._calculate_representative(max(tree), self._maxlen)
-				self._partitions += rep
-				self._subtrees[rep] = tree
+			self._install_subtrees(self._split_subtree(subtree), old_payload, cast(int, rep_node.value))
+		else:
+			self._refit_subtree(cast(int, rep_node.value), subtree)
 
 		self._count += 1
 
-	def predecessor(self, value: Union[int, bytes]) -> Optional[int]:
+		if self._prefilter is not None:
+			self._extend_prefilter([value])
+
+	def _insert_sorted(self, values: List[int], payloads: Optional[List[Any]]=None) -> None:
 		"""
-		Find the largest value in the trie strictly less than the given value,
-		if it exists
+		Insert a batch of values into the trie in one sweep,
+		merging each group of values into its subtree at once
+		and splitting every subtree that grows too large a single time
 
-		:param value: The value to find the predecessor of
-		:return: The predecessor of the given value, or None if it doesn't exist
+		:param values: The values to insert into the trie, validated and in ascending order
+		:param payloads: The payloads of the given values, in the same order,
+						 replacing those of values already in the trie
 		"""
-		value = XFastTrie._to_int(value, self._maxlen)
-		subtree, rep_node = self._get_value_subtree(value)
+		if self._journal is not None:
+			self._journal._log_insert_many(values)
 
-		# subtree should be None only if the trie is empty
-		if subtree is None and self._count == 0:
-			raise ValueError("No values exist in trie")
-		elif value <= cast(int, self._min) or self._min is None:
-			return None
-		elif value > cast(int, self._max):
-			return self._max
+		if self._cache is not None:
+			self._cache.invalidate()
 
-		subtree = cast(SortedList, subtree)
-		rep_node = cast(TrieNode, rep_node)
-		if min(subtree) >= value:
-			subtree = self._subtrees[rep_node.pred.value]
+		self._unshare_subtrees()
+		start = 0
 
-		return cast(int, subtree[subtree.bisect_left(value) - 1])
+		while start < len(values):
+			subtree, rep_node = self._get_value_subtree(values[start])
 
-	def remove(self, value: Union[int, bytes]) -> None:
+			# The trie is empty, so the values make up its first subtrees
+			if subtree is None:
+				keys, payload = self._merge_values([], [], values, start, len(values), payloads)
+				self._install_subtrees(self._partition_subtree(keys), payload, self._top_rep)
+				break
+
+			rep = cast(int, cast(TrieNode, rep_node).value)
+			stop = bisect_right(values, rep, start)
+			old_payload = self._payloads[rep] if self._payloads is not None else None
+			keys, payload = self._merge_values(subtree, old_payload, values, start, stop, payloads)
+
+			self._evict_subtree(rep)
+			self._install_subtrees(self._partition_subtree(keys), payload, rep)
+			start = stop
+
+		self._min = self._subtrees[self._partitions.min][0]
+		self._max = self._subtrees[self._partitions.max][-1]
+
+		if self._prefilter is not None:
+			self._extend_prefilter(values)
+
+	def _extend_prefilter(self, values: Iterable[int]) -> None:
 		"""
-		Remove the given value from the trie
+		Add values to the prefilter, replacing it with a larger one holding every value in the trie
+		once it holds more values than it was sized for
 
-		:param value: The value to remove from the trie
+		:param values: The values added to the trie
 		"""
-		value = XFastTrie._to_int(value, self._maxlen)
+		prefilter = cast(BloomFilter, self._prefilter)
+		prefilter.add_many(values)
+
+		if prefilter.full:
+			self._rebuild_prefilter(chain.from_iterable(self._subtrees.values()))
+
+	def _freeze_subtrees(self) -> None:
+		"""
+		Freeze every subtree that hasn't been modified since subtrees were last frozen,
+		if freezing it would save room
+		"""
+		warm = cast(Set[int], self._warm)
+
+		for rep in self._partitions:
+			if rep in warm:
+				continue
+
+			subtree = self._subtrees[rep]
+
+			# Every value takes up at least a byte once frozen, which dense subtrees already beat
+			if isinstance(subtree, FrozenContainer) or subtree._size() <= FROZEN_OVERHEAD + len(subtree):
+				continue
+
+			frozen = FrozenContainer(subtree, self._decoded)
+
+			if frozen._size() < subtree._size():
+				self._subtrees[rep] = frozen
+
+		self._warm = set()
+		self._until_freeze = self._freeze_after
+
+	def _install_subtrees(self, trees: Iterable[Container], payload: Optional[List[Any]], last_rep: int) -> None:
+		"""
+		Add subtrees and their representatives to the trie;
+		every subtree but the last is represented by the value just before the next one starts,
+		and the last takes over the representative of the subtrees the given ones replace,
+		so values between the given subtrees and the next one still map to the last;
+		each subtree is moved into a smaller kind of container first if there is one
+
+		:param trees: The subtrees to add, in ascending order
+		:param payload: The payloads of every value in the given subtrees, in order,
+						if the trie stores them
+		:param last_rep: The representative of the last of the given subtrees
+		"""
+		offset = 0
+		trees = list(trees)
+
+		for (position, tree) in enumerate(trees, 1):
+			rep = trees[position][0] - 1 if position < len(trees) else last_rep
+			self._partitions += rep
+			self._subtrees[rep] = tree.refit()
+
+			if self._owned is not None:
+				self._owned.add(rep)
+
+			if self._warm is not None:
+				self._warm.add(rep)
+
+			if self._payloads is not None:
+				self._payloads[rep] = cast(List[Any], payload)[offset:offset + len(tree)]
+				offset += len(tree)
+
+			if self._rank_index is not None:
+				self._rank_index.insert(rep, self._subtree_weight(rep))
+
+	def _own_subtree(self, rep: int) -> Container:
+		"""
+		Make sure a subtree and its payloads are not shared with any snapshot of the trie,
+		copying them if they are, and that the subtree is not frozen,
+		before they are modified in place
+
+		:param rep: The representative of the subtree about to be modified
+		:return: The subtree with the given representative
+		"""
+		if self._owned is not None and rep not in self._owned:
+			self._subtrees[rep] = self._subtrees[rep].copy()
+
+			if self._payloads is not None:
+				self._payloads[rep] = list(self._payloads[rep])
+
+			self._owned.add(rep)
+
+		subtree = cast(Container, self._subtrees[rep])
+
+		if self._warm is not None:
+			self._warm.add(rep)
+
+			if isinstance(subtree, FrozenContainer):
+				subtree = self._subtrees[rep] = subtree.thaw()
+
+		return subtree
+
+	def _get_nearest(self, value: int) -> int:
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to search for
+		:return: The value in the trie closest to the given value
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
 		subtree, rep_node = self._get_value_subtree(value)
 
-		# There should be no subtree only if the given value is not in the trie
-		if subtree is None or value not in subtree:
-			raise ValueError("Value does not exist in trie")
+		# The value is larger than every representative, and therefore every value
+		if subtree is None:
+			return cast(int, self._max)
 
-		subtree = cast(SortedList, subtree)
+		# Both neighbors are found from the one subtree search,
+		# only looking at an adjacent subtree if the value is at one of its edges
 		rep_node = cast(TrieNode, rep_node)
-		if self._min == value:
-			if len(subtree) > 1:
-				min_succ = subtree[1]
-			else:
-				min_succ = self.successor(value)
-		else:
-			min_succ = -1
 
-		if self._max == value:
-			if len(subtree) > 1:
-				max_pred = subtree[-2]
-			else:
-				max_pred = self.predecessor(value)
+		if value in subtree:
+			return value
+
+		above = subtree.successor(value)
+		below = subtree.predecessor(value)
+
+		if above is None and rep_node.succ is not None:
+			above = self._subtrees[rep_node.succ.value][0]
+
+		if below is None and rep_node.pred is not None:
+			below = self._subtrees[rep_node.pred.value][-1]
+
+		if above is None or (below is not None and value - below <= above - value):
+			return cast(int, below)
 		else:
-			max_pred = -1
+			return above
 
-		if min_succ != -1:
-			self._min = min_succ
+	def _slot_value(self, slot: Optional[Tuple[int, int]]) -> Optional[int]:
+		"""
+		Read the value at a position in a subtree
 
-		if max_pred != -1:
-			self._max = max_pred
+		:param slot: The representative of a subtree and an index into it, or None
+		:return: The value stored at the given position,
+				 or None if there is no position
+		"""
+		if slot is None:
+			return None
 
-		subtree.remove(value)
+		rep, index = slot
+		return cast(int, self._subtrees[rep][index])
 
-		if len(subtree) == 0:
-			del self._subtrees[rep_node.value]
-			self._partitions -= rep_node.value
+	def apply_batch(self,
+					inserts: Iterable[Union[int, bytes]]=(),
+					removes: Iterable[Union[int, bytes]]=()) -> None:
+		"""
+		Remove and add batches of values in one sorted sweep each,
+		restructuring every affected subtree once rather than once per value;
+		every value is validated before the trie is modified,
+		removals are applied before insertions,
+		and values to remove that are not in the trie are ignored
+
+		:param inserts: The values to add to the trie
+		:param removes: The values to remove from the trie
+		"""
+		insert_values = sorted(self._to_keys(inserts))
+		remove_values = sorted(self._to_keys(removes))
+
+		if remove_values:
+			self._remove_sorted(remove_values)
+
+		if insert_values:
+			self._insert_sorted(self._fit_all(insert_values))
+
+	def _build_sorted(self, values: List[int], pool: Optional[Executor], shards: int) -> None:
+		"""
+		Fill an empty trie with a batch of values, split into subtrees exactly as inserting them
+		in one batch would; the subtrees, the trie of their representatives and the tables
+		holding them are all built across the pool if there is one
+
+		:param values: The values to add to the trie, validated and in ascending order
+		:param pool: The pool of processes to build the trie in, or None to build it in this process
+		:param shards: The number of runs of subtrees to build separately
+		"""
+		if self._journal is not None:
+			self._journal._log_insert_many(values)
+
+		if self._cache is not None:
+			self._cache.invalidate()
 
-		elif len(subtree) < self._min_subtree_size and len(self._partitions) > 1:
-			if rep_node.pred is not None:
-				left_rep = rep_node.pred
-				right_rep = rep_node
+		if not values:
+			return
+
+		keys = [value for (index, value) in enumerate(values) if index == 0 or values[index - 1] != value]
+		starts: List[int] = []
+		self._partition_bounds(0, len(keys), starts)
+		stops = starts[1:] + [len(keys)]
+		reps = [keys[start] - 1 for start in starts[1:]]
+		reps.append(self._top_rep)
+
+		per_shard = -(-len(starts) // shards)
+		tasks = [(pack_values(keys[starts[first]:stops[min(first + per_shard, len(starts)) - 1]], self._maxlen),
+				  [start - starts[first] for start in starts[first:first + per_shard]])
+				 for first in range(0, len(starts), per_shard)]
+		trees = [tree for shard in run_tasks(pool, build_containers, tasks) for tree in shard]
+		tables = run_tasks(pool, index_table, [pack_values(reps, self._maxlen)] * (1 if self._payloads is None else 2))
+
+		self._partitions._build_sorted(reps, pool, shards)
+		self._subtrees = adopt_values(tables[0], trees)
+
+		if self._payloads is not None:
+			if self._multiset:
+				multiplicities = Counter(values)
+				payload: List[Any] = [multiplicities[key] for key in keys]
 			else:
-				left_rep = rep_node
-				right_rep = rep_node.succ
+				payload = [None] * len(keys)
 
-			left_tree = self._subtrees[left_rep.value]
-			right_tree = self._subtrees[right_rep.value]
+			self._payloads = adopt_values(tables[1], [payload[start:stop] for (start, stop) in zip(starts, stops)])
 
-			# Out with the old
-			del self._subtrees[left_rep.value]
-			del self._subtrees[right_rep.value]
-			self._partitions -= left_rep.value
-			self._partitions -= right_rep.value
+		if self._warm is not None:
+			self._warm.update(reps)
 
-			# In with the new
-			tree: SortedList
-			for tree in filter(None, self._merge_subtrees(left_tree, right_tree, 2 * self._maxlen)):
-				rep = self._calculate_representative(max(tree), self._maxlen)
-				self._partitions += rep
-				self._subtrees[rep] = tree
+		self._count = len(values) if self._multiset else len(keys)
+		self._min = keys[0]
+		self._max = keys[-1]
 
-		self._count -= 1
+		if self._prefilter is not None:
+			self._rebuild_prefilter(keys)
 
-	def successor(self, value: Union[int, bytes]) -> Optional[int]:
+	def build_parallel(self, values: Iterable[Union[int, bytes]], workers: Optional[int]=None) -> None:
 		"""
-		Find the smallest value in the trie strictly greater than the given value,
-		if it exists
+		Replace the contents of the trie with a batch of values,
+		building the trie across a pool of processes;
+		every value is validated before the trie is modified
 
-		:param value: The value to find the successor of
-		:return: The successor of the given value, or None if it doesn't exist
+		:param values: The values to fill the trie with
+		:param workers: The number of processes to build the trie with, one for every CPU by default;
+						a single worker builds the trie in this process
 		"""
-		value = XFastTrie._to_int(value, self._maxlen)
-		subtree, rep_node = self._get_value_subtree(value)
+		if workers is not None and workers < 1:
+			raise ValueError("Trie must be built by at least one worker")
 
-		# subtree should be None only if the trie is empty
-		if subtree is None and self._count == 0:
-			raise ValueError("No values exist in trie")
-		elif value >= cast(int, self._max) or self._max is None:
-			return None
-		elif value < cast(int, self._min):
-			return self._min
+		keys = XFastTrie._to_ints(values, self._length_limit)
+		self.clear()
+		keys = sorted(self._fit_all(keys))
+		workers = workers or cpu_count() or 1
+
+		# Subtrees are all about the same size, but the trie of representatives is split
+		# into shards that vary in size, so there are a few for every worker to even out the load
+		with paused_collection():
+			if workers == 1:
+				self._build_sorted(keys, None, 1)
+			else:
+				with ProcessPoolExecutor(workers) as pool:
+					self._build_sorted(keys, pool, 4 * workers)
 
-		subtree = cast(SortedList, subtree)
-		rep_node = cast(TrieNode, rep_node)
-		if max(subtree) <= value:
-			subtree = self._subtrees[rep_node.succ.value]
+	def ceiling(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the trie at least as large as the given value,
+		if it exists
 
-		return cast(int, subtree[subtree.bisect_right(value)])
+		:param value: The value to find the ceiling of
+		:return: The ceiling of the given value, or None if it doesn't exist
+		"""
+		return self._slot_value(self._get_ceiling_slot(self._to_key(value)))
 
-	@property
-	def max(self) -> Optional[int]:
+	def ceiling_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional[int]]:
 		"""
-		The maximum value in the trie
+		Find the ceilings of a batch of values
 
-		:return: The maximum value in the trie,
-				 or None if the trie is empty
+		:param values: The values to find the ceilings of
+		:return: The ceiling of each value, in order
 		"""
-		return self._max
+		return [self._slot_value(self._get_ceiling_slot(value))
+				for value in self._to_keys(values)]
 
-	@property
-	def min(self) -> Optional[int]:
+	def compact(self) -> None:
 		"""
-		The minimum value in the trie
+		Re-pack every value into subtrees filled to the middle of their allowed size,
+		and rebuild the X-fast trie of representatives and every hash table to fit,
+		in a single pass; worth doing after removing a large share of the trie's values,
+		which leaves behind underfull subtrees and hash tables sized for the old contents
 
-		:return: The minimum value in the trie,
-				 or None if the trie is empty
+		Subtrees already fuller than that are only evened out, never split up,
+		so compacting a trie never leaves it with more subtrees than before
+
+		Tries created with a compaction threshold compact themselves whenever removals leave
+		their subtrees holding less than that fraction of a compacted subtree's values on average
+
+		Tries that freeze their subtrees freeze the new subtrees holding only values from frozen ones
+		straight away, and start counting modifications towards the next freeze afresh
 		"""
-		return self._min
+		values: List[int] = []
+		payload: Optional[List[Any]] = [] if self._payloads is not None else None
+		subtree_count = len(self._subtrees)
+		thawed_starts: List[int] = []
+		thawed_stops: List[int] = []
 
-	def __init__(self,
-				 max_length: int=(maxsize.bit_length() + 1)):
-		self._maxlen = max_length
-		self._min_subtree_size = max_length // 2
-		self._max_subtree_size = max_length * 2
-		self.clear()
+		for rep in self._partitions:
+			subtree = self._subtrees[rep]
+
+			if self._warm is not None and not isinstance(subtree, FrozenContainer):
+				thawed_starts.append(len(values))
+				thawed_stops.append(len(values) + len(subtree))
+
+			values.extend(subtree)
+
+			if payload is not None:
+				payload.extend(cast(HopscotchDict, self._payloads)[rep])
+
+		self._partitions = XFastTrie(self._maxlen)
+		self._subtrees = HopscotchDict()
+		self._payloads = HopscotchDict() if payload is not None else None
+		self._rank_index = None
+
+		# Every subtree is new, so none are shared with any snapshot
+		self._shared = False
+		self._owned = None
+		self._decoded.clear()
+
+		# The values are spread evenly over as many subtrees as it takes to fill them to the target size,
+		# though never so few that they overflow, nor more than there were
+		bounds = [0]
+		reps = []
+		warm: Set[int] = set()
+
+		if values:
+			subtree_count = min(subtree_count,
+								max(len(values) // self._target_subtree_size,
+									-(-len(values) // self._max_subtree_size),
+									1))
+			bounds = [len(values) * index // subtree_count for index in range(subtree_count + 1)]
+
+		for (start, stop) in zip(bounds, bounds[1:]):
+			rep = values[stop] - 1 if stop < len(values) else self._top_rep
+			reps.append(rep)
+			self._subtrees[rep] = make_container(values[start:stop])
+
+			if payload is not None:
+				cast(HopscotchDict, self._payloads)[rep] = payload[start:stop]
+
+			# A subtree stays warm if any of its values came from a subtree that wasn't frozen
+			thawed = bisect_right(thawed_stops, start)
+
+			if self._warm is not None and thawed < len(thawed_starts) and thawed_starts[thawed] < stop:
+				warm.add(rep)
+
+		self._partitions.update(reps)
+
+		if self._warm is not None:
+			self._warm = warm
+			self._freeze_subtrees()
+
+		if self._prefilter is not None:
+			self._rebuild_prefilter(values)
+
+	def _contains(self, value: int) -> bool:
+		"""
+		Check whether the given value is in the trie, assuming it has already been validated
+
+		:param value: The value to look for
+		:return: Whether the value is in the trie
+		"""
+		if self._prefilter is not None and value not in self._prefilter:
+			return False
 
-	def __contains__(self, value: Union[int, bytes]) -> bool:
-		value = XFastTrie._to_int(value, self._maxlen)
 		subtree, _ = self._get_value_subtree(value)
 		return subtree is not None and value in subtree
 
-	def __gt__(self, value: Union[int, bytes]) -> Optional[int]:
-		value = XFastTrie._to_int(value, self._maxlen)
-		return self.successor(value)
+	def contains_many(self, values: Iterable[Union[int, bytes]]) -> List[bool]:
+		"""
+		Check whether each of a batch of values is in the trie;
+		a trie with a prefilter checks the whole batch against it first,
+		hashing NumPy arrays of integers a whole array at a time,
+		and only searches for the values the prefilter can't rule out
 
-	def __iadd__(self, value: Union[int, bytes]) -> "YFastTrie":
-		value = XFastTrie._to_int(value, self._maxlen)
-		self.insert(value)
-		return self
+		:param values: The values to look for
+		:return: Whether each value is in the trie, in order
+		"""
+		keys = self._to_keys(values)
 
-	def __isub__(self, value: Union[int, bytes]) -> "YFastTrie":
-		value = XFastTrie._to_int(value, self._maxlen)
-		self.remove(value)
-		return self
+		if self._prefilter is None:
+			return [self._contains(key) for key in keys]
 
-	def __iter__(self) -> Iterable[int]:
-		for rep in sorted(self._subtrees):
-			for value in self._subtrees[rep]:
-				yield value
+		# Only arrays of integers can be hashed whole; any other array was converted like a list
+		array = cast(Any, values)
+		integral = hasattr(array, "dtype") and array.dtype.kind in "iu"
+		found = self._prefilter.contains_many(array if integral else keys)
 
-	def __len__(self) -> int:
-		return self._count
+		for (index, key) in enumerate(keys):
+			if found[index]:
+				subtree, _ = self._get_value_subtree(key)
+				found[index] = subtree is not None and key in subtree
 
-	def __lt__(self, value: Union[int, bytes]) -> Optional[int]:
-		value = XFastTrie._to_int(value, self._maxlen)
-		return self.predecessor(value)
+		return found
+
+	def difference_update(self, values: Iterable[Union[int, bytes]]) -> None:
+		"""
+		Remove a batch of values from the trie, ignoring those not in the trie
+
+		:param values: The values to remove from the trie
+		"""
+		self.apply_batch(removes=values)
+
+	def floor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the trie at most as large as the given value,
+		if it exists
+
+		:param value: The value to find the floor of
+		:return: The floor of the given value, or None if it doesn't exist
+		"""
+		return self._slot_value(self._get_floor_slot(self._to_key(value)))
+
+	def floor_many(self, values: Iterable[Union[int, bytes]]) -> List[Optional[int]]:
+		"""
+		Find the floors of a batch of values
+
+		:param values: The values to find the floors of
+		:return: The floor of each value, in order
+		"""
+		return [self._slot_value(self._get_floor_slot(value))
+				for value in self._to_keys(values)]
+
+	def insert(self, value: Union[int, bytes]) -> None:
+		"""
+		Insert a value into the trie
+
+		:param value: The value to insert into the trie
+		"""
+		self._insert(self._fit(self._to_key(value)))
+
+	def _invalidate_results(self, low: int, high: int) -> None:
+		"""
+		Drop every cached result that adding or removing values in the given range could change;
+		those are the results for values from the closest value in the trie below the range
+		to the closest one above it, or every result if the cache doesn't invalidate by range
+
+		:param low: The smallest value being added or removed
+		:param high: The largest value being added or removed
+		"""
+		cache = cast(ResultCache, self._cache)
+
+		if not cache.ranged or self._count == 0:
+			cache.invalidate()
+			return
+
+		cache.invalidate_range(self._predecessor(low), self._successor(high))
+
+	def nearest(self, value: Union[int, bytes]) -> int:
+		"""
+		Find the value in the trie closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to find the nearest neighbor of
+		:return: The value in the trie closest to the given value
+		"""
+		return self._get_nearest(self._to_key(value))
+
+	def nearest_many(self, values: Iterable[Union[int, bytes]]) -> List[int]:
+		"""
+		Find the nearest neighbors of a batch of values
+
+		:param values: The values to find the nearest neighbors of
+		:return: The nearest neighbor of each value, in order
+		"""
+		return [self._get_nearest(value) for value in self._to_keys(values)]
+
+	def pop_max(self) -> int:
+		"""
+		Remove and return the largest value in the trie,
+		taking it straight from the last subtree without merging subtrees
+
+		:return: The largest value in the trie
+		"""
+		return self._pop_edge(-1)
+
+	def pop_min(self) -> int:
+		"""
+		Remove and return the smallest value in the trie,
+		taking it straight from the first subtree without merging subtrees
+
+		:return: The smallest value in the trie
+		"""
+		return self._pop_edge(0)
+
+	def pop_min_many(self, count: int) -> List[int]:
+		"""
+		Remove and return the smallest values in the trie,
+		emptying the first subtrees a whole run of values at a time
+
+		:param count: The most values to remove
+		:return: The removed values in ascending order;
+				 fewer than asked for if the trie runs out of values
+		"""
+		result: List[int] = []
+
+		if count <= 0 or self._count == 0:
+			return result
+
+		self._unshare_subtrees()
+
+		while len(result) < count and self._count > len(result):
+			rep = cast(int, self._partitions.min)
+			subtree = self._own_subtree(rep)
+			popped = len(result)
+
+			if self._multiset:
+				counts = cast(HopscotchDict, self._payloads)[rep]
+				taken = 0
+
+				while taken < len(subtree) and len(result) < count:
+					copies = min(counts[taken], count - len(result))
+					result.extend([subtree[taken]] * copies)
+					counts[taken] -= copies
+
+					if counts[taken] > 0:
+						break
+
+					taken += 1
+			else:
+				taken = min(len(subtree), count - len(result))
+				result.extend(subtree.islice(stop=taken))
+
+			del subtree[:taken]
+
+			if self._payloads is not None:
+				del self._payloads[rep][:taken]
+
+			if len(subtree) == 0:
+				self._evict_subtree(rep)
+			else:
+				self._update_rank_index(rep, popped - len(result))
+				self._refit_subtree(rep, subtree)
+
+		self._count -= len(result)
+
+		if self._journal is not None:
+			self._journal._log_remove_many(result)
+
+		if self._cache is not None:
+			self._cache.invalidate()
+
+		if self._count == 0:
+			self._min = self._max = None
+		else:
+			self._min = self._subtrees[self._partitions.min][0]
+
+		self._check_fill()
+		return result
+
+	def predecessor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the trie strictly less than the given value,
+		if it exists
+
+		:param value: The value to find the predecessor of
+		:return: The predecessor of the given value, or None if it doesn't exist
+		"""
+		if self._cache is not None:
+			return cast(Optional[int], self._cache.lookup("predecessor", value, self._to_key, self._predecessor))
+
+		return self._predecessor(self._to_key(value))
+
+	def _predecessor(self, value: int) -> Optional[int]:
+		"""
+		Find the largest value in the trie strictly less than the given value,
+		assuming it has already been validated
+
+		:param value: The value to find the predecessor of
+		:return: The predecessor of the given value, or None if it doesn't exist
+		"""
+		subtree, rep_node = self._get_value_subtree(value)
+
+		# subtree should be None only if the trie is empty
+		if subtree is None and self._count == 0:
+			raise ValueError("No values exist in trie")
+		elif value <= cast(int, self._min) or self._min is None:
+			return None
+		elif value > cast(int, self._max):
+			return self._max
+
+		subtree = cast(Container, subtree)
+		rep_node = cast(TrieNode, rep_node)
+		if subtree[0] >= value:
+			subtree = self._subtrees[rep_node.pred.value]
+
+		return subtree.predecessor(value)
+
+	def _locate_rank(self, rank: int) -> Tuple[int, int, int]:
+		"""
+		Find where the value with the given rank is stored
+
+		:param rank: The number of values in the trie smaller than the desired one,
+					 counting every copy of a value in a multiset
+		:return: The representative of the subtree holding the desired value,
+				 the index of the value in that subtree,
+				 and how many copies of that value precede the desired one
+		"""
+		rep, rank = self._build_rank_index().locate(rank)
+
+		if not self._multiset:
+			return (rep, rank, 0)
+
+		index = 0
+		counts = cast(HopscotchDict, self._payloads)[rep]
+
+		while rank >= counts[index]:
+			rank -= counts[index]
+			index += 1
+
+		return (rep, index, rank)
+
+	def _update_rank_index(self, rep: int, delta: int) -> None:
+		"""
+		Account for values added to or removed from a subtree in the rank index,
+		if the trie has one
+
+		:param rep: The representative of the subtree that changed
+		:param delta: The change in the number of values in the subtree
+		"""
+		if self._rank_index is not None:
+			self._rank_index.add(rep, delta)
+
+	def _merge_values(self,
+					  keys: Iterable[int],
+					  payload: Optional[List[Any]],
+					  values: List[int],
+					  start: int,
+					  stop: int,
+					  payloads: Optional[List[Any]]) -> Tuple[List[int], Optional[List[Any]]]:
+		"""
+		Merge a run of sorted values into the contents of a subtree,
+		counting every value that is actually added to the trie
+
+		:param keys: The values already in the subtree, in ascending order
+		:param payload: The payloads of the values already in the subtree, if the trie stores them
+		:param values: The values to merge, in ascending order
+		:param start: The index of the first value to merge
+		:param stop: The index after the last value to merge
+		:param payloads: The payloads of the values to merge, if given
+		:return: The merged values, and their payloads if the trie stores them
+		"""
+		merged_keys: List[int] = []
+		merged_payload: Optional[List[Any]] = [] if self._payloads is not None else None
+		old_keys = list(keys)
+		index = 0
+
+		for position in range(start, stop):
+			value = values[position]
+
+			while index < len(old_keys) and old_keys[index] <= value:
+				merged_keys.append(old_keys[index])
+
+				if merged_payload is not None:
+					merged_payload.append(cast(List[Any], payload)[index])
+
+				index += 1
+
+			if merged_keys and merged_keys[-1] == value:
+				if self._multiset:
+					cast(List[Any], merged_payload)[-1] += 1
+					self._count += 1
+				elif payloads is not None and merged_payload is not None:
+					merged_payload[-1] = payloads[position]
+				continue
+
+			merged_keys.append(value)
+			self._count += 1
+
+			if merged_payload is not None:
+				if self._multiset:
+					merged_payload.append(1)
+				else:
+					merged_payload.append(payloads[position] if payloads is not None else None)
+
+		merged_keys.extend(old_keys[index:])
+
+		if merged_payload is not None:
+			merged_payload.extend(cast(List[Any], payload)[index:])
+
+		return (merged_keys, merged_payload)
+
+	def _partition_subtree(self, values: List[int]) -> List[Container]:
+		"""
+		Split any number of values into trees small enough to be subtrees of the trie,
+		halving them at their medians until they fit;
+		only the final trees are built, as only their sizes decide which kind of container suits them
+
+		:param values: The values to split, in ascending order
+		:return: The trees holding the given values, in ascending order
+		"""
+		starts: List[int] = []
+		self._partition_bounds(0, len(values), starts)
+		return build_containers((values, starts))
+
+	def _partition_bounds(self, start: int, stop: int, starts: List[int]) -> None:
+		"""
+		Find where each of the trees a run of values is split into by _partition_subtree starts
+
+		:param start: The index of the first value in the run
+		:param stop: The index after the last value in the run
+		:param starts: The list to add the index of the first value of every tree to, in ascending order
+		"""
+		if stop - start <= self._max_subtree_size:
+			starts.append(start)
+			return
+
+		median = start + (stop - start) // 2
+		self._partition_bounds(start, median, starts)
+		self._partition_bounds(median, stop, starts)
+
+	def _rebalance_subtree(self, rep_node: TrieNode) -> None:
+		"""
+		Merge a subtree with one of its neighbors if it has become too small
+
+		:param rep_node: The node holding the representative of the subtree
+		"""
+		if len(self._subtrees[rep_node.value]) >= self._min_subtree_size or len(self._partitions) < 2:
+			return
+
+		if rep_node.pred is not None:
+			left_rep = rep_node.pred
+			right_rep = rep_node
+		else:
+			left_rep = rep_node
+			right_rep = rep_node.succ
+
+		left_value = cast(int, left_rep.value)
+		right_value = cast(int, right_rep.value)
+
+		# Merging modifies both subtrees in place
+		self._own_subtree(left_value)
+		self._own_subtree(right_value)
+
+		# Out with the old
+		left_tree, left_payload = self._evict_subtree(left_value)
+		right_tree, right_payload = self._evict_subtree(right_value)
+		payload = None
+
+		if left_payload is not None and right_payload is not None:
+			payload = left_payload + right_payload
+
+		# In with the new
+		self._install_subtrees(filter(None, self._merge_subtrees(left_tree, right_tree, 2 * self._maxlen)),
+							   payload,
+							   right_value)
+
+	def _pop_edge(self, side: int) -> int:
+		"""
+		Remove and return the value at one end of the trie
+
+		:param side: 0 to remove the smallest value, -1 to remove the largest
+		:return: The removed value
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		self._unshare_subtrees()
+		rep = cast(int, self._partitions.min if side == 0 else self._partitions.max)
+		subtree = self._own_subtree(rep)
+		value = subtree[side]
+		self._count -= 1
+
+		if self._journal is not None:
+			self._journal._log_remove(value)
+
+		if self._cache is not None:
+			self._invalidate_results(value, value)
+
+		self._update_rank_index(rep, -1)
+
+		# Multisets only need to give up the value once its last copy is removed
+		if self._multiset and cast(HopscotchDict, self._payloads)[rep][side] > 1:
+			cast(HopscotchDict, self._payloads)[rep][side] -= 1
+			return value
+
+		del subtree[side]
+
+		if self._payloads is not None:
+			del self._payloads[rep][side]
+
+		# The edge subtrees are drained rather than merged, and dropped once empty
+		if len(subtree) == 0:
+			self._evict_subtree(rep)
+			self._restore_top_rep()
+		else:
+			self._refit_subtree(rep, subtree)
+
+		if self._count == 0:
+			self._min = self._max = None
+		elif side == 0:
+			self._min = self._subtrees[self._partitions.min][0]
+		else:
+			self._max = self._subtrees[self._partitions.max][-1]
+
+		self._check_fill()
+		return value
+
+	def _remove_sorted(self, values: List[int]) -> None:
+		"""
+		Remove a batch of values from the trie in one sweep,
+		dropping or merging every subtree that shrinks too far a single time;
+		values not in the trie are ignored
+
+		:param values: The values to remove from the trie, validated and in ascending order
+		"""
+		if self._journal is not None:
+			self._journal._log_remove_many(values)
+
+		if self._cache is not None:
+			self._cache.invalidate()
+
+		self._unshare_subtrees()
+		start = 0
+		touched = []
+
+		while start < len(values) and self._count > 0:
+			subtree, rep_node = self._get_value_subtree(values[start])
+
+			# Every remaining value is larger than every value in the trie
+			if subtree is None:
+				break
+
+			rep = cast(int, cast(TrieNode, rep_node).value)
+			stop = bisect_right(values, rep, start)
+			subtree = self._own_subtree(rep)
+			payload = self._payloads[rep] if self._payloads is not None else None
+			count = self._count
+
+			for value in values[start:stop]:
+				if value not in subtree:
+					continue
+
+				index = subtree.bisect_left(value)
+				self._count -= 1
+
+				if self._multiset and cast(List[int], payload)[index] > 1:
+					cast(List[int], payload)[index] -= 1
+					continue
+
+				del subtree[index]
+
+				if payload is not None:
+					del payload[index]
+
+			self._update_rank_index(rep, self._count - count)
+			touched.append(rep)
+			start = stop
+
+		remaining = []
+
+		for rep in touched:
+			subtree = self._subtrees[rep]
+
+			if len(subtree) == 0:
+				self._evict_subtree(rep)
+			else:
+				self._refit_subtree(rep, subtree)
+				remaining.append(subtree[0])
+
+		self._restore_top_rep()
+
+		for value in remaining:
+			subtree, rep_node = self._get_value_subtree(value)
+			self._rebalance_subtree(cast(TrieNode, rep_node))
+
+		if self._count == 0:
+			self._min = self._max = None
+		else:
+			self._min = self._subtrees[self._partitions.min][0]
+			self._max = self._subtrees[self._partitions.max][-1]
+
+		self._check_fill()
+
+	def _remove_range(self, low: int, high: int) -> int:
+		"""
+		Remove every value in the trie from the given lower bound up to, but not including,
+		the given upper bound, assuming both have already been validated
+
+		:param low: The smallest value to remove
+		:param high: The value to stop removing at
+		:return: The number of values removed
+		"""
+		if self._count == 0 or low >= high:
+			return 0
+
+		self._unshare_subtrees()
+		first_slot = self._get_ceiling_slot(low)
+
+		if first_slot is None or self._subtrees[first_slot[0]][first_slot[1]] >= high:
+			return 0
+
+		if self._journal is not None:
+			self._journal._log_remove_range(low, high)
+
+		if self._cache is not None:
+			self._invalidate_results(low, high - 1)
+
+		first_rep, first_index = first_slot
+		last_rep, last_index = cast(Tuple[int, int], self._get_floor_slot(high - 1))
+		rep_nodes = self._partitions._level_tables[-1]
+		removed = 0
+
+		# Every subtree strictly between the boundary subtrees is dropped whole,
+		# and their representatives are cut out of the X-fast trie in one pass
+		if first_rep != last_rep:
+			rep_node = rep_nodes[first_rep].succ
+
+			while rep_node.value != last_rep:
+				removed += self._subtree_weight(rep_node.value)
+				del self._subtrees[rep_node.value]
+
+				if self._rank_index is not None:
+					self._rank_index.remove(rep_node.value)
+
+				if self._payloads is not None:
+					del self._payloads[rep_node.value]
+
+				rep_node = rep_node.succ
+
+			self._partitions._remove_range(first_rep + 1, last_rep)
+
+		# The boundary subtrees only lose the values inside the range
+		if first_rep == last_rep:
+			trims = [(first_rep, first_index, last_index + 1)]
+		else:
+			trims = [(first_rep, first_index, len(self._subtrees[first_rep])), (last_rep, 0, last_index + 1)]
+
+		for (rep, start, stop) in trims:
+			self._own_subtree(rep)
+
+			if self._multiset:
+				trimmed = sum(cast(HopscotchDict, self._payloads)[rep][start:stop])
+			else:
+				trimmed = stop - start
+
+			removed += trimmed
+			self._update_rank_index(rep, -trimmed)
+
+			del self._subtrees[rep][start:stop]
+
+			if self._payloads is not None:
+				del self._payloads[rep][start:stop]
+
+		self._count -= removed
+
+		# Drop or merge whatever is left of the boundary subtrees
+		remaining = []
+
+		for (rep, _, _) in trims:
+			subtree = self._subtrees[rep]
+
+			if len(subtree) == 0:
+				self._evict_subtree(rep)
+			else:
+				self._refit_subtree(rep, subtree)
+				remaining.append(subtree[0])
+
+		self._restore_top_rep()
+
+		for value in remaining:
+			subtree, rep_node = self._get_value_subtree(value)
+			self._rebalance_subtree(cast(TrieNode, rep_node))
+
+		if self._count == 0:
+			self._min = self._max = None
+		else:
+			self._min = self._subtrees[self._partitions.min][0]
+			self._max = self._subtrees[self._partitions.max][-1]
+
+		self._check_fill()
+		return removed
+
+	def _rebuild_prefilter(self, values: Iterable[int]) -> None:
+		"""
+		Replace the prefilter with one sized for twice as many values as the trie holds,
+		so values removed from the trie no longer pass it
+
+		:param values: Every value in the trie
+		"""
+		self._prefilter = BloomFilter(max(2 * self._count, PREFILTER_MIN_CAPACITY), cast(float, self._prefilter_rate))
+		self._prefilter.add_many(values)
+
+	def _refit_subtree(self, rep: int, subtree: Container) -> None:
+		"""
+		Move a subtree into a smaller kind of container after it changes, if there is one
+
+		:param rep: The representative of the subtree
+		:param subtree: The subtree itself
+		"""
+		refitted = subtree.refit()
+
+		if refitted is not subtree:
+			self._subtrees[rep] = refitted
+
+	def _restore_top_rep(self) -> None:
+		"""
+		Make sure the last subtree is represented by the largest value the trie can hold
+		after the subtree that was represented by it is dropped,
+		so every value larger than the last one in the trie still has a subtree to go in
+		"""
+		rep = self._partitions.max
+
+		if rep is not None and rep != self._top_rep:
+			self._own_subtree(rep)
+			tree, payload = self._evict_subtree(rep)
+			self._install_subtrees([tree], payload, self._top_rep)
+
+	def _subtree_weight(self, rep: int) -> int:
+		"""
+		Count the values in a subtree, including every copy of a value in a multiset
+
+		:param rep: The representative of the subtree
+		:return: The number of values in the subtree
+		"""
+		if self._multiset:
+			return sum(cast(HopscotchDict, self._payloads)[rep])
+		else:
+			return len(self._subtrees[rep])
+
+	def _check_fill(self) -> None:
+		"""
+		Compact the trie if automatic compaction is enabled
+		and its subtrees have become too empty on average
+		"""
+		if (self._compact_threshold is not None
+			and len(self._subtrees) > 1
+			and self._count < self._compact_threshold * self._target_subtree_size * len(self._subtrees)):
+			self.compact()
+
+	def _unshare_subtrees(self) -> None:
+		"""
+		Stop sharing the tables of subtrees with the latest snapshot of the trie
+		before the trie is modified; the subtrees themselves stay shared
+		until they are modified
+
+		Tries that freeze their subtrees count their modifications here,
+		as nothing is midway through being modified yet,
+		and freeze the subtrees that have gone cold every so many modifications
+		"""
+		if self._shared:
+			self._subtrees = copy_table(self._subtrees)
+
+			if self._payloads is not None:
+				self._payloads = copy_table(self._payloads)
+
+			self._owned = set()
+			self._shared = False
+
+		if self._warm is not None:
+			self._until_freeze = cast(int, self._until_freeze) - 1
+
+			if self._until_freeze == 0:
+				self._freeze_subtrees()
+
+	def _set_length(self, length: int) -> None:
+		"""
+		Set the bit length of the largest value the trie can currently hold,
+		and with it the bounds on the size of every subtree
+
+		:param length: The bit length of the largest value the trie can hold
+		"""
+		self._maxlen = length
+		self._min_subtree_size = length // 2
+		self._max_subtree_size = length * 2
+		self._target_subtree_size = (self._min_subtree_size + self._max_subtree_size) // 2
+		self._top_rep = 2 ** length - 1
+
+	def _to_key(self, value: Union[int, bytes]) -> int:
+		"""
+		Convert a value to the canonical value format; an adaptive trie accepts values
+		too big for its current length, which are larger than every representative
+
+		:param value: The value to be converted
+		:return: The value converted to an int
+		"""
+		return XFastTrie._to_int(value, self._length_limit)
+
+	def _to_keys(self, values: Iterable[Union[int, bytes]]) -> List[int]:
+		"""
+		Convert a batch of values to the canonical value format
+
+		:param values: The values to be converted
+		:return: The values converted to ints, in their original order
+		"""
+		return XFastTrie._to_ints(values, self._length_limit)
+
+	def _fit(self, value: int) -> int:
+		"""
+		Widen an adaptive trie first if a value about to be added
+		is too big for its current length
+
+		:param value: The value the trie needs to hold, in the canonical value format
+		:return: The given value
+		"""
+		if value.bit_length() > self._maxlen:
+			self._widen(value.bit_length())
+
+		return value
+
+	def _fit_all(self, values: List[int]) -> List[int]:
+		"""
+		Widen an adaptive trie first if any of a batch of values about to be added
+		is too big for its current length
+
+		:param values: The values the trie needs to hold, in the canonical value format
+		:return: The given values
+		"""
+		length = max(values).bit_length() if values else 0
+
+		if length > self._maxlen:
+			self._widen(length)
+
+		return values
+
+	def _widen(self, length: int) -> None:
+		"""
+		Rebuild an adaptive trie so it can hold values of the given bit length;
+		representatives and subtree sizes both depend on the length,
+		so every subtree is rebuilt, but the trie at least doubles in length each time
+		and so is only rebuilt a few times in its life
+
+		:param length: The bit length of the largest value the trie needs to hold
+		"""
+		self._set_length(min(self._length_limit, max(length, 2 * self._maxlen)))
+		self.compact()
+
+	def rank(self, value: Union[int, bytes]) -> int:
+		"""
+		Count the values in the trie strictly less than the given value
+
+		:param value: The value to find the rank of
+		:return: The number of values in the trie smaller than the given value
+		"""
+		value = self._to_key(value)
+		subtree, rep_node = self._get_value_subtree(value)
+
+		# The value is larger than every representative, and therefore every value
+		if subtree is None:
+			return self._count
+
+		return self._count_before(cast(int, cast(TrieNode, rep_node).value), subtree.bisect_left(value))
+
+	def remove(self, value: Union[int, bytes]) -> None:
+		"""
+		Remove the given value from the trie
+
+		:param value: The value to remove from the trie
+		"""
+		value = self._to_key(value)
+		subtree, rep_node = self._get_value_subtree(value)
+
+		# There should be no subtree only if the given value is not in the trie
+		if subtree is None or value not in subtree:
+			raise ValueError("Value does not exist in trie")
+
+		self._remove_at(value, cast(TrieNode, rep_node), subtree.bisect_left(value))
+
+	def _remove_at(self, value: int, rep_node: TrieNode, index: int) -> None:
+		"""
+		Remove a value from the trie once it has been found
+
+		:param value: The value to remove from the trie
+		:param rep_node: The node holding the representative of the subtree holding the value
+		:param index: The index of the value in its subtree
+		"""
+		if self._journal is not None:
+			self._journal._log_remove(value)
+
+		if self._cache is not None:
+			self._invalidate_results(value, value)
+
+		self._unshare_subtrees()
+		subtree = self._own_subtree(cast(int, rep_node.value))
+
+		# Multisets only need to give up the value once its last copy is removed
+		if self._multiset:
+			counts = cast(HopscotchDict, self._payloads)[rep_node.value]
+
+			if counts[index] > 1:
+				counts[index] -= 1
+				self._update_rank_index(cast(int, rep_node.value), -1)
+				self._count -= 1
+				return
+
+		min_succ: Optional[int]
+		max_pred: Optional[int]
+
+		if self._min == value:
+			if len(subtree) > 1:
+				min_succ = subtree[1]
+			else:
+				min_succ = self._successor(value)
+		else:
+			min_succ = -1
+
+		if self._max == value:
+			if len(subtree) > 1:
+				max_pred = subtree[-2]
+			else:
+				max_pred = self._predecessor(value)
+		else:
+			max_pred = -1
+
+		if min_succ != -1:
+			self._min = min_succ
+
+		if max_pred != -1:
+			self._max = max_pred
+
+		del subtree[index]
+
+		if self._payloads is not None:
+			del self._payloads[rep_node.value][index]
+
+		self._update_rank_index(cast(int, rep_node.value), -1)
+
+		if len(subtree) == 0:
+			self._evict_subtree(cast(int, rep_node.value))
+			self._restore_top_rep()
+		else:
+			self._refit_subtree(cast(int, rep_node.value), subtree)
+			self._rebalance_subtree(rep_node)
+
+		self._count -= 1
+		self._check_fill()
+
+	def remove_range(self, low: Union[int, bytes], high: Union[int, bytes]) -> int:
+		"""
+		Remove every value in the trie from the given lower bound up to,
+		but not including, the given upper bound
+
+		:param low: The smallest value to remove
+		:param high: The value to stop removing at
+		:return: The number of values removed
+		"""
+		return self._remove_range(self._to_key(low), self._to_key(high))
+
+	def replace(self, old: Union[int, bytes], new: Union[int, bytes]) -> None:
+		"""
+		Move a value to a new position in the trie, such as when the priority
+		of a queued entry changes; maps carry the old key's value over to the new key,
+		and multisets move a single copy of the value
+
+		:param old: The value to move
+		:param new: The value to move it to
+		"""
+		old = self._to_key(old)
+		new = self._to_key(new)
+		subtree, rep_node = self._get_value_subtree(old)
+
+		if subtree is None or old not in subtree:
+			raise ValueError("Value does not exist in trie")
+
+		index = subtree.bisect_left(old)
+		rep_node = cast(TrieNode, rep_node)
+		payload = None
+
+		if self._payloads is not None and not self._multiset:
+			payload = self._payloads[rep_node.value][index]
+
+		if old == new:
+			return
+
+		# Moving a value within its subtree only reorders that subtree
+		if (not self._multiset
+			and new <= cast(int, rep_node.value)
+			and (rep_node.pred is None or new > cast(int, rep_node.pred.value))
+			and new not in subtree):
+			if self._journal is not None:
+				self._journal._log_remove(old)
+				self._journal._log_insert(new)
+
+			if self._cache is not None:
+				self._invalidate_results(old, old)
+				self._invalidate_results(new, new)
+
+			self._unshare_subtrees()
+			subtree = self._own_subtree(cast(int, rep_node.value))
+			del subtree[index]
+
+			if not subtree.accepts(new):
+				self._subtrees[rep_node.value] = subtree = ArrayContainer(subtree)
+
+			subtree.add(new)
+
+			if self._payloads is not None:
+				payloads = self._payloads[rep_node.value]
+				del payloads[index]
+				payloads.insert(subtree.index(new), payload)
+
+			self._refit_subtree(cast(int, rep_node.value), subtree)
+
+			self._min = self._subtrees[self._partitions.min][0]
+			self._max = self._subtrees[self._partitions.max][-1]
+
+			if self._prefilter is not None:
+				self._extend_prefilter([new])
+		else:
+			self._remove_at(old, rep_node, index)
+			self._insert(self._fit(new), payload, True)
+
+	def select(self, rank: int) -> int:
+		"""
+		Find the value in the trie with the given rank
+
+		:param rank: The number of values in the trie smaller than the desired one,
+					 negative ranks counting back from the end of the trie
+		:return: The value with the given rank
+		"""
+		if rank < 0:
+			rank += self._count
+
+		if not 0 <= rank < self._count:
+			raise IndexError("Rank out of range")
+
+		rep, index, _ = self._locate_rank(rank)
+		return cast(int, self._subtrees[rep][index])
+
+	def snapshot(self) -> "YFastTrieSnapshot":
+		"""
+		Take a read-only view of the trie as it is now, in constant time;
+		the view shares its subtrees with the trie,
+		and the trie copies each subtree the first time it modifies it afterwards,
+		so the view never changes no matter how the trie is modified
+
+		Snapshots should be taken by whichever thread modifies the trie,
+		but may be read from any thread without locking
+
+		Besides copying the subtrees it modifies, each snapshot costs time proportional
+		to the number of subtrees twice over: the trie's first modification afterwards copies
+		the table of subtrees, and the snapshot's first search sorts their representatives;
+		at five million values that is under ten milliseconds each, see bench/snapshot_cycle.py
+
+		:return: A read-only view of the trie
+		"""
+		self._shared = True
+		return YFastTrieSnapshot(self)
+
+	def successor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value,
+		if it exists
+
+		:param value: The value to find the successor of
+		:return: The successor of the given value, or None if it doesn't exist
+		"""
+		if self._cache is not None:
+			return cast(Optional[int], self._cache.lookup("successor", value, self._to_key, self._successor))
+
+		return self._successor(self._to_key(value))
+
+	def _successor(self, value: int) -> Optional[int]:
+		"""
+		Find the smallest value in the trie strictly greater than the given value,
+		assuming it has already been validated
+
+		:param value: The value to find the successor of
+		:return: The successor of the given value, or None if it doesn't exist
+		"""
+		subtree, rep_node = self._get_value_subtree(value)
+
+		# subtree should be None only if the trie is empty
+		if subtree is None and self._count == 0:
+			raise ValueError("No values exist in trie")
+		elif value >= cast(int, self._max) or self._max is None:
+			return None
+		elif value < cast(int, self._min):
+			return self._min
+
+		subtree = cast(Container, subtree)
+		rep_node = cast(TrieNode, rep_node)
+		if subtree[-1] <= value:
+			subtree = self._subtrees[rep_node.succ.value]
+
+		return subtree.successor(value)
+
+	def count(self, value: Union[int, bytes]) -> int:
+		"""
+		Count how many times the given value is held in the trie
+
+		:param value: The value to count
+		:return: The multiplicity of the given value in the trie
+		"""
+		value = self._to_key(value)
+		subtree, rep_node = self._get_value_subtree(value)
+
+		if subtree is None or value not in subtree:
+			return 0
+		elif self._multiset:
+			index = subtree.bisect_left(value)
+			return cast(int, cast(HopscotchDict, self._payloads)[cast(TrieNode, rep_node).value][index])
+		else:
+			return 1
+
+	def truncate_above(self, value: Union[int, bytes]) -> int:
+		"""
+		Remove every value in the trie strictly greater than the given value
+
+		:param value: The largest value to keep
+		:return: The number of values removed
+		"""
+		return self._remove_range(self._to_key(value) + 1, 1 << self._maxlen)
+
+	def truncate_below(self, value: Union[int, bytes]) -> int:
+		"""
+		Remove every value in the trie strictly less than the given value
+
+		:param value: The smallest value to keep
+		:return: The number of values removed
+		"""
+		return self._remove_range(0, self._to_key(value))
+
+	def update(self, values: Iterable[Union[int, bytes]]) -> None:
+		"""
+		Add a batch of values to the trie
+
+		:param values: The values to add to the trie
+		"""
+		self.apply_batch(inserts=values)
+
+	@property
+	def max(self) -> Optional[int]:
+		"""
+		The maximum value in the trie
+
+		:return: The maximum value in the trie,
+				 or None if the trie is empty
+		"""
+		return self._max
+
+	@property
+	def min(self) -> Optional[int]:
+		"""
+		The minimum value in the trie
+
+		:return: The minimum value in the trie,
+				 or None if the trie is empty
+		"""
+		return self._min
+
+	def __init__(self,
+				 max_length: int=(maxsize.bit_length() + 1),
+				 multiset: bool=False,
+				 compact_threshold: Optional[float]=None,
+				 adaptive: bool=False,
+				 journal: Optional["Journal"]=None,
+				 freeze_after: Optional[int]=None,
+				 hot_subtrees: int=16,
+				 cache_size: int=0,
+				 range_invalidation: bool=False,
+				 prefilter_rate: Optional[float]=None) -> None:
+		if compact_threshold is not None and not 0 < compact_threshold < 1:
+			raise ValueError("Compaction threshold must be between 0 and 1")
+
+		if freeze_after is not None and freeze_after < 1:
+			raise ValueError("Subtrees can only be frozen after at least one modification")
+
+		if hot_subtrees < 0:
+			raise ValueError("Number of decoded subtrees to keep must be nonnegative")
+
+		if cache_size < 0:
+			raise ValueError("Number of cached results must be nonnegative")
+
+		if prefilter_rate is not None and not 0 < prefilter_rate < 1:
+			raise ValueError("Prefilter false positive rate must be between 0 and 1")
+
+		# Adaptive tries start out holding only short values, and are rebuilt
+		# to hold longer ones as they arrive, up to the maximum length;
+		# every change is recorded in the journal, if there is one;
+		# tries given a freezing interval compress the subtrees that go
+		# that many modifications without changing, keeping the given number
+		# of the most recently read ones decoded; tries given a cache size keep that many
+		# of the latest predecessor, successor and membership results until a change
+		# could affect them, either any change at all or, with range invalidation,
+		# one between the neighbors of the value queried; tries given a prefilter rate
+		# check values against a Bloom filter with that false positive rate before searching for them,
+		# rebuilding it whenever the trie is compacted or it fills up
+		self._adaptive = adaptive
+		self._compact_threshold = compact_threshold
+		self._freeze_after = freeze_after
+		self._hot_subtrees = hot_subtrees
+		self._length_limit = max_length
+		self._multiset = multiset
+		self._prefilter_rate = prefilter_rate
+		self._set_length(max_length)
+		self.clear()
+		self._journal = journal
+		self._cache = ResultCache(cache_size, range_invalidation) if cache_size > 0 else None
+
+	def __contains__(self, value: Union[int, bytes]) -> bool:
+		if self._cache is not None:
+			return cast(bool, self._cache.lookup("contains", value, self._to_key, self._contains))
+
+		return self._contains(self._to_key(value))
+
+	def __getitem__(self, index: Union[int, slice]) -> Union[int, List[int]]:
+		if not isinstance(index, slice):
+			return self.select(index)
+
+		ranks = range(*index.indices(self._count))
+
+		if len(ranks) == 0:
+			return []
+		elif ranks.step != 1:
+			return [self.select(rank) for rank in ranks]
+
+		# Contiguous slices only need to find where they start
+		result = []
+		rep, start, skip = self._locate_rank(ranks.start)
+		rep_node = self._partitions._level_tables[-1][rep]
+
+		while rep_node is not None:
+			rep = rep_node.value
+			subtree = self._subtrees[rep]
+
+			if self._multiset:
+				counts = cast(HopscotchDict, self._payloads)[rep]
+
+				for index in range(start, len(subtree)):
+					result.extend([subtree[index]] * (counts[index] - skip))
+					skip = 0
+			else:
+				result.extend(subtree.islice(start))
+
+			if len(result) >= len(ranks):
+				break
+
+			start = 0
+			rep_node = rep_node.succ
+
+		return cast(List[int], result[:len(ranks)])
+
+	def __gt__(self, value: Union[int, bytes]) -> Optional[int]:
+		value = self._to_key(value)
+		return self.successor(value)
+
+	def __iadd__(self, value: Union[int, bytes]) -> "YFastTrie":
+		value = self._to_key(value)
+		self.insert(value)
+		return self
+
+	def __isub__(self, value: Union[int, bytes]) -> "YFastTrie":
+		value = self._to_key(value)
+		self.remove(value)
+		return self
+
+	def __iter__(self) -> Iterator[int]:
+		for rep in sorted(self._subtrees):
+			if self._multiset:
+				for (value, count) in zip(self._subtrees[rep], cast(HopscotchDict, self._payloads)[rep]):
+					for _ in range(count):
+						yield value
+			else:
+				for value in self._subtrees[rep]:
+					yield value
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __lt__(self, value: Union[int, bytes]) -> Optional[int]:
+		value = self._to_key(value)
+		return self.predecessor(value)
+
+
+class YFastTrieMap(YFastTrie):
+	_stores_payloads = True
+
+	def _get_slot(self, key: int) -> Optional[Tuple[int, int]]:
+		"""
+		Find where the given key is stored
+
+		:param key: The key to search for
+		:return: The representative of the subtree holding the given key
+				 and its index in that subtree, or None if the key is not in the trie
+		"""
+		subtree, rep_node = self._get_value_subtree(key)
+
+		if subtree is None or key not in subtree:
+			return None
+
+		return (cast(int, cast(TrieNode, rep_node).value), subtree.bisect_left(key))
+
+	def _slot_item(self, slot: Optional[Tuple[int, int]]) -> Optional[Tuple[int, Any]]:
+		"""
+		Express a position in a subtree as a key/value pair
+
+		:param slot: The representative of a subtree and an index into it, or None
+		:return: The key and value stored at the given position,
+				 or None if there is no position
+		"""
+		if slot is None:
+			return None
+
+		rep, index = slot
+		return (cast(int, self._subtrees[rep][index]), cast(HopscotchDict, self._payloads)[rep][index])
+
+	def ceiling_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the smallest key at least as large as the given key
+
+		:param key: The key to search for
+		:return: The key/value pair with the smallest key not less than the given key,
+				 or None if it doesn't exist
+		"""
+		return self._slot_item(self._get_ceiling_slot(self._to_key(key)))
+
+	def floor_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the largest key at most as large as the given key
+
+		:param key: The key to search for
+		:return: The key/value pair with the largest key not greater than the given key,
+				 or None if it doesn't exist
+		"""
+		return self._slot_item(self._get_floor_slot(self._to_key(key)))
+
+	def get(self, key: Union[int, bytes], default: Any=None) -> Any:
+		"""
+		Retrieve the value stored under the given key
+
+		:param key: The key to look up
+		:param default: The value to return if the key is not in the trie
+		:return: The value stored under the given key, or the default
+		"""
+		item = self._slot_item(self._get_slot(self._to_key(key)))
+		return item[1] if item is not None else default
+
+	def items(self) -> Iterable[Tuple[int, Any]]:
+		"""
+		Iterate over the entries in the trie in key order
+
+		:return: The key/value pairs in the trie
+		"""
+		payloads = cast(HopscotchDict, self._payloads)
+
+		for rep in self._partitions:
+			for item in zip(self._subtrees[rep], payloads[rep]):
+				yield item
+
+	def keys(self) -> Iterable[int]:
+		"""
+		Iterate over the keys in the trie in order
+
+		:return: The keys in the trie
+		"""
+		for key in self:
+			yield key
+
+	def pred_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the largest key strictly less than the given key
+
+		:param key: The key to find the predecessor of
+		:return: The key/value pair preceding the given key, or None if it doesn't exist
+		"""
+		return self._slot_item(self._get_floor_slot(self._to_key(key) - 1))
+
+	def snapshot(self) -> "YFastTrieMapSnapshot":
+		"""
+		Take a read-only view of the trie as it is now, in constant time;
+		see YFastTrie.snapshot
+
+		:return: A read-only view of the trie
+		"""
+		self._shared = True
+		return YFastTrieMapSnapshot(self)
+
+	def succ_item(self, key: Union[int, bytes]) -> Optional[Tuple[int, Any]]:
+		"""
+		Find the entry with the smallest key strictly greater than the given key
+
+		:param key: The key to find the successor of
+		:return: The key/value pair following the given key, or None if it doesn't exist
+		"""
+		return self._slot_item(self._get_ceiling_slot(self._to_key(key) + 1))
+
+	def update(self,					   # type: ignore
+			   items: Union[Mapping[Union[int, bytes], Any], Iterable[Tuple[Union[int, bytes], Any]]]) -> None:
+		"""
+		Store a batch of entries in the trie,
+		replacing the values of keys already in the trie
+
+		:param items: A mapping, or an iterable of key/value pairs;
+					  the last value given for a key is kept
+		"""
+		pairs = sorted(((self._to_key(key), value)
+						for (key, value) in (items.items() if isinstance(items, Mapping) else items)),
+					   key=lambda pair: pair[0])
+
+		if pairs:
+			self._insert_sorted(self._fit_all([key for (key, _) in pairs]), [value for (_, value) in pairs])
+
+	def values(self) -> Iterable[Any]:
+		"""
+		Iterate over the values in the trie in key order
+
+		:return: The values in the trie
+		"""
+		for (_, value) in self.items():
+			yield value
+
+	def __init__(self,
+				 max_length: int=(maxsize.bit_length() + 1),
+				 compact_threshold: Optional[float]=None,
+				 adaptive: bool=False,
+				 freeze_after: Optional[int]=None,
+				 hot_subtrees: int=16,
+				 cache_size: int=0,
+				 range_invalidation: bool=False,
+				 prefilter_rate: Optional[float]=None) -> None:
+		super(YFastTrieMap, self).__init__(max_length,
+										   compact_threshold=compact_threshold,
+										   adaptive=adaptive,
+										   freeze_after=freeze_after,
+										   hot_subtrees=hot_subtrees,
+										   cache_size=cache_size,
+										   range_invalidation=range_invalidation,
+										   prefilter_rate=prefilter_rate)
+
+	def __delitem__(self, key: Union[int, bytes]) -> None:
+		key = self._to_key(key)
+
+		if self._get_slot(key) is None:
+			raise KeyError(key)
+
+		self.remove(key)
+
+	# Mappings are indexed by key rather than by rank
+	def __getitem__(self, key: Union[int, bytes]) -> Any:  # type: ignore
+		key = self._to_key(key)
+		item = self._slot_item(self._get_slot(key))
+
+		if item is None:
+			raise KeyError(key)
+
+		return item[1]
+
+	def __setitem__(self, key: Union[int, bytes], value: Any) -> None:
+		self._insert(self._fit(self._to_key(key)), value, True)
+
+
+class YFastTrieSnapshot(object):
+	_sorted_reps: Optional[List[int]]
+	_subtrees: HopscotchDict
+
+	def _get_ceiling_slot(self, value: int) -> Optional[Tuple[int, int]]:
+		"""
+		Find where the smallest value at least as large as the given value is stored
+
+		:param value: The value to search for
+		:return: The position of the subtree holding the smallest value
+				 not less than the given value and its index in that subtree,
+				 or None if no such value exists
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		reps = self._reps
+		position = bisect_left(reps, value)
+
+		# The value is larger than every representative, and therefore every value
+		if position == len(reps):
+			return None
+
+		index = self._subtrees[reps[position]].bisect_left(value)
+
+		if index < len(self._subtrees[reps[position]]):
+			return (position, index)
+		elif position + 1 < len(reps):
+			return (position + 1, 0)
+		else:
+			return None
+
+	def _get_floor_slot(self, value: int) -> Optional[Tuple[int, int]]:
+		"""
+		Find where the largest value at most as large as the given value is stored
+
+		:param value: The value to search for
+		:return: The position of the subtree holding the largest value
+				 not greater than the given value and its index in that subtree,
+				 or None if no such value exists
+		"""
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		reps = self._reps
+		position = min(bisect_left(reps, value), len(reps) - 1)
+		index = self._subtrees[reps[position]].bisect_right(value) - 1
+
+		if index >= 0:
+			return (position, index)
+		elif position > 0:
+			return (position - 1, len(self._subtrees[reps[position - 1]]) - 1)
+		else:
+			return None
+
+	def _slot_value(self, slot: Optional[Tuple[int, int]]) -> Optional[int]:
+		"""
+		Read the value stored at a position in a subtree
+
+		:param slot: The position of a subtree and an index into it, or None
+		:return: The value stored at the given position, or None if there is no position
+		"""
+		if slot is None:
+			return None
+
+		position, index = slot
+		return cast(int, self._subtrees[self._reps[position]][index])
+
+	@property
+	def _reps(self) -> List[int]:
+		"""
+		The representatives of every subtree in the snapshot,
+		sorted the first time they are needed
+
+		:return: The representatives of the snapshot's subtrees, in ascending order
+		"""
+		if self._sorted_reps is None:
+			self._sorted_reps = sorted(cast(Iterable[int], self._subtrees.keys()))
+
+		return self._sorted_reps
+
+	def ceiling(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the snapshot at least as large as the given value,
+		if it exists
+
+		:param value: The value to find the ceiling of
+		:return: The ceiling of the given value, or None if it doesn't exist
+		"""
+		return self._slot_value(self._get_ceiling_slot(XFastTrie._to_int(value, self._maxlen)))
+
+	def count(self, value: Union[int, bytes]) -> int:
+		"""
+		Count how many times the given value is held in the snapshot
+
+		:param value: The value to count
+		:return: The multiplicity of the given value in the snapshot
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+		slot = self._get_ceiling_slot(value) if self._count > 0 else None
+
+		if slot is None or self._slot_value(slot) != value:
+			return 0
+		elif self._multiset:
+			position, index = slot
+			return cast(int, cast(HopscotchDict, self._payloads)[self._reps[position]][index])
+		else:
+			return 1
+
+	def floor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the snapshot at most as large as the given value,
+		if it exists
+
+		:param value: The value to find the floor of
+		:return: The floor of the given value, or None if it doesn't exist
+		"""
+		return self._slot_value(self._get_floor_slot(XFastTrie._to_int(value, self._maxlen)))
+
+	def nearest(self, value: Union[int, bytes]) -> int:
+		"""
+		Find the value in the snapshot closest to the given value,
+		preferring the smaller value if two values are equally close
+
+		:param value: The value to find the nearest neighbor of
+		:return: The value in the snapshot closest to the given value
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+		below = self._slot_value(self._get_floor_slot(value))
+		above = self._slot_value(self._get_ceiling_slot(value))
+
+		if above is None or (below is not None and value - below <= above - value):
+			return cast(int, below)
+		else:
+			return above
+
+	def predecessor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the largest value in the snapshot strictly less than the given value,
+		if it exists
+
+		:param value: The value to find the predecessor of
+		:return: The predecessor of the given value, or None if it doesn't exist
+		"""
+		value = XFastTrie._to_int(value, self._maxlen)
+
+		if self._count == 0:
+			raise ValueError("No values exist in trie")
+
+		return self._slot_value(self._get_floor_slot(value - 1)) if value > 0 else None
+
+	def successor(self, value: Union[int, bytes]) -> Optional[int]:
+		"""
+		Find the smallest value in the snapshot strictly greater than the given value,
+		if it exists
+
+		:param value: The value to find the successor of
+		:return: The successor of the given value, or None if it doesn't exist
+		"""
+		return self._slot_value(self._get_ceiling_slot(XFastTrie._to_int(value, self._maxlen) + 1))
+
+	@property
+	def max(self) -> Optional[int]:
+		"""
+		The maximum value in the snapshot
+
+		:return: The maximum value in the snapshot,
+				 or None if the snapshot is empty
+		"""
+		return self._max
+
+	@property
+	def min(self) -> Optional[int]:
+		"""
+		The minimum value in the snapshot
+
+		:return: The minimum value in the snapshot,
+				 or None if the snapshot is empty
+		"""
+		return self._min
+
+	def __init__(self, trie: YFastTrie) -> None:
+		self._count = trie._count
+		self._max = trie._max
+		self._maxlen = trie._length_limit
+		self._min = trie._min
+		self._multiset = trie._multiset
+		self._payloads = trie._payloads
+		self._sorted_reps = None
+		self._subtrees = trie._subtrees
+
+	def __contains__(self, value: Union[int, bytes]) -> bool:
+		return self.count(value) > 0
+
+	def __gt__(self, value: Union[int, bytes]) -> Optional[int]:
+		return self.successor(value)
+
+	def __iter__(self) -> Iterator[int]:
+		for rep in self._reps:
+			if self._multiset:
+				for (value, count) in zip(self._subtrees[rep], cast(HopscotchDict, self._payloads)[rep]):
+					for _ in range(count):
+						yield value
+			else:
+				for value in self._subtrees[rep]:
+					yield value
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __lt__(self, value: Union[int, bytes]) -> Optional[int]:
+		return self.predecessor(value)
+
+
+class YFastTrieMapSnapshot(YFastTrieSnapshot):
+	def _slot_item(self, slot: Optional[Tuple[int, int]]) -> Optional[Tuple[int, Any]]:
+		"""
+		Express a position in a subtree as a key/value pair
+
+		:param slot: The position of a subtree and an index into it, or None
+		:return: The key and value stored at the given position,
+				 or None if there is no position
+		"""
+		if slot is None:
+			return None
+
+		position, index = slot
+		rep = self._reps[position]
+		return (cast(int, self._subtrees[rep][index]), cast(HopscotchDict, self._payloads)[rep][index])
+
+	def get(self, key: Union[int, bytes], default: Any=None) -> Any:
+		"""
+		Retrieve the value stored under the given key
+
+		:param key: The key to look up
+		:param default: The value to return if the key is not in the snapshot
+		:return: The value stored under the given key, or the default
+		"""
+		key = XFastTrie._to_int(key, self._maxlen)
+		item = self._slot_item(self._get_ceiling_slot(key)) if self._count > 0 else None
+		return item[1] if item is not None and item[0] == key else default
+
+	def items(self) -> Iterable[Tuple[int, Any]]:
+		"""
+		Iterate over the entries in the snapshot in key order
+
+		:return: The key/value pairs in the snapshot
+		"""
+		payloads = cast(HopscotchDict, self._payloads)
+
+		for rep in self._reps:
+			for item in zip(self._subtrees[rep], payloads[rep]):
+				yield item
+
+	def keys(self) -> Iterable[int]:
+		"""
+		Iterate over the keys in the snapshot in order
+
+		:return: The keys in the snapshot
+		"""
+		for key in self:
+			yield key
+
+	def values(self) -> Iterable[Any]:
+		"""
+		Iterate over the values in the snapshot in key order
+
+		:return: The values in the snapshot
+		"""
+		for (_, value) in self.items():
+			yield value
+
+	def __getitem__(self, key: Union[int, bytes]) -> Any:
+		key = XFastTrie._to_int(key, self._maxlen)
+		item = self._slot_item(self._get_ceiling_slot(key)) if self._count > 0 else None
+
+		if item is None or item[0] != key:
+			raise KeyError(key)
+
+		return item[1]
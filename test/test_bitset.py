@@ -0,0 +1,192 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+import pytest
+
+from hypothesis import given, settings
+from hypothesis.strategies import integers, lists
+from hypothesis.stateful import RuleBasedStateMachine, invariant, rule
+
+from py_fast_trie import BitsetTrie
+
+bitset_entry_size = 16
+bitset_max_value = (2 ** bitset_entry_size) - 1
+
+bitset_entry = integers(min_value=0, max_value=bitset_max_value)
+bitset_entries = lists(bitset_entry, min_size=1, max_size=200, unique=True)
+
+
+@given(integers(min_value=0, max_value=bitset_entry_size))
+def test_make_levels(depth):
+	levels = BitsetTrie._make_levels(depth)
+
+	assert len(levels[-1]) == 1
+	assert len(levels[0]) * 64 >= 2 ** depth
+
+	for lower, upper in zip(levels, levels[1:]):
+		assert len(upper) * 64 >= len(lower)
+
+
+def test_unsupported_length():
+	with pytest.raises(ValueError):
+		BitsetTrie(BitsetTrie.max_supported_length + 1)
+
+
+@given(bitset_entries, bitset_entries)
+def test_predecessor(entries, test_values):
+	t = BitsetTrie(bitset_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	for val in test_values:
+		smaller = [e for e in entries if e < val]
+		assert (t < val) == (max(smaller) if smaller else None)
+
+
+@given(bitset_entries, bitset_entries)
+def test_successor(entries, test_values):
+	t = BitsetTrie(bitset_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	for val in test_values:
+		larger = [e for e in entries if e > val]
+		assert (t > val) == (min(larger) if larger else None)
+
+
+@given(bitset_entries, bitset_entries)
+def test_floor_ceiling_nearest(entries, test_values):
+	t = BitsetTrie(bitset_entry_size)
+	value_of = (lambda v: v)
+
+	for entry in entries:
+		t += entry
+
+	for val in test_values:
+		below = [e for e in entries if e <= val]
+		above = [e for e in entries if e >= val]
+
+		assert value_of(t.floor(val)) == (max(below) if below else None)
+		assert value_of(t.ceiling(val)) == (min(above) if above else None)
+		assert value_of(t.nearest(val)) == min(sorted(entries), key=lambda e: abs(e - val))
+
+	assert [value_of(n) for n in t.floor_many(test_values)] == [value_of(t.floor(v)) for v in test_values]
+	assert [value_of(n) for n in t.ceiling_many(test_values)] == [value_of(t.ceiling(v)) for v in test_values]
+	assert [value_of(n) for n in t.nearest_many(test_values)] == [value_of(t.nearest(v)) for v in test_values]
+
+
+def test_many_array_input():
+	numpy = pytest.importorskip("numpy")
+	t = BitsetTrie(bitset_entry_size)
+
+	for entry in (3, 10, 400):
+		t += entry
+
+	value_of = (lambda v: v)
+	queries = numpy.array([0, 5, 11, 1000], dtype=numpy.uint32)
+
+	assert [value_of(n) for n in t.floor_many(queries)] == [None, 3, 10, 400]
+	assert [value_of(n) for n in t.ceiling_many(queries)] == [3, 10, 400, None]
+	assert [value_of(n) for n in t.nearest_many(queries)] == [3, 3, 10, 400]
+
+
+def test_successor_predecessor_empty_trie():
+	t = BitsetTrie(bitset_entry_size)
+
+	with pytest.raises(ValueError):
+		t.successor(0)
+
+	with pytest.raises(ValueError):
+		t.predecessor(0)
+
+	for method in (t.floor, t.ceiling, t.nearest):
+		with pytest.raises(ValueError):
+			method(0)
+
+
+def test_edges():
+	t = BitsetTrie(bitset_entry_size)
+	t += 0
+	t += bitset_max_value
+
+	assert (t > 0) == bitset_max_value
+	assert (t < bitset_max_value) == 0
+	assert (t > bitset_max_value) is None
+	assert (t < 0) is None
+	assert list(t) == [0, bitset_max_value]
+
+
+@given(bitset_entries)
+def test_clear(entries):
+	t = BitsetTrie(bitset_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	assert len(t) > 0
+
+	t.clear()
+
+	assert len(t) == 0
+	assert t.min is None
+	assert t.max is None
+	assert not any(any(level) for level in t._levels)
+
+
+@given(lists(bitset_entry, min_size=0, max_size=500, unique=True))
+def test_iter(entries):
+	t = BitsetTrie(bitset_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	assert list(t) == sorted(entries)
+
+
+class BitsetStateMachine(RuleBasedStateMachine):
+	def __init__(self):
+		super(BitsetStateMachine, self).__init__()
+		self.t = BitsetTrie(bitset_entry_size)
+		self.values = set()
+
+	@invariant()
+	def valid_count(self):
+		assert len(self.t) == len(self.values)
+
+	@invariant()
+	def valid_min_max(self):
+		assert self.t.min == (min(self.values) if self.values else None)
+		assert self.t.max == (max(self.values) if self.values else None)
+
+	@invariant()
+	def valid_summaries(self):
+		for lower, upper in zip(self.t._levels, self.t._levels[1:]):
+			for (index, word) in enumerate(lower):
+				assert bool(word) == bool(upper[index >> 6] >> (index & 63) & 1)
+
+	@rule(val=bitset_entry)
+	def insert_value(self, val):
+		self.t += val
+		self.values.add(val)
+
+	@rule(val=bitset_entry)
+	def remove_value(self, val):
+		if val not in self.t:
+			with pytest.raises(ValueError):
+				self.t -= val
+		else:
+			self.t -= val
+			self.values.remove(val)
+
+BitsetStateMachine.TestCase.settings = settings(max_examples=50, deadline=None)
+test_bitset_trie = BitsetStateMachine.TestCase
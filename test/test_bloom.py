@@ -0,0 +1,71 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+from random import Random
+
+import pytest
+
+from hypothesis import given
+from hypothesis.strategies import floats, integers, lists
+
+from py_fast_trie.bloom import BloomFilter
+
+
+@given(lists(integers(min_value=0, max_value=2 ** 100), max_size=300),
+	   lists(integers(min_value=0, max_value=2 ** 64 - 1), max_size=300),
+	   floats(min_value=0.001, max_value=0.5))
+def test_bloom_filter(values, probes, error_rate):
+	b = BloomFilter(max(1, len(values)), error_rate)
+	b.add_many(values)
+
+	assert len(b) <= len(set(values))
+	assert not b.full
+	assert all(value in b for value in values)
+	assert b.contains_many(probes) == [probe in b for probe in probes]
+
+
+def test_bloom_filter_rate():
+	rng = Random(0)
+	values = [rng.getrandbits(64) for _ in range(5000)]
+	b = BloomFilter(len(values), 0.01)
+	b.add_many(values)
+
+	probes = [rng.getrandbits(64) for _ in range(20000)]
+	assert sum(b.contains_many(probes)) < 0.02 * len(probes)
+
+	b.add_many(rng.getrandbits(64) for _ in range(10))
+	assert b.full
+
+
+def test_bloom_filter_array_input():
+	numpy = pytest.importorskip("numpy")
+	rng = Random(0)
+	values = [rng.getrandbits(64) for _ in range(1000)]
+	probes = values[::2] + [rng.getrandbits(64) for _ in range(1000)]
+	b = BloomFilter(len(values), 0.05)
+	b.add_many(values)
+
+	expected = [probe in b for probe in probes]
+
+	assert b.contains_many(numpy.array(probes, dtype=numpy.uint64)) == expected
+	assert b.contains_many(numpy.array([p >> 2 for p in probes], dtype=numpy.int64)) == [p >> 2 in b for p in probes]
+	assert b.contains_many(numpy.array(probes, dtype=object)) == expected
+
+
+def test_bloom_filter_errors():
+	with pytest.raises(ValueError):
+		BloomFilter(0, 0.1)
+
+	with pytest.raises(ValueError):
+		BloomFilter(10, 0)
+
+	with pytest.raises(ValueError):
+		BloomFilter(10, 1)
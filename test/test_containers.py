@@ -0,0 +1,176 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+from bisect import bisect_left, bisect_right, insort
+
+import pytest
+
+from hypothesis import given
+from hypothesis.strategies import integers, lists, one_of, sampled_from, tuples
+
+from py_fast_trie import YFastTrie
+from py_fast_trie.containers import (ArrayContainer,
+									 BitmapContainer,
+									 CONTAINER_KINDS,
+									 Container,
+									 DecodeCache,
+									 FrozenContainer,
+									 make_container,
+									 RunContainer,
+									 )
+
+# Mostly small values so bitmaps and runs show up, with the odd value too large for a machine word
+container_value = one_of(integers(min_value=0, max_value=300), integers(min_value=0, max_value=2 ** 70))
+container_operation = one_of(tuples(sampled_from(["add", "delete", "refit"]), container_value),
+							 tuples(sampled_from(["delete_slice"]), tuples(integers(-20, 20), integers(-20, 20))))
+
+
+def count_runs(values):
+	return sum(1 for (index, value) in enumerate(values) if index == 0 or values[index - 1] != value - 1)
+
+
+def check_queries(container, reference, probe):
+	assert list(container) == reference
+	assert len(container) == len(reference)
+	assert container.runs == count_runs(reference)
+	assert (probe in container) == (probe in reference)
+	assert container.bisect_left(probe) == bisect_left(reference, probe)
+	assert container.bisect_right(probe) == bisect_right(reference, probe)
+
+	index = bisect_left(reference, probe)
+	assert container.predecessor(probe) == (reference[index - 1] if index > 0 else None)
+
+	index = bisect_right(reference, probe)
+	assert container.successor(probe) == (reference[index] if index < len(reference) else None)
+
+	for index in range(-len(reference), len(reference)):
+		assert container[index] == reference[index]
+		assert list(container.islice(index)) == reference[index:]
+		assert list(container.islice(stop=index)) == reference[:index]
+
+
+@given(sampled_from(CONTAINER_KINDS),
+	   lists(integers(min_value=0, max_value=300), max_size=40, unique=True),
+	   lists(container_operation, max_size=40))
+def test_container_operations(kind, values, operations):
+	reference = sorted(values)
+	container = kind(reference)
+
+	for (operation, argument) in operations:
+		if operation == "add":
+			# Values a bitmap won't accept go in a sorted array instead, as in a Y-fast trie
+			if not container.accepts(argument):
+				container = ArrayContainer(container)
+
+			container.add(argument)
+
+			if argument not in reference:
+				insort(reference, argument)
+		elif operation == "delete" and reference:
+			index = argument % len(reference)
+			del container[index]
+			del reference[index]
+		elif operation == "delete_slice":
+			del container[argument[0]:argument[1]]
+			del reference[argument[0]:argument[1]]
+		elif operation == "refit":
+			container = container.refit()
+
+		check_queries(container, reference, argument if isinstance(argument, int) else 0)
+
+	copy = container.copy()
+	del copy[:]
+
+	assert type(copy) is type(container)
+	assert list(container) == reference
+
+
+def test_make_container():
+	sequential = list(range(1000, 1128))
+	assert isinstance(make_container(sequential), BitmapContainer)
+
+	# Long runs far apart from each other would make a huge bitmap
+	assert isinstance(make_container(sequential + list(range(2 ** 40, 2 ** 40 + 128))), RunContainer)
+
+	sparse = list(range(0, 2 ** 40, 2 ** 34))
+	assert isinstance(make_container(sparse), ArrayContainer)
+	assert isinstance(make_container([]), ArrayContainer)
+
+	# A bitmap gives up values too far from the rest to hold them cheaply
+	bitmap = BitmapContainer(sequential)
+	assert bitmap.accepts(2000)
+	assert not bitmap.accepts(2 ** 40)
+
+	# Containers only change kind once another would be much smaller
+	assert isinstance(ArrayContainer(sequential).refit(), BitmapContainer)
+	assert isinstance(BitmapContainer([0, 4096]).refit(), ArrayContainer)
+
+	sparse_array = ArrayContainer(sparse)
+	assert sparse_array.refit() is sparse_array
+
+	for _ in range(120):
+		del bitmap[1]
+
+	assert bitmap.refit() is bitmap
+
+	# A container missing part of the interface can't be created at all
+	class Incomplete(Container):
+		_load = ArrayContainer._load
+
+	with pytest.raises(TypeError):
+		Incomplete()
+
+	with pytest.raises(TypeError):
+		Container()
+
+
+@given(lists(container_value, min_size=1, max_size=40, unique=True), lists(container_value, max_size=10))
+def test_frozen_container(values, probes):
+	reference = sorted(values)
+	cache = DecodeCache(1)
+	frozen = FrozenContainer(reference, cache)
+	other = FrozenContainer(reference[:1], cache)
+
+	# Queries interleaved across two containers keep evicting each other's decoded values
+	for probe in probes:
+		check_queries(frozen, reference, probe)
+		check_queries(other, reference[:1], probe)
+		assert len(cache) <= 1
+
+	assert frozen.refit() is frozen
+	assert not frozen.accepts(reference[0])
+	assert frozen._size() < ArrayContainer(reference)._size() + len(reference)
+
+	thawed = frozen.thaw()
+	assert not isinstance(thawed, FrozenContainer)
+	assert list(thawed) == reference
+	assert type(frozen.copy()) is type(thawed)
+
+	with pytest.raises(TypeError):
+		frozen.add(reference[0])
+
+	with pytest.raises(ValueError):
+		FrozenContainer()
+
+
+@given(lists(integers(min_value=0, max_value=2 ** 16 - 1), max_size=300, unique=True))
+def test_trie_containers(entries):
+	t = YFastTrie(16)
+	t.update(entries)
+
+	for entry in entries[::2]:
+		t -= entry
+
+	for entry in range(1000, 1200):
+		t += entry
+
+	assert list(t) == sorted(set(entries[1::2]) | set(range(1000, 1200)))
+	assert any(isinstance(tree, BitmapContainer) for tree in t._subtrees.values())
@@ -0,0 +1,142 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+import pytest
+
+from hypothesis import given, settings
+from hypothesis.strategies import integers, lists, tuples
+from hypothesis.stateful import RuleBasedStateMachine, invariant, rule
+
+from py_fast_trie import IntervalTrie
+from test import (max_trie_entry_size,
+				  max_trie_value,
+				  valid_int_entries,
+				  valid_int_entry,
+				  )
+
+interval_bound = integers(min_value=0, max_value=255)
+interval = tuples(interval_bound, interval_bound).map(sorted)
+
+
+# Turn a set of cut points into disjoint ranges, skipping every other gap between them
+def build_ranges(bounds):
+	cuts = sorted(set(bounds))
+	return [(start, end - 1) for (start, end) in zip(cuts[::2], cuts[1::2]) if start < end]
+
+
+@given(lists(valid_int_entry, min_size=2, max_size=200), valid_int_entries)
+def test_find(bounds, points):
+	t = IntervalTrie(max_trie_entry_size)
+	ranges = build_ranges(bounds)
+
+	for (index, (start, end)) in enumerate(ranges):
+		t.add(start, end, index)
+
+	assert len(t) == len(ranges)
+	assert list(t) == [(start, end, index) for (index, (start, end)) in enumerate(ranges)]
+
+	expected = []
+	for point in points:
+		owners = [(s, e, i) for (i, (s, e)) in enumerate(ranges) if s <= point <= e]
+		expected.append(owners[0] if owners else None)
+
+		assert t.find(point) == expected[-1]
+		assert (point in t) == bool(owners)
+		assert t.get(point, "missing") == (owners[0][2] if owners else "missing")
+
+	assert t.find_many(points) == expected
+	assert t.get_many(points) == [found[2] if found else None for found in expected]
+
+
+def test_add_errors():
+	t = IntervalTrie(max_trie_entry_size)
+	t.add(10, 20, "a")
+
+	with pytest.raises(ValueError):
+		t.add(5, 4, "b")
+
+	for (start, end) in ((5, 10), (20, 30), (12, 15), (0, max_trie_value)):
+		with pytest.raises(ValueError):
+			t.add(start, end, "b")
+
+	with pytest.raises(KeyError):
+		t[21]
+
+	with pytest.raises(ValueError):
+		t.remove(9)
+
+	t.add(21, max_trie_value, "c")
+
+	assert t[max_trie_value] == "c"
+	assert t.remove(15) == (10, 20, "a")
+	assert 15 not in t
+
+
+def test_coalesce():
+	t = IntervalTrie(max_trie_entry_size, coalesce=True)
+	t.add(10, 19, "a")
+	t.add(30, 39, "a")
+	t.add(20, 29, "a")
+	t.add(40, 49, "b")
+	t.add(0, 9, "b")
+	t.add(50, max_trie_value, "b")
+
+	assert list(t) == [(0, 9, "b"), (10, 39, "a"), (40, max_trie_value, "b")]
+
+	t.clear()
+
+	assert len(t) == 0
+	assert t.find(0) is None
+
+
+class IntervalStateMachine(RuleBasedStateMachine):
+	def __init__(self):
+		super(IntervalStateMachine, self).__init__()
+		self.t = IntervalTrie(8, coalesce=True)
+		self.owners = {}
+
+	@invariant()
+	def valid_lookups(self):
+		for point in range(256):
+			assert self.t.get(point) == self.owners.get(point)
+
+	@invariant()
+	def coalesced(self):
+		ranges = list(self.t)
+
+		for ((_, end, value), (start, _, next_value)) in zip(ranges, ranges[1:]):
+			assert end < start
+			assert end + 1 < start or value != next_value
+
+	@rule(bounds=interval, value=integers(min_value=0, max_value=2))
+	def add_range(self, bounds, value):
+		start, end = bounds
+
+		if any(point in self.owners for point in range(start, end + 1)):
+			with pytest.raises(ValueError):
+				self.t.add(start, end, value)
+		else:
+			self.t.add(start, end, value)
+			self.owners.update((point, value) for point in range(start, end + 1))
+
+	@rule(point=interval_bound)
+	def remove_range(self, point):
+		if point in self.owners:
+			start, end, _ = self.t.remove(point)
+
+			for covered in range(start, end + 1):
+				del self.owners[covered]
+		else:
+			with pytest.raises(ValueError):
+				self.t.remove(point)
+
+IntervalStateMachine.TestCase.settings = settings(max_examples=50, deadline=None)
+test_interval_trie = IntervalStateMachine.TestCase
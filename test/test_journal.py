@@ -0,0 +1,236 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+from os.path import getsize, join
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from hypothesis import given, settings
+from hypothesis.strategies import booleans, integers, lists, one_of, sampled_from, tuples
+
+from py_fast_trie import checkpoint, recover, Journal, XFastTrie, YFastTrie, YFastTrieMap
+from py_fast_trie.journal import JOURNAL_HEADER
+from test import max_trie_entry_size, max_trie_value, valid_int_entry
+
+trie_operation = one_of(tuples(sampled_from(["insert", "remove", "pop", "clear"]), valid_int_entry),
+						tuples(sampled_from(["update", "difference_update"]), lists(valid_int_entry, max_size=20)),
+						tuples(sampled_from(["remove_range"]), tuples(valid_int_entry, valid_int_entry)))
+
+
+def apply_operations(t, operations):
+	for (operation, argument) in operations:
+		if operation == "insert":
+			t.insert(argument)
+		elif operation == "remove":
+			if argument in t:
+				t.remove(argument)
+		elif operation == "pop":
+			if isinstance(t, YFastTrie) and len(t) > 0:
+				t.pop_min() if argument % 2 else t.pop_max()
+		elif operation == "clear":
+			if argument % 8 == 0:
+				t.clear()
+		elif operation == "remove_range":
+			t.remove_range(min(argument), max(argument))
+		else:
+			getattr(t, operation)(argument)
+
+
+@settings(deadline=None)
+@given(lists(trie_operation, max_size=50),
+	   sampled_from([XFastTrie, YFastTrie]),
+	   booleans(),
+	   integers(min_value=1, max_value=16))
+def test_recover(operations, trie_type, multiset, group_size):
+	with TemporaryDirectory() as directory:
+		snapshot = join(directory, "trie.snapshot")
+
+		with Journal(join(directory, "trie.journal"), group_size) as journal:
+			t = trie_type(max_trie_entry_size, multiset=multiset, journal=journal)
+			apply_operations(t, operations)
+
+		with Journal(join(directory, "trie.journal")) as journal:
+			recovered = recover(snapshot, journal, trie_type(max_trie_entry_size, multiset=multiset))
+
+			assert type(recovered) is trie_type
+			assert list(recovered) == list(t)
+			assert len(recovered) == len(t)
+
+			# The journal keeps recording changes to the recovered trie
+			recovered.insert(max_trie_value)
+
+		with Journal(join(directory, "trie.journal")) as journal:
+			assert max_trie_value in recover(snapshot, journal, trie_type(max_trie_entry_size, multiset=multiset))
+
+
+@settings(deadline=None)
+@given(lists(trie_operation, max_size=30), lists(trie_operation, max_size=30), booleans())
+def test_checkpoint(before, after, multiset):
+	with TemporaryDirectory() as directory:
+		snapshot = join(directory, "trie.snapshot")
+		journal_path = join(directory, "trie.journal")
+
+		with Journal(journal_path, 4) as journal:
+			t = YFastTrie(max_trie_entry_size, multiset=multiset, journal=journal)
+			apply_operations(t, before)
+			journal.flush()
+
+			with open(journal_path, "rb") as journal_file:
+				stale_journal = journal_file.read()
+
+			checkpoint(t, snapshot)
+
+			assert getsize(journal_path) == JOURNAL_HEADER.size
+
+			apply_operations(t, after)
+
+		with Journal(journal_path) as journal:
+			recovered = recover(snapshot, journal)
+
+			assert isinstance(recovered, YFastTrie)
+			assert list(recovered) == list(t)
+
+		# A crash after the new snapshot is written but before the journal is emptied
+		# leaves behind a journal of changes the snapshot already holds
+		t = YFastTrie(max_trie_entry_size, multiset=multiset)
+		apply_operations(t, before)
+
+		with open(journal_path, "wb") as journal_file:
+			journal_file.write(stale_journal)
+
+		with Journal(journal_path) as journal:
+			recovered = recover(snapshot, journal)
+
+		assert list(recovered) == list(t)
+		assert getsize(journal_path) == JOURNAL_HEADER.size
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=40, unique=True), integers(min_value=1, max_value=16))
+def test_torn_group(entries, torn_length):
+	with TemporaryDirectory() as directory:
+		journal_path = join(directory, "trie.journal")
+
+		with Journal(journal_path, len(entries)) as journal:
+			t = XFastTrie(max_trie_entry_size, journal=journal)
+			t.update(entries)
+
+		size = getsize(journal_path)
+
+		# A crash partway through writing the next group leaves only some of it behind
+		with Journal(journal_path, 1) as journal:
+			t = recover(join(directory, "trie.snapshot"), journal, XFastTrie(max_trie_entry_size))
+			t.insert(max_trie_value)
+
+		with open(journal_path, "r+b") as journal_file:
+			journal_file.truncate(min(size + torn_length, getsize(journal_path) - 1))
+
+		# Lost changes aside, groups written after the torn one can still be read
+		with Journal(journal_path) as journal:
+			assert getsize(journal_path) == size
+			t = recover(join(directory, "trie.snapshot"), journal, XFastTrie(max_trie_entry_size))
+			assert list(t) == sorted(entries)
+			t.remove(entries[0])
+
+		with Journal(journal_path) as journal:
+			t = recover(join(directory, "trie.snapshot"), journal, XFastTrie(max_trie_entry_size))
+			assert list(t) == sorted(entries[1:])
+
+
+def test_unflushed_changes():
+	with TemporaryDirectory() as directory:
+		journal_path = join(directory, "trie.journal")
+		journal = Journal(journal_path, 4)
+		t = YFastTrie(max_trie_entry_size, journal=journal)
+
+		for value in range(6):
+			t += value
+
+		# Changes still being gathered when the process dies never reach the file
+		with Journal(journal_path) as reopened:
+			assert list(recover(join(directory, "trie.snapshot"), reopened, YFastTrie(max_trie_entry_size))) == [0, 1, 2, 3]
+
+		journal.close()
+
+
+def test_invalid_files():
+	with TemporaryDirectory() as directory:
+		journal_path = join(directory, "trie.journal")
+		snapshot = join(directory, "trie.snapshot")
+
+		with pytest.raises(ValueError):
+			Journal(journal_path, 0)
+
+		for contents in (b"", b"not a journal or a snapshot"):
+			for path in (journal_path, snapshot):
+				with open(path, "wb") as bad_file:
+					bad_file.write(contents)
+
+			with pytest.raises(ValueError):
+				Journal(journal_path)
+
+		with open(journal_path, "wb") as journal_file:
+			journal_file.write(JOURNAL_HEADER.pack(b"pyftjrnl", 0))
+
+		with Journal(journal_path) as journal:
+			with pytest.raises(ValueError):
+				recover(snapshot, journal)
+
+			t = YFastTrie(max_trie_entry_size, journal=journal)
+			t.update(range(10))
+			checkpoint(t, snapshot)
+
+			with open(snapshot, "r+b") as snapshot_file:
+				snapshot_file.seek(-5, 2)
+				snapshot_file.write(b"\xff")
+
+			with pytest.raises(ValueError):
+				recover(snapshot, journal)
+
+			with pytest.raises(ValueError):
+				recover(join(directory, "missing.snapshot"), journal)
+
+			with pytest.raises(TypeError):
+				recover(join(directory, "missing.snapshot"), journal, YFastTrieMap(max_trie_entry_size))
+
+			with pytest.raises(ValueError):
+				recover(join(directory, "missing.snapshot"), journal, t)
+
+
+def test_snapshot_shape():
+	with TemporaryDirectory() as directory:
+		journal_path = join(directory, "trie.journal")
+		snapshot = join(directory, "trie.snapshot")
+
+		with Journal(journal_path) as journal:
+			t = YFastTrie(32, multiset=True, journal=journal)
+			t.update([5, 5, 5, 7])
+			checkpoint(t, snapshot)
+
+			# Tries that can't hold everything in the snapshot are turned away before loading it
+			for trie in (YFastTrie(16, multiset=True), YFastTrie(32), XFastTrie(64)):
+				with pytest.raises(ValueError):
+					recover(snapshot, journal, trie)
+
+				assert len(trie) == 0
+
+			assert list(recover(snapshot, journal, XFastTrie(64, multiset=True))) == [5, 5, 5, 7]
+
+			t = YFastTrie(32, adaptive=True, journal=journal)
+			t.update([1, 2 ** 20])
+			checkpoint(t, snapshot)
+
+		with Journal(journal_path) as journal:
+			recovered = recover(snapshot, journal)
+
+		assert recovered._adaptive and not recovered._multiset
+		assert recovered._length_limit == 32
+		assert list(recovered) == [1, 2 ** 20]
@@ -0,0 +1,142 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+import pytest
+
+from hypothesis import given
+from hypothesis.strategies import data, integers, lists, sampled_from, tuples
+
+from py_fast_trie import MortonIndex
+
+coord_length = 6
+coord = integers(min_value=0, max_value=2 ** coord_length - 1)
+
+
+# Interleave coordinates one bit at a time, the first coordinate taking the lowest bit
+def interleave(point, length=coord_length):
+	return sum(((value >> bit) & 1) << (bit * len(point) + dimension)
+			   for (dimension, value) in enumerate(point)
+			   for bit in range(length))
+
+
+@given(data(), sampled_from([2, 3]))
+def test_encode(data, dimensions):
+	m = MortonIndex(coord_length * dimensions + 1, dimensions)
+	points = data.draw(lists(tuples(*[coord] * dimensions), max_size=50))
+
+	for point in points:
+		assert m.encode(point) == interleave(point)
+		assert m.decode(m.encode(point)) == point
+
+	assert m.decode(m.encode([2 ** coord_length - 1] * dimensions)) == (2 ** coord_length - 1,) * dimensions
+
+
+@given(data(), sampled_from([2, 3]))
+def test_query(data, dimensions):
+	point = tuples(*[coord] * dimensions)
+	m = MortonIndex(coord_length * dimensions, dimensions)
+	points = set(data.draw(lists(point, max_size=200)))
+	removed = set(data.draw(lists(sampled_from(sorted(points)), max_size=20))) if points else set()
+
+	m.update(points)
+
+	for entry in removed:
+		m.remove(entry)
+
+	points -= removed
+	corners = data.draw(tuples(point, point))
+	low = tuple(min(pair) for pair in zip(*corners))
+	high = tuple(max(pair) for pair in zip(*corners))
+	expected = sorted((entry for entry in points
+					   if all(l <= c <= h for (l, c, h) in zip(low, entry, high))),
+					  key=interleave)
+
+	assert len(m) == len(points)
+	assert list(m) == sorted(points, key=interleave)
+	assert list(m.query(low, high)) == expected
+	assert list(m.query(low, high, reverse=True)) == expected[::-1]
+
+	for entry in data.draw(lists(point, max_size=20)):
+		assert (entry in m) == (entry in points)
+
+
+def test_query_skips():
+	m = MortonIndex(16)
+	m.update((x, y) for x in range(256) for y in range(256))
+	searches = []
+
+	for name in ("ceiling", "floor", "predecessor", "successor"):
+		def search(value, original=getattr(m._keys, name)):
+			searches.append(value)
+			return original(value)
+
+		setattr(m._keys, name, search)
+
+	# A thin box spans most of the curve between its corners, but the search
+	# should only land outside it a few times for every point inside
+	expected = sorted(((x, y) for x in (100, 101) for y in range(256)), key=lambda point: interleave(point, 8))
+	assert list(m.query((100, 0), (101, 255))) == expected
+	assert len(searches) < 3 * 512
+
+	del searches[:]
+	assert list(m.query((100, 0), (101, 255), reverse=True)) == expected[::-1]
+	assert len(searches) < 3 * 512
+
+
+def test_query_changes():
+	m = MortonIndex(16)
+	m.update((x, x) for x in range(100))
+	seen = []
+
+	# Points removed ahead of the search are never found, and the search
+	# carries on from the last point found even if it is gone
+	for found in m.query((0, 0), (255, 255)):
+		seen.append(found)
+		m.remove(found)
+
+		if found[0] % 2 == 0 and found[0] < 99:
+			m.remove((found[0] + 1, found[0] + 1))
+
+	assert seen == [(x, x) for x in range(0, 100, 2)]
+	assert len(m) == 0
+
+	m.insert((1, 1))
+
+	for found in m.query((0, 0), (255, 255)):
+		m.clear()
+
+	assert list(m.query((0, 0), (255, 255))) == []
+
+
+def test_errors():
+	with pytest.raises(ValueError):
+		MortonIndex(dimensions=4)
+
+	with pytest.raises(ValueError):
+		MortonIndex(2, 3)
+
+	m = MortonIndex(8)
+
+	with pytest.raises(ValueError):
+		m.insert((1, 2, 3))
+
+	with pytest.raises(ValueError):
+		m.insert((16, 0))
+
+	with pytest.raises(ValueError):
+		m.remove((1, 1))
+
+	with pytest.raises(ValueError):
+		m.query((2, 0), (1, 5))
+
+	m.insert((15, 15))
+	assert list(m) == [(15, 15)]
+	assert m.encode((15, 15)) == 255
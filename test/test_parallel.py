@@ -0,0 +1,73 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+import pytest
+
+from hypothesis import given
+from hypothesis.strategies import integers, lists
+from py_hopscotch_dict import HopscotchDict
+
+from py_fast_trie.parallel import adopt_values, copy_table, index_table
+
+
+def test_hopscotch_internals():
+	# Tables are laid out by filling in HopscotchDict's own state,
+	# so any change to it must fail here rather than corrupt built tries
+	table = HopscotchDict()
+
+	for name in ("_keys", "_values", "_count", "_size", "_indices", "_nbhds", "_nbhd_size"):
+		assert hasattr(table, name)
+
+	assert 0 < HopscotchDict.MAX_DENSITY < 1
+
+	# Keys crowding one neighborhood fail to be laid out with the error index_table retries on
+	table._keys = [index << 20 for index in range(9)]
+	table._values = list(range(9))
+	table._count = 9
+
+	with pytest.raises(RuntimeError):
+		table._resize(16)
+
+
+@given(lists(integers(min_value=0, max_value=2 ** 70), unique=True, max_size=300), integers(min_value=0, max_value=30))
+def test_index_table(keys, crowded):
+	# Some keys share a home in every table small enough to hold them
+	keys = keys + [index << 40 for index in range(crowded) if index << 40 not in keys]
+	table = adopt_values(index_table(keys), [str(key) for key in keys])
+
+	assert len(table) == len(keys)
+	assert list(table) == keys
+	assert all(table[key] == str(key) for key in keys)
+	assert -1 not in table
+
+	# Built tables go on working like any other
+	table[-1] = "-1"
+
+	for key in keys:
+		del table[key]
+
+	assert dict(table.items()) == {-1: "-1"}
+
+	if keys:
+		with pytest.raises(ValueError):
+			adopt_values(index_table(keys), [])
+
+	# Copies share nothing with the table they were copied from
+	table = adopt_values(index_table(keys), [str(key) for key in keys])
+	copy = copy_table(table)
+	assert dict(copy.items()) == dict(table.items())
+
+	for key in keys:
+		copy[key + 2 ** 71] = key
+		del copy[key]
+
+	assert dict(table.items()) == {key: str(key) for key in keys}
+	assert dict(copy.items()) == {key + 2 ** 71: key for key in keys}
@@ -0,0 +1,150 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+import pytest
+
+from hypothesis import given
+from hypothesis.strategies import binary, integers, lists, tuples
+
+from py_fast_trie import PrefixTable
+
+prefix_entry = tuples(integers(min_value=0, max_value=(2 ** 32) - 1), integers(min_value=0, max_value=32))
+prefix_entries = lists(prefix_entry, min_size=1, max_size=100)
+addresses = lists(integers(min_value=0, max_value=(2 ** 32) - 1), min_size=1, max_size=100)
+
+
+def mask(address, length, width=32):
+	return address >> (width - length) << (width - length)
+
+
+def longest_match(routes, address, width=32):
+	matches = [(length, prefix) for (prefix, length) in routes if mask(address, length, width) == prefix]
+	return max(matches) if matches else None
+
+
+@given(prefix_entries, addresses)
+def test_lookup(entries, test_addresses):
+	t = PrefixTable(32)
+	routes = {}
+
+	for (address, length) in entries:
+		prefix = mask(address, length)
+		t.insert(prefix, length, (prefix, length))
+		routes[(prefix, length)] = (prefix, length)
+
+	assert len(t) == len(routes)
+	assert sorted(t, key=lambda entry: (entry[1], entry[0])) == list(t)
+	assert set((prefix, length) for (prefix, length, _) in t) == set(routes)
+
+	# Look up the stored prefixes themselves as well, and addresses just past them
+	test_addresses += [prefix for (prefix, _) in routes]
+	test_addresses += [prefix + (1 << (32 - length)) - 1 for (prefix, length) in routes]
+
+	for address in test_addresses:
+		match = longest_match(routes, address)
+		expected = (match[1], match[0]) if match else None
+
+		assert t.lookup(address) == expected
+		assert t.lookup_prefix(address) == ((expected[0], expected[1], expected) if expected else None)
+
+	assert t.lookup_many(test_addresses, "none") == [t.lookup(a, "none") for a in test_addresses]
+
+	for (prefix, length) in list(routes)[::2]:
+		t.remove(prefix, length)
+		del routes[(prefix, length)]
+
+	for address in test_addresses:
+		match = longest_match(routes, address)
+		assert t.lookup(address) == ((match[1], match[0]) if match else None)
+
+
+def search_state(t):
+	return [sorted(table.items()) for table in t._search_tables], [sorted(table.items()) for table in t._references]
+
+
+@given(lists(tuples(prefix_entry, integers(min_value=0, max_value=3)), min_size=1, max_size=100), addresses)
+def test_interleaved_updates(operations, test_addresses):
+	t = PrefixTable(32)
+	routes = {}
+
+	for ((address, length), op) in operations:
+		prefix = mask(address, length)
+
+		# Remove some of the time, otherwise add or replace the route
+		if op == 0 and routes:
+			(prefix, length) = sorted(routes)[address % len(routes)]
+			t.remove(prefix, length)
+			del routes[(prefix, length)]
+		else:
+			t.insert(prefix, length, op)
+			routes[(prefix, length)] = op
+
+		for lookup_address in test_addresses[:5] + [prefix]:
+			match = longest_match(routes, lookup_address)
+			assert t.lookup(lookup_address) == (routes[(match[1], match[0])] if match else None)
+
+	# Search tables kept up to date through removals match those of a table only ever added to
+	expected = PrefixTable(32)
+
+	for ((prefix, length), value) in sorted(routes.items(), reverse=True):
+		expected.insert(prefix, length, value)
+
+	assert search_state(t) == search_state(expected)
+	assert [list(keys) for keys in t._entry_keys] == [sorted(table.keys()) for table in t._search_tables]
+
+	for (prefix, length) in list(routes):
+		t.remove(prefix, length)
+
+	assert search_state(t) == search_state(PrefixTable(32))
+
+
+@given(lists(tuples(binary(min_size=16, max_size=16), integers(min_value=0, max_value=128)), min_size=1, max_size=50),
+	   lists(binary(min_size=16, max_size=16), min_size=1, max_size=50))
+def test_lookup_ipv6(entries, test_addresses):
+	t = PrefixTable(128)
+	routes = set()
+
+	for (address, length) in entries:
+		prefix = mask(int.from_bytes(address, "big"), length, 128)
+		t.insert(prefix, length, length)
+		routes.add((prefix, length))
+
+	for address in test_addresses:
+		match = longest_match(routes, int.from_bytes(address, "big"), 128)
+		assert t.lookup(address) == (match[0] if match else None)
+
+
+def test_prefix_errors():
+	t = PrefixTable(32)
+
+	with pytest.raises(ValueError):
+		t.insert(0x0A000001, 8, "host bits set")
+
+	with pytest.raises(ValueError):
+		t.insert(0, 33, "too long")
+
+	with pytest.raises(ValueError):
+		t.remove(0x0A000000, 8)
+
+	t.insert(0, 0, "default")
+	t.insert(0x0A000000, 8, "ten")
+	t.insert(0x0A000000, 8, "still ten")
+
+	assert len(t) == 2
+	assert t.get(0x0A000000, 8) == "still ten"
+	assert t.get(0x0A000000, 9) is None
+	assert t.lookup(0x0A0A0A0A) == "still ten"
+	assert t.lookup(0x0B000000) == "default"
+
+	t.clear()
+
+	assert len(t) == 0
+	assert t.lookup(0x0A0A0A0A, "none") == "none"
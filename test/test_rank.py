@@ -0,0 +1,68 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+from hypothesis import given, settings
+from hypothesis.strategies import integers, lists, tuples
+
+from py_fast_trie.rank import BLOCK_SIZE, RankIndex
+
+
+@settings(deadline=None)
+@given(lists(integers(min_value=0, max_value=(8 * BLOCK_SIZE)),
+			 min_size=(3 * BLOCK_SIZE),
+			 max_size=(4 * BLOCK_SIZE),
+			 unique=True),
+	   lists(tuples(integers(min_value=0, max_value=(8 * BLOCK_SIZE)), integers(min_value=0, max_value=5)), max_size=100))
+def test_rank_index(reps, updates):
+	# Start with the smallest representatives, then add the rest one at a time
+	# so the last block fills up and splits, and finally drop them all so blocks empty out
+	ordered = sorted(reps)
+	subtrees = {rep: rep % 4 for rep in ordered[:len(reps) // 3]}
+	index = RankIndex(sorted(subtrees.items()))
+
+	def check():
+		ordered = sorted(subtrees)
+		total = 0
+
+		for rep in ordered:
+			assert index.count_before(rep) == total
+
+			for rank in range(total, total + subtrees[rep]):
+				assert index.locate(rank) == (rep, rank - total)
+
+			total += subtrees[rep]
+
+	for rep in ordered[len(reps) // 3:]:
+		subtrees[rep] = rep % 3
+		index.insert(rep, rep % 3)
+
+	check()
+
+	for (rep, delta) in updates:
+		if rep in subtrees:
+			subtrees[rep] += delta
+			index.add(rep, delta)
+
+	check()
+
+	for rep in reps[:len(reps) // 2]:
+		del subtrees[rep]
+		index.remove(rep)
+
+	check()
+
+	for rep in reps[len(reps) // 2:]:
+		del subtrees[rep]
+		index.remove(rep)
+
+	subtrees[reps[0]] = 1
+	index.insert(reps[0], 1)
+	check()
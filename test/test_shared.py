@@ -0,0 +1,141 @@
+# encoding: utf-8
+
+################################################################################
+#                                 py-fast-trie                                 #
+#          Python library for tries with different grades of fastness          #
+#                            (C) 2020, Jeremy Brown                            #
+#       Released under version 3.0 of the Non-Profit Open Source License       #
+################################################################################
+
+from __future__ import division
+
+import multiprocessing
+
+import pytest
+
+from hypothesis import given, settings
+from hypothesis.strategies import integers, lists
+
+from py_fast_trie import SharedTrie, YFastTrie
+from test import (max_trie_entry_size,
+				  max_trie_value,
+				  valid_int_entries,
+				  valid_int_entry,
+				  )
+
+pytest.importorskip("multiprocessing.shared_memory")
+
+
+def query_shared_trie(name, queries):
+	with SharedTrie.attach(name) as t:
+		return (len(t), list(t), t.floor_many(queries), t.ceiling_many(queries))
+
+
+def test_unsupported_length():
+	with pytest.raises(ValueError):
+		SharedTrie.publish([], SharedTrie.max_supported_length + 1)
+
+
+@settings(deadline=None)
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size)), valid_int_entries)
+def test_queries(entries, test_values):
+	with SharedTrie.publish(entries, max_trie_entry_size) as t:
+		entries.sort()
+
+		try:
+			assert len(t) == len(entries)
+			assert list(t) == entries
+			assert (t.min, t.max) == (entries[0], entries[-1])
+			assert t[1:-1] == entries[1:-1]
+
+			for val in test_values:
+				below = [e for e in entries if e <= val]
+				above = [e for e in entries if e >= val]
+
+				assert t.floor(val) == (max(below) if below else None)
+				assert t.ceiling(val) == (min(above) if above else None)
+				assert (t < val) == max([e for e in entries if e < val], default=None)
+				assert (t > val) == min([e for e in entries if e > val], default=None)
+				assert t.nearest(val) == min(entries, key=lambda e: abs(e - val))
+				assert t.rank(val) == len(below) - entries.count(val)
+				assert t.count(val) == entries.count(val)
+				assert (val in t) == (val in entries)
+
+			assert t.floor_many(test_values) == [t.floor(v) for v in test_values]
+			assert t.ceiling_many(test_values) == [t.ceiling(v) for v in test_values]
+			assert t.nearest_many(test_values) == [t.nearest(v) for v in test_values]
+			assert [t.select(rank) for rank in range(len(entries))] == entries
+			assert t[-1] == entries[-1]
+
+			with pytest.raises(IndexError):
+				t.select(len(entries))
+		finally:
+			t.unlink()
+
+
+def test_empty_trie():
+	with SharedTrie.publish([], max_trie_entry_size) as t:
+		try:
+			assert len(t) == 0
+			assert list(t) == []
+			assert t.min is None
+			assert t.max is None
+			assert 0 not in t
+
+			for method in (t.floor, t.ceiling, t.nearest, t.predecessor, t.successor):
+				with pytest.raises(ValueError):
+					method(0)
+		finally:
+			t.unlink()
+
+
+def test_attach():
+	source = YFastTrie(max_trie_entry_size)
+	source.update(range(0, max_trie_value, 7))
+
+	with SharedTrie.publish(source, max_trie_entry_size) as t:
+		try:
+			with SharedTrie.attach(t.name) as view:
+				assert list(view) == list(source)
+				assert view.successor(7) == 14
+
+				with pytest.raises(ValueError):
+					view.unlink()
+		finally:
+			t.unlink()
+
+
+def test_close_unlink_order():
+	# Closing and unlinking work in either order, and closing twice does nothing
+	for close_first in (True, False):
+		t = SharedTrie.publish(range(10), max_trie_entry_size)
+		name = t.name
+
+		if close_first:
+			t.close()
+			t.unlink()
+		else:
+			t.unlink()
+			assert t.successor(3) == 4
+			t.close()
+
+		t.close()
+
+		with pytest.raises(FileNotFoundError):
+			SharedTrie.attach(name)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="Requires fork")
+def test_attach_from_workers():
+	entries = list(range(0, max_trie_value, 5))
+	queries = [0, 3, 12, max_trie_value]
+
+	with SharedTrie.publish(entries, max_trie_entry_size) as t:
+		try:
+			with multiprocessing.get_context("fork").Pool(2) as pool:
+				results = pool.starmap(query_shared_trie, [(t.name, queries)] * 2)
+
+			for result in results:
+				assert result == (len(entries), entries, t.floor_many(queries), t.ceiling_many(queries))
+		finally:
+			t.unlink()
@@ -9,6 +9,7 @@
 
 from __future__ import division
 
+from collections import Counter
 from numbers import Integral
 from struct import pack, unpack
 from sys import maxsize
@@ -19,7 +20,8 @@ from hypothesis import given, note, seed, settings
 from hypothesis.strategies import integers, lists
 from hypothesis.stateful import RuleBasedStateMachine, invariant, rule
 
-from py_fast_trie import XFastTrie
+from py_fast_trie import XFastTrie, XFastTrieMap
+from py_fast_trie.x_fast import ADAPTIVE_INITIAL_LENGTH
 from test import (invalid_trie_entry,
 				  max_trie_entry_size,
 				  max_trie_value,
@@ -155,6 +157,42 @@ def test_successor(entries, test_values):
 				assert succ.pred.value <= val
 
 
+@given(valid_int_entries, valid_int_entries)
+def test_floor_ceiling_nearest(entries, test_values):
+	t = XFastTrie(max_trie_entry_size)
+	value_of = (lambda n: n.value if n is not None else None)
+
+	for entry in entries:
+		t += entry
+
+	for val in test_values:
+		below = [e for e in entries if e <= val]
+		above = [e for e in entries if e >= val]
+
+		assert value_of(t.floor(val)) == (max(below) if below else None)
+		assert value_of(t.ceiling(val)) == (min(above) if above else None)
+		assert value_of(t.nearest(val)) == min(sorted(entries), key=lambda e: abs(e - val))
+
+	assert [value_of(n) for n in t.floor_many(test_values)] == [value_of(t.floor(v)) for v in test_values]
+	assert [value_of(n) for n in t.ceiling_many(test_values)] == [value_of(t.ceiling(v)) for v in test_values]
+	assert [value_of(n) for n in t.nearest_many(test_values)] == [value_of(t.nearest(v)) for v in test_values]
+
+
+def test_many_array_input():
+	numpy = pytest.importorskip("numpy")
+	t = XFastTrie(max_trie_entry_size)
+
+	for entry in (3, 10, 400):
+		t += entry
+
+	value_of = (lambda n: n.value if n is not None else None)
+	queries = numpy.array([0, 5, 11, 1000], dtype=numpy.uint32)
+
+	assert [value_of(n) for n in t.floor_many(queries)] == [None, 3, 10, 400]
+	assert [value_of(n) for n in t.ceiling_many(queries)] == [3, 10, 400, None]
+	assert [value_of(n) for n in t.nearest_many(queries)] == [3, 3, 10, 400]
+
+
 def test_successor_predecessor_empty_trie():
 	t = XFastTrie(max_trie_entry_size)
 
@@ -164,6 +202,10 @@ def test_successor_predecessor_empty_trie():
 	with pytest.raises(ValueError):
 		t.predecessor(0)
 
+	for method in (t.floor, t.ceiling, t.nearest):
+		with pytest.raises(ValueError):
+			method(0)
+
 
 @given(valid_trie_entries)
 def test_clear(entries):
@@ -201,6 +243,499 @@ def test_iter(entries):
 	assert len(entries) == 0
 
 
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), min_size=1, max_size=300),
+	   lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300))
+def test_multiset(entries, removals):
+	t = XFastTrie(max_trie_entry_size, multiset=True)
+	counts = Counter(entries)
+
+	for entry in entries:
+		t += entry
+
+	assert len(t) == len(entries)
+	assert len(t._level_tables[-1]) == len(counts)
+	assert list(t) == sorted(entries)
+
+	for val in removals:
+		if counts[val] > 0:
+			t -= val
+			counts[val] -= 1
+		else:
+			with pytest.raises(ValueError):
+				t -= val
+
+	assert len(t) == sum(counts.values())
+	assert list(t) == sorted(counts.elements())
+
+	for (val, count) in counts.items():
+		assert t.count(val) == count
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size), unique=True),
+	   valid_int_entry,
+	   valid_int_entry)
+def test_truncate(entries, low, high):
+	t = XFastTrie(max_trie_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	assert t.truncate_below(low) == len([e for e in entries if e < low])
+	assert t.truncate_above(high) == len([e for e in entries if low <= e and e > high])
+
+	remaining = sorted(e for e in entries if low <= e <= high)
+	assert list(t) == remaining
+	assert len(t) == len(remaining)
+	assert t.min == (remaining[0] if remaining else None)
+	assert t.max == (remaining[-1] if remaining else None)
+
+	for entry in entries:
+		t += entry
+
+	assert list(t) == sorted(entries)
+
+
+@given(valid_int_entries, valid_int_entries)
+def test_map_neighbor_items(entries, test_values):
+	t = XFastTrieMap(max_trie_entry_size)
+
+	for entry in entries:
+		t[entry] = str(entry)
+
+	for val in test_values:
+		for (method, candidates) in ((t.floor_item, [e for e in entries if e <= val]),
+									 (t.ceiling_item, [e for e in entries if e >= val]),
+									 (t.pred_item, [e for e in entries if e < val]),
+									 (t.succ_item, [e for e in entries if e > val])):
+			item = method(val)
+
+			if not candidates:
+				assert item is None
+			else:
+				key = min(candidates, key=lambda e: abs(e - val))
+				assert item == (key, str(key))
+
+
+@given(valid_int_entries)
+def test_map_access(entries):
+	t = XFastTrieMap(max_trie_entry_size)
+
+	for entry in entries:
+		t[entry] = entry
+		t[entry] = -entry
+
+	assert len(t) == len(entries)
+	assert list(t.items()) == [(e, -e) for e in sorted(entries)]
+	assert list(t.keys()) == sorted(entries)
+	assert list(t.values()) == [-e for e in sorted(entries)]
+
+	removed = entries.pop()
+	del t[removed]
+
+	assert t.get(removed) is None
+
+	with pytest.raises(KeyError):
+		t[removed]
+
+	with pytest.raises(KeyError):
+		del t[removed]
+
+	for entry in entries:
+		assert t[entry] == -entry
+
+
+@given(valid_int_entries, lists(valid_int_entry, max_size=200), lists(valid_int_entry, max_size=200))
+def test_apply_batch(entries, inserts, removes):
+	t = XFastTrie(max_trie_entry_size)
+	t.update(entries)
+
+	assert list(t) == sorted(entries)
+
+	t.apply_batch(inserts=inserts, removes=removes)
+	expected = (set(entries) - set(removes)) | set(inserts)
+
+	assert len(t) == len(expected)
+	assert list(t) == sorted(expected)
+	assert t.min == (min(expected) if expected else None)
+	assert t.max == (max(expected) if expected else None)
+
+	t.difference_update(inserts)
+	expected -= set(inserts)
+
+	assert list(t) == sorted(expected)
+
+	with pytest.raises(ValueError):
+		t.apply_batch(inserts=[0], removes=[max_trie_value + 1])
+
+	assert list(t) == sorted(expected)
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300),
+	   lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300))
+def test_multiset_batch(inserts, removes):
+	t = XFastTrie(max_trie_entry_size, multiset=True)
+	t.update(inserts)
+	t.update(inserts)
+	counts = Counter(inserts + inserts)
+
+	t.difference_update(removes)
+	counts.subtract(removes)
+	counts = Counter({val: count for (val, count) in counts.items() if count > 0})
+
+	assert len(t) == sum(counts.values())
+	assert list(t) == sorted(counts.elements())
+
+
+# Every node of a trie, with the values of the nodes it points to
+def trie_layout(t):
+	def value(node):
+		return node.value if node is not None else None
+
+	return ([(level, prefix, value(node.left), value(node.right), value(node.parent), node.size, node.count)
+			 for (level, table) in enumerate(t._level_tables)
+			 for (prefix, node) in sorted(table.items())] +
+			[value(t._root.left), value(t._root.right)])
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300),
+	   lists(valid_int_entry, max_size=200),
+	   integers(min_value=1, max_value=16))
+def test_build_sorted(small_entries, entries, shards):
+	for (values, multiset) in ((entries, False), (small_entries + small_entries, True)):
+		expected = XFastTrie(max_trie_entry_size, multiset=multiset, track_prefixes=True)
+		expected.update(values)
+		t = XFastTrie(max_trie_entry_size, multiset=multiset, track_prefixes=True)
+		t.update([0])
+		t.clear()
+		t._build_sorted(sorted(values), None, shards)
+
+		assert len(t) == len(expected)
+		assert list(t) == list(expected)
+		assert trie_layout(t) == trie_layout(expected)
+		assert (t.min, t.max) == (expected.min, expected.max)
+
+
+def test_build_parallel():
+	values = [value * 7 for value in range(3000)]
+	t = XFastTrieMap(max_trie_entry_size)
+	t[1] = 1
+	t.build_parallel(reversed(values), workers=2)
+
+	assert list(t) == values
+	assert t.get(7, "missing") is None
+	assert t.successor(8).value == 14
+	assert t.predecessor(7).value == 0
+
+	t.build_parallel(values[:10], workers=1)
+	assert list(t) == values[:10]
+
+	with pytest.raises(ValueError):
+		t.build_parallel(values, workers=0)
+
+	with pytest.raises(ValueError):
+		t.build_parallel([max_trie_value + 1])
+
+	assert list(t) == values[:10]
+
+
+@given(valid_int_entries, valid_int_entries)
+def test_map_update(entries, updates):
+	t = XFastTrieMap(max_trie_entry_size)
+	t.update({entry: entry for entry in entries})
+	t.update((entry, -entry) for entry in updates)
+	expected = dict((entry, entry) for entry in entries)
+	expected.update((entry, -entry) for entry in updates)
+
+	assert list(t.items()) == sorted(expected.items())
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size)),
+	   lists(integers(min_value=1, max_value=max_trie_entry_size), min_size=1, max_size=10),
+	   valid_int_entry)
+def test_prefix_queries(entries, lengths, probe):
+	t = XFastTrie(max_trie_entry_size, multiset=True)
+	tracked = XFastTrie(max_trie_entry_size, multiset=True, track_prefixes=True)
+	t.update(entries)
+	tracked.update(entries)
+
+	for bits in lengths:
+		shift = max_trie_entry_size - bits
+
+		for prefix in (entries[0] >> shift, probe >> shift):
+			matches = sorted(e for e in entries if e >> shift == prefix)
+
+			assert list(t.prefix_iter(prefix, bits)) == matches
+			assert t.prefix_count(prefix, bits) == len(matches)
+			assert tracked.prefix_count(prefix, bits) == len(matches)
+			assert t.prefix_min(prefix, bits) == (matches[0] if matches else None)
+			assert t.prefix_max(prefix, bits) == (matches[-1] if matches else None)
+
+	for bits in (0, max_trie_entry_size + 1):
+		with pytest.raises(ValueError):
+			t.prefix_min(0, bits)
+
+	with pytest.raises(ValueError):
+		t.prefix_count(2, 1)
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size)), valid_int_entries)
+def test_adaptive(entries, test_values):
+	t = XFastTrie(max_trie_entry_size, track_prefixes=True, adaptive=True)
+	initial_length = min(max_trie_entry_size, ADAPTIVE_INITIAL_LENGTH)
+
+	assert t._maxlen == len(t._level_tables) == initial_length
+
+	for entry in entries:
+		t += entry
+		assert max(entry.bit_length(), initial_length) <= t._maxlen == len(t._level_tables)
+
+	expected = sorted(set(entries))
+	assert list(t) == expected
+
+	for val in test_values:
+		below = [e for e in expected if e <= val]
+		shift = max_trie_entry_size - 4
+
+		node = t.floor(val)
+
+		assert (node.value if node is not None else None) == (below[-1] if below else None)
+		assert t.prefix_count(val >> shift, 4) == len([e for e in expected if e >> shift == val >> shift])
+
+	assert t.prefix_count(0, 1) == len([e for e in expected if e >> (max_trie_entry_size - 1) == 0])
+
+	with pytest.raises(ValueError):
+		t += max_trie_value + 1
+
+	t.clear()
+	assert t._maxlen == len(t._level_tables) == initial_length
+
+	t.update(entries)
+	assert list(t) == expected
+
+
+@given(lists(integers(min_value=0, max_value=2 ** ADAPTIVE_INITIAL_LENGTH - 1), min_size=1),
+	   lists(integers(min_value=2 ** ADAPTIVE_INITIAL_LENGTH, max_value=max_trie_value), min_size=1))
+def test_adaptive_queries(entries, wide_values):
+	t = XFastTrie(max_trie_entry_size, adaptive=True)
+	t.update(entries)
+	length = t._maxlen
+
+	# Queries for values too big for the trie's levels don't widen it
+	for val in wide_values:
+		assert val not in t
+		assert t.count(val) == 0
+		assert t.predecessor(val).value == t.floor(val).value == t.nearest(val).value == max(entries)
+		assert t.predecessor_unchecked(val).value == max(entries)
+		assert t.successor(val) is t.ceiling(val) is t.successor_unchecked(val) is None
+		assert t.truncate_above(val) == 0
+
+		with pytest.raises(ValueError):
+			t.remove(val)
+
+	assert [node.value for node in t.floor_many(wide_values)] == [max(entries)] * len(wide_values)
+	assert t._maxlen == len(t._level_tables) == length
+
+	# Nor do changes that fail validation or only remove them
+	with pytest.raises(ValueError):
+		t.apply_batch(inserts=wide_values, removes=[-1])
+
+	t.apply_batch(removes=wide_values)
+	assert t._maxlen == len(t._level_tables) == length
+	assert list(t) == sorted(set(entries))
+
+	t += wide_values[0]
+	assert t._maxlen >= wide_values[0].bit_length()
+	assert t.predecessor(wide_values[0]).value == max(entries)
+
+
+@settings(deadline=None)
+@given(valid_int_entries, lists(valid_int_entry, min_size=1, max_size=20), integers(min_value=1, max_value=20))
+def test_result_cache(entries, probes, cache_size):
+	def check(t, expected):
+		for val in probes:
+			assert (val in t) == (val in expected)
+
+			if not expected:
+				continue
+
+			below = [e for e in sorted(expected) if e < val]
+			above = [e for e in sorted(expected) if e > val]
+			pred = t.predecessor(val)
+			succ = t.successor(val)
+
+			assert (pred.value if pred is not None else None) == (below[-1] if below else None)
+			assert (succ.value if succ is not None else None) == (above[0] if above else None)
+
+	for ranged in (False, True):
+		t = XFastTrie(max_trie_entry_size, cache_size=cache_size, range_invalidation=ranged)
+		t.update(entries)
+		expected = set(entries)
+
+		# Every change to the trie is seen by results cached before it
+		for val in probes:
+			check(t, expected)
+
+			if val in expected:
+				t.remove(val)
+				expected.remove(val)
+			else:
+				t.insert(val)
+				expected.add(val)
+
+			check(t, expected)
+			assert len(t._cache) <= cache_size
+
+		low, high = sorted([probes[0], probes[-1]])
+		t.remove_range(low, high)
+		expected = {e for e in expected if not low <= e < high}
+		check(t, expected)
+
+		t.update(probes)
+		expected.update(probes)
+		check(t, expected)
+
+
+def test_result_cache_hits():
+	with pytest.raises(ValueError):
+		XFastTrie(max_trie_entry_size, cache_size=-1)
+
+	t = XFastTrie(max_trie_entry_size, cache_size=4, range_invalidation=True)
+	t.update([10, 20, 30, 40])
+	conversions = []
+
+	def to_key(value, original=t._to_key):
+		conversions.append(value)
+		return original(value)
+
+	t._to_key = to_key
+
+	# Hits skip converting the value as well as the search
+	for _ in range(3):
+		assert t.predecessor(25).value == 20
+		assert t.successor(5).value == 10
+		assert 40 in t
+
+	assert conversions == [25, 5, 40]
+
+	# A change only drops the results for values between its neighbors
+	t.insert(22)
+	assert len(t._cache) == 2
+	assert t.predecessor(25).value == 22
+	assert conversions == [25, 5, 40, 22, 25]
+
+	# Neither a value already in the trie nor an empty batch changes any result
+	epoch = t._cache.epoch
+	t.insert(22)
+	t.apply_batch([], [])
+	assert len(t._cache) == 3
+	assert t._cache.epoch == epoch
+
+	# The least recently used result is evicted first
+	t.predecessor(1)
+	t.predecessor(2)
+	t.predecessor(3)
+	assert len(t._cache) == 4
+	assert 40 in t
+	assert conversions[-1] == 40
+
+	t.clear()
+	assert len(t._cache) == 0
+	assert 40 not in t
+
+	m = XFastTrieMap(max_trie_entry_size, cache_size=8)
+	m[1] = "a"
+	m[3] = "b"
+	assert m.pred_item(3) == (1, "a")
+
+	m[1] = "c"
+	assert m.pred_item(3) == (1, "c")
+	assert m._cache.epoch > 0
+
+
+@settings(deadline=None)
+@given(valid_int_entries, lists(valid_int_entry, min_size=1, max_size=100))
+def test_insert_hint(entries, inserts):
+	t = XFastTrie(max_trie_entry_size, track_prefixes=True)
+	expected = XFastTrie(max_trie_entry_size, track_prefixes=True)
+	other = XFastTrie(max_trie_entry_size)
+	t.update(entries)
+	expected.update(entries)
+	other.update(inserts)
+
+	# Hints next to the value skip the search, and any other hint is ignored
+	for (index, val) in enumerate(inserts):
+		hints = [t.max_node, t.min_node, other.min_node, t._root]
+
+		if val > 0:
+			hints.append(t.predecessor(val))
+
+		t.insert(val, hint=hints[index % len(hints)])
+		expected.insert(val)
+
+	assert trie_layout(t) == trie_layout(expected)
+
+	stale = t.min_node
+	t.remove(stale.value)
+	t.insert(stale.value, hint=stale)
+	assert trie_layout(t) == trie_layout(expected)
+
+
+def test_insert_hint_search():
+	t = XFastTrie(max_trie_entry_size)
+	searches = []
+
+	def search(value, original=t._get_closest_leaf):
+		searches.append(value)
+		return original(value)
+
+	t._get_closest_leaf = search
+	leaf = None
+
+	# Appending in order with the last leaf as the hint never searches
+	for val in range(0, 3000, 3):
+		leaf = t.insert_unchecked(val, leaf)
+		assert leaf.value == val
+
+	assert searches == []
+	assert list(t) == list(range(0, 3000, 3))
+
+	t.insert(1, hint=t.min_node)
+	t.insert(5, hint=t.max_node)
+	assert searches == [5]
+
+	t.insert(7)
+	assert searches == [5, 7]
+
+
+@settings(deadline=None)
+@given(valid_int_entries, valid_int_entries)
+def test_unchecked(entries, test_values):
+	t = XFastTrie(max_trie_entry_size, adaptive=True)
+	expected = XFastTrie(max_trie_entry_size, adaptive=True)
+
+	for entry in entries:
+		t.insert_unchecked(entry)
+		expected += entry
+
+	assert trie_layout(t) == trie_layout(expected)
+
+	for val in test_values:
+		pred = t.predecessor_unchecked(val)
+		succ = t.successor_unchecked(val)
+
+		assert pred is expected.predecessor(val) or pred.value == expected.predecessor(val).value
+		assert succ is expected.successor(val) or succ.value == expected.successor(val).value
+
+	for entry in entries[::2]:
+		t.remove_unchecked(entry)
+		expected -= entry
+
+	assert trie_layout(t) == trie_layout(expected)
+
+	with pytest.raises(ValueError):
+		t.remove_unchecked(entries[0])
+
+
 class XFastStateMachine(RuleBasedStateMachine):
 	def __init__(self):
 		super(XFastStateMachine, self).__init__()
@@ -273,10 +808,22 @@ class XFastStateMachine(RuleBasedStateMachine):
 					if node.succ is not None:
 						assert node.succ.value > node.value
 
+	@rule(inserts=lists(valid_int_entry, max_size=50), removes=lists(valid_int_entry, max_size=50))
+	def apply_batch(self, inserts, removes):
+		expected = (set(self.t) - set(removes)) | set(inserts)
+		self.t.apply_batch(inserts=inserts, removes=removes)
+		assert list(self.t) == sorted(expected)
+
 	@rule(val=valid_trie_entry)
 	def insert_value(self, val):
 		self.t += val
 
+	@rule(low=valid_int_entry, high=valid_int_entry)
+	def remove_range(self, low, high):
+		expected = len([v for v in self.t if low <= v < high])
+		assert self.t.remove_range(low, high) == expected
+		assert not [v for v in self.t if low <= v < high]
+
 	@rule(val=valid_trie_entry)
 	def remove_value(self, val):
 		if val not in self.t:
@@ -287,5 +834,31 @@ class XFastStateMachine(RuleBasedStateMachine):
 		else:
 			self.t -= val
 
+
+class PrefixTrackingXFastStateMachine(XFastStateMachine):
+	def __init__(self):
+		super(PrefixTrackingXFastStateMachine, self).__init__()
+		self.t = XFastTrie(max_trie_entry_size, track_prefixes=True)
+
+	@invariant()
+	def valid_prefix_sizes(self):
+		for (level, table) in enumerate(self.t._level_tables[:-1]):
+			shift = self.t._maxlen - level - 1
+
+			for node in table.values():
+				assert node.size == len([v for v in self.t if v >> shift == node.value])
+
+
+class AdaptiveXFastStateMachine(PrefixTrackingXFastStateMachine):
+	def __init__(self):
+		super(AdaptiveXFastStateMachine, self).__init__()
+		self.t = XFastTrie(max_trie_entry_size, track_prefixes=True, adaptive=True)
+
 XFastStateMachine.TestCase.settings = settings(max_examples=50, deadline=None)
 test_x_fast_trie = XFastStateMachine.TestCase
+
+PrefixTrackingXFastStateMachine.TestCase.settings = settings(max_examples=50, deadline=None)
+test_prefix_tracking_x_fast_trie = PrefixTrackingXFastStateMachine.TestCase
+
+AdaptiveXFastStateMachine.TestCase.settings = settings(max_examples=50, deadline=None)
+test_adaptive_x_fast_trie = AdaptiveXFastStateMachine.TestCase
@@ -9,6 +9,8 @@
 
 from __future__ import division
 
+from bisect import bisect_left
+from collections import Counter
 from itertools import chain
 from random import randint
 
@@ -17,12 +19,15 @@ import pytest
 from hypothesis import given, settings
 from hypothesis.strategies import integers, lists
 from hypothesis.stateful import RuleBasedStateMachine, invariant, rule
-from sortedcontainers import SortedList
 
-from py_fast_trie import YFastTrie
+from py_fast_trie import YFastTrie, YFastTrieMap, YFastTrieMapSnapshot, YFastTrieSnapshot
+from py_fast_trie.containers import Container, FrozenContainer, make_container
+from py_fast_trie.x_fast import ADAPTIVE_INITIAL_LENGTH
 from test import (invalid_trie_entry,
 				  max_trie_entry_size,
 				  max_trie_value,
+				  to_int,
+				  valid_binary_entry,
 				  valid_int_entries,
 				  valid_int_entry,
 				  valid_trie_entries,
@@ -31,63 +36,79 @@ from test import (invalid_trie_entry,
 				  )
 
 
-@given(integers(min_value=0, max_value=max_trie_value))
-def test_calculate_representative(val):
-	rep = YFastTrie._calculate_representative(val, max_trie_entry_size)
-	assert rep >= val
-	assert (rep + 1) % max_trie_entry_size == 0
+@given(lists(valid_int_entry, min_size=1, max_size=(16 * max_trie_entry_size), unique=True))
+def test_representatives(entries):
+	t = YFastTrie(max_trie_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	reps = list(t._partitions)
+
+	assert reps[-1] == max_trie_value
+
+	for (rep, next_rep) in zip(reps, reps[1:]):
+		assert t._subtrees[rep][-1] <= rep == t._subtrees[next_rep][0] - 1
+
+	# Subtrees only split once they outgrow twice the bit length,
+	# so without removals every subtree holds at least the bit length in values
+	if len(reps) > 1:
+		assert all(max_trie_entry_size <= len(tree) <= 2 * max_trie_entry_size for tree in t._subtrees.values())
 
 
 @given(lists(valid_int_entry, min_size=2, max_size=((4 * max_trie_entry_size) - 1), unique=True))
 def test_merge_subtrees(values):
-	values = SortedList(values)
+	values = sorted(values)
 	split = randint(1, len(values) - 1)
-	left_tree = SortedList(values.islice(stop=split))
-	right_tree = SortedList(values.islice(start=split))
+	left_tree = make_container(values[:split])
+	right_tree = make_container(values[split:])
 	new_left, new_right = YFastTrie._merge_subtrees(left_tree, right_tree, 2 * max_trie_entry_size)
 
 	if len(values) <= 2 * max_trie_entry_size:
 		assert new_right is None
-		assert isinstance(new_left, SortedList)
+		assert isinstance(new_left, Container)
 		assert len(new_left) == len(values)
 	else:
-		assert isinstance(new_left, SortedList)
-		assert isinstance(new_right, SortedList)
+		assert isinstance(new_left, Container)
+		assert isinstance(new_right, Container)
 		assert len(new_left) + len(new_right) == len(values)
-		assert YFastTrie._calculate_representative(max(new_left), max_trie_entry_size) < min(new_right)
+		assert new_left[-1] < new_right[0]
+		assert abs(len(new_left) - len(new_right)) <= 1
 
 
 @given(lists(valid_int_entry, min_size=((2 * max_trie_entry_size) + 1), max_size=((4 * max_trie_entry_size) - 1), unique=True))
 def test_merge_large_subtrees(values):
-	values = SortedList(values)
+	values = sorted(values)
 	split = len(values) // 2
-	left_tree = SortedList(values.islice(stop=split))
-	right_tree = SortedList(values.islice(start=split))
+	left_tree = make_container(values[:split])
+	right_tree = make_container(values[split:])
 	new_left, new_right = YFastTrie._merge_subtrees(left_tree, right_tree, 2 * max_trie_entry_size)
-	assert isinstance(new_left, SortedList)
-	assert isinstance(new_right, SortedList)
+	assert isinstance(new_left, Container)
+	assert isinstance(new_right, Container)
 	assert len(new_left) + len(new_right) == len(values)
-	assert YFastTrie._calculate_representative(max(new_left), max_trie_entry_size) < min(new_right)
+	assert new_left[-1] < new_right[0]
+	assert abs(len(new_left) - len(new_right)) <= 1
 
 	split += 1
-	left_tree = SortedList(values.islice(stop=split))
-	right_tree = SortedList(values.islice(start=split))
+	left_tree = make_container(values[:split])
+	right_tree = make_container(values[split:])
 	new_left, new_right = YFastTrie._merge_subtrees(left_tree, right_tree, 2 * max_trie_entry_size)
-	assert isinstance(new_left, SortedList)
-	assert isinstance(new_right, SortedList)
+	assert isinstance(new_left, Container)
+	assert isinstance(new_right, Container)
 	assert len(new_left) + len(new_right) == len(values)
-	assert YFastTrie._calculate_representative(max(new_left), max_trie_entry_size) < min(new_right)
+	assert new_left[-1] < new_right[0]
+	assert abs(len(new_left) - len(new_right)) <= 1
 
 
 @given(lists(valid_int_entry, min_size=((2 * max_trie_entry_size) + 1), max_size=((4 * max_trie_entry_size) - 1), unique=True))
 def test_split_subtree(values):
-	left_tree, right_tree = YFastTrie._split_subtree(SortedList(values), max_trie_entry_size)
+	left_tree, right_tree = YFastTrie._split_subtree(make_container(sorted(values)))
 
-	assert isinstance(left_tree, SortedList)
-	assert isinstance(right_tree, SortedList)
+	assert isinstance(left_tree, Container)
+	assert isinstance(right_tree, Container)
 	assert len(left_tree) + len(right_tree) == len(values)
 	assert max(left_tree) < min(right_tree)
-	assert YFastTrie._calculate_representative(max(left_tree), max_trie_entry_size) < min(right_tree)
+	assert len(left_tree) == len(values) // 2
 
 
 @given(valid_trie_entries, valid_int_entries)
@@ -163,6 +184,42 @@ def test_successor(entries, test_values):
 			assert val >= t.max
 
 
+@given(valid_int_entries, valid_int_entries)
+def test_floor_ceiling_nearest(entries, test_values):
+	t = YFastTrie(max_trie_entry_size)
+	value_of = (lambda v: v)
+
+	for entry in entries:
+		t += entry
+
+	for val in test_values:
+		below = [e for e in entries if e <= val]
+		above = [e for e in entries if e >= val]
+
+		assert value_of(t.floor(val)) == (max(below) if below else None)
+		assert value_of(t.ceiling(val)) == (min(above) if above else None)
+		assert value_of(t.nearest(val)) == min(sorted(entries), key=lambda e: abs(e - val))
+
+	assert [value_of(n) for n in t.floor_many(test_values)] == [value_of(t.floor(v)) for v in test_values]
+	assert [value_of(n) for n in t.ceiling_many(test_values)] == [value_of(t.ceiling(v)) for v in test_values]
+	assert [value_of(n) for n in t.nearest_many(test_values)] == [value_of(t.nearest(v)) for v in test_values]
+
+
+def test_many_array_input():
+	numpy = pytest.importorskip("numpy")
+	t = YFastTrie(max_trie_entry_size)
+
+	for entry in (3, 10, 400):
+		t += entry
+
+	value_of = (lambda v: v)
+	queries = numpy.array([0, 5, 11, 1000], dtype=numpy.uint32)
+
+	assert [value_of(n) for n in t.floor_many(queries)] == [None, 3, 10, 400]
+	assert [value_of(n) for n in t.ceiling_many(queries)] == [3, 10, 400, None]
+	assert [value_of(n) for n in t.nearest_many(queries)] == [3, 3, 10, 400]
+
+
 def test_successor_predecessor_empty_trie():
 	t = YFastTrie(max_trie_entry_size)
 
@@ -172,6 +229,10 @@ def test_successor_predecessor_empty_trie():
 	with pytest.raises(ValueError):
 		t.predecessor(0)
 
+	for method in (t.floor, t.ceiling, t.nearest):
+		with pytest.raises(ValueError):
+			method(0)
+
 
 @given(valid_trie_entries)
 def test_clear(entries):
@@ -196,8 +257,8 @@ def test_clear(entries):
 def test_insert_with_split():
 	t = YFastTrie(max_trie_entry_size)
 
-	big_rep = 3 * max_trie_entry_size - 1
-	small_rep = 2 * max_trie_entry_size - 1
+	big_rep = max_trie_value
+	small_rep = 2 * max_trie_entry_size - 2
 	for i in range(3 * max_trie_entry_size - 1, max_trie_entry_size - 1, -1):
 		t += i
 
@@ -210,8 +271,8 @@ def test_insert_with_split():
 	assert len(t._partitions) == 2
 	assert big_rep in t._subtrees
 	assert small_rep in t._subtrees
-	assert len(t._subtrees[big_rep]) == max_trie_entry_size
-	assert len(t._subtrees[small_rep]) == max_trie_entry_size + 1
+	assert len(t._subtrees[big_rep]) == max_trie_entry_size + 1
+	assert len(t._subtrees[small_rep]) == max_trie_entry_size
 
 
 @given(lists(valid_int_entry, min_size=0, max_size=max_trie_value, unique=True))
@@ -229,10 +290,893 @@ def test_iter(entries):
 	assert len(entries) == 0
 
 
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), min_size=1, max_size=300),
+	   lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300))
+def test_multiset(entries, removals):
+	t = YFastTrie(max_trie_entry_size, multiset=True)
+	counts = Counter(entries)
+
+	for entry in entries:
+		t += entry
+
+	assert len(t) == len(entries)
+	assert sum(len(tree) for tree in t._subtrees.values()) == len(counts)
+	assert list(t) == sorted(entries)
+
+	for val in removals:
+		if counts[val] > 0:
+			t -= val
+			counts[val] -= 1
+		else:
+			with pytest.raises(ValueError):
+				t -= val
+
+	assert len(t) == sum(counts.values())
+	assert list(t) == sorted(counts.elements())
+
+	for (val, count) in counts.items():
+		assert t.count(val) == count
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size), unique=True), valid_int_entries)
+def test_rank_select(entries, test_values):
+	t = YFastTrie(max_trie_entry_size)
+	values = []
+
+	# Interleave queries with updates so the rank index is both rebuilt and updated in place
+	for (i, entry) in enumerate(entries):
+		t += entry
+		values.append(entry)
+
+		if i % 7 == 0 and len(values) > 1:
+			t -= values.pop(0)
+
+		if i % 3 == 0:
+			assert t.rank(entry) == len([v for v in values if v < entry])
+
+	values.sort()
+
+	for (rank, value) in enumerate(values):
+		assert t.select(rank) == value
+		assert t.rank(value) == rank
+
+	assert t.select(-1) == values[-1]
+
+	for val in test_values:
+		assert t.rank(val) == len([v for v in values if v < val])
+
+	with pytest.raises(IndexError):
+		t.select(len(values))
+
+
+@given(lists(integers(min_value=0, max_value=(16 * max_trie_entry_size)), min_size=1, max_size=(16 * max_trie_entry_size)),
+	   integers(min_value=0, max_value=5))
+def test_rank_index_updates(entries, op):
+	t = YFastTrie(max_trie_entry_size, multiset=True)
+	t += entries[0]
+	index = t._build_rank_index()
+	values = Counter([entries[0]])
+
+	# Splitting inserts, merging removals and batches all keep the same index up to date
+	for (i, entry) in enumerate(entries[1:]):
+		if (i + op) % 5 == 0 and values[entry] > 0:
+			t -= entry
+			values[entry] -= 1
+		elif (i + op) % 11 == 0:
+			removed = t.pop_min_many(op)
+			values.subtract(removed)
+		elif (i + op) % 13 == 0:
+			removed = t.remove_range(entry, entry + op)
+			assert removed == sum(values[v] for v in range(entry, entry + op))
+
+			for v in range(entry, entry + op):
+				del values[v]
+		elif (i + op) % 17 == 0:
+			t.apply_batch(inserts=[entry, entry + 1], removes=[entry + 2])
+			values.update([entry, entry + 1])
+			values[entry + 2] = max(values[entry + 2] - 1, 0)
+		else:
+			t += entry
+			values[entry] += 1
+
+		expected = sorted(values.elements())
+		assert t._rank_index is index
+		assert t.rank(entry) == bisect_left(expected, entry)
+
+		if expected:
+			assert t.select(i % len(expected)) == expected[i % len(expected)]
+
+	assert t[:] == sorted(values.elements())
+	assert [t.rank(v) for v in values] == [bisect_left(sorted(values.elements()), v) for v in values]
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), min_size=1, max_size=300),
+	   integers(), integers(), integers(min_value=1, max_value=5))
+def test_slicing(entries, start, stop, step):
+	t = YFastTrie(max_trie_entry_size, multiset=True)
+
+	for entry in entries:
+		t += entry
+
+	entries.sort()
+
+	assert t[start:stop] == entries[start:stop]
+	assert t[start:stop:step] == entries[start:stop:step]
+	assert t[-start:-stop:-step] == entries[-start:-stop:-step]
+	assert [t.rank(e) for e in entries] == [entries.index(e) for e in entries]
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size), unique=True),
+	   valid_int_entry,
+	   valid_int_entry)
+def test_truncate(entries, low, high):
+	t = YFastTrie(max_trie_entry_size)
+
+	for entry in entries:
+		t += entry
+
+	assert t.truncate_below(low) == len([e for e in entries if e < low])
+	assert t.truncate_above(high) == len([e for e in entries if low <= e and e > high])
+
+	remaining = sorted(e for e in entries if low <= e <= high)
+	assert list(t) == remaining
+	assert len(t) == len(remaining)
+	assert t.min == (remaining[0] if remaining else None)
+	assert t.max == (remaining[-1] if remaining else None)
+
+	for entry in entries:
+		t += entry
+
+	assert list(t) == sorted(entries)
+
+
+@given(valid_int_entries, valid_int_entries)
+def test_map_neighbor_items(entries, test_values):
+	t = YFastTrieMap(max_trie_entry_size)
+
+	for entry in entries:
+		t[entry] = str(entry)
+
+	for val in test_values:
+		for (method, candidates) in ((t.floor_item, [e for e in entries if e <= val]),
+									 (t.ceiling_item, [e for e in entries if e >= val]),
+									 (t.pred_item, [e for e in entries if e < val]),
+									 (t.succ_item, [e for e in entries if e > val])):
+			item = method(val)
+
+			if not candidates:
+				assert item is None
+			else:
+				key = min(candidates, key=lambda e: abs(e - val))
+				assert item == (key, str(key))
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(8 * max_trie_entry_size), unique=True))
+def test_map_access(entries):
+	t = YFastTrieMap(max_trie_entry_size)
+
+	for entry in entries:
+		t[entry] = entry
+		t[entry] = -entry
+
+	assert len(t) == len(entries)
+	assert list(t.items()) == [(e, -e) for e in sorted(entries)]
+	assert list(t.keys()) == sorted(entries)
+	assert list(t.values()) == [-e for e in sorted(entries)]
+
+	while len(entries) > 1:
+		removed = entries.pop()
+		del t[removed]
+
+		assert t.get(removed) is None
+
+		with pytest.raises(KeyError):
+			t[removed]
+
+		with pytest.raises(KeyError):
+			del t[removed]
+
+	for rep, tree in t._subtrees.items():
+		assert len(t._payloads[rep]) == len(tree)
+
+	assert t[entries[0]] == -entries[0]
+
+
+@given(valid_int_entries, lists(valid_int_entry, max_size=200), lists(valid_int_entry, max_size=200))
+def test_apply_batch(entries, inserts, removes):
+	t = YFastTrie(max_trie_entry_size)
+	t.update(entries)
+
+	assert list(t) == sorted(entries)
+
+	t.apply_batch(inserts=inserts, removes=removes)
+	expected = (set(entries) - set(removes)) | set(inserts)
+
+	assert len(t) == len(expected)
+	assert list(t) == sorted(expected)
+	assert t.min == (min(expected) if expected else None)
+	assert t.max == (max(expected) if expected else None)
+
+	t.difference_update(inserts)
+	expected -= set(inserts)
+
+	assert list(t) == sorted(expected)
+
+	with pytest.raises(ValueError):
+		t.apply_batch(inserts=[0], removes=[max_trie_value + 1])
+
+	assert list(t) == sorted(expected)
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300),
+	   lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300))
+def test_multiset_batch(inserts, removes):
+	t = YFastTrie(max_trie_entry_size, multiset=True)
+	t.update(inserts)
+	t.update(inserts)
+	counts = Counter(inserts + inserts)
+
+	t.difference_update(removes)
+	counts.subtract(removes)
+	counts = Counter({val: count for (val, count) in counts.items() if count > 0})
+
+	assert len(t) == sum(counts.values())
+	assert list(t) == sorted(counts.elements())
+
+
+# Every subtree of a trie by its representative, with the payloads of its values
+def trie_layout(t):
+	return [(rep, list(t._subtrees[rep]), t._payloads[rep] if t._payloads is not None else None)
+			for rep in t._partitions]
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), max_size=300),
+	   lists(valid_int_entry, max_size=(16 * max_trie_entry_size)),
+	   integers(min_value=1, max_value=16))
+def test_build_sorted(small_entries, entries, shards):
+	for (values, multiset) in ((entries, False), (small_entries + small_entries, True)):
+		expected = YFastTrie(max_trie_entry_size, multiset=multiset)
+		expected.update(values)
+		t = YFastTrie(max_trie_entry_size, multiset=multiset)
+		t.update([0])
+		t.clear()
+		t._build_sorted(sorted(values), None, shards)
+
+		assert len(t) == len(expected)
+		assert list(t) == list(expected)
+		assert trie_layout(t) == trie_layout(expected)
+		assert (t.min, t.max) == (expected.min, expected.max)
+
+		if values:
+			assert t.rank(values[0]) == expected.rank(values[0])
+
+
+def test_build_parallel():
+	values = [value * 7 for value in range(3000)]
+	t = YFastTrieMap(max_trie_entry_size)
+	t[1] = 1
+	t.build_parallel(reversed(values), workers=2)
+
+	assert list(t) == values
+	assert t.get(7, "missing") is None
+	assert t.successor(8) == 14
+	assert t.select(100) == 700
+
+	t[8] = 8
+	del t[0]
+	assert t.pred_item(14) == (8, 8)
+
+	t.build_parallel(values[:10], workers=1)
+	assert list(t) == values[:10]
+
+	with pytest.raises(ValueError):
+		t.build_parallel(values, workers=0)
+
+	with pytest.raises(ValueError):
+		t.build_parallel([max_trie_value + 1])
+
+	assert list(t) == values[:10]
+
+
+@given(valid_int_entries, valid_int_entries)
+def test_map_update(entries, updates):
+	t = YFastTrieMap(max_trie_entry_size)
+	t.update({entry: entry for entry in entries})
+	t.update((entry, -entry) for entry in updates)
+	expected = dict((entry, entry) for entry in entries)
+	expected.update((entry, -entry) for entry in updates)
+
+	assert list(t.items()) == sorted(expected.items())
+
+
+@given(valid_int_entries, valid_int_entries, valid_int_entries)
+def test_snapshot(entries, inserts, test_values):
+	t = YFastTrie(max_trie_entry_size)
+	t.update(entries)
+	s = t.snapshot()
+	entries.sort()
+
+	assert isinstance(s, YFastTrieSnapshot)
+
+	t.update(inserts)
+	t.remove_range(entries[len(entries) // 2], entries[-1])
+
+	for val in inserts[::2]:
+		if val in t:
+			t -= val
+
+	assert list(s) == entries
+	assert len(s) == len(entries)
+	assert (s.min, s.max) == (entries[0], entries[-1])
+
+	for val in test_values:
+		below = [e for e in entries if e <= val]
+		above = [e for e in entries if e >= val]
+
+		assert s.floor(val) == (max(below) if below else None)
+		assert s.ceiling(val) == (min(above) if above else None)
+		assert (s < val) == (max([e for e in entries if e < val], default=None))
+		assert (s > val) == (min([e for e in entries if e > val], default=None))
+		assert s.nearest(val) == min(entries, key=lambda e: abs(e - val))
+		assert (val in s) == (val in entries)
+
+	expected = set(entries) | set(inserts)
+	expected -= set(e for e in expected if entries[len(entries) // 2] <= e < entries[-1])
+	expected -= set(inserts[::2])
+
+	assert list(t) == sorted(expected)
+	assert len(t) == len(expected)
+
+
+def test_snapshot_empty():
+	s = YFastTrie(max_trie_entry_size).snapshot()
+
+	assert list(s) == []
+	assert len(s) == 0
+	assert 0 not in s
+
+	for method in (s.floor, s.ceiling, s.nearest, s.predecessor, s.successor):
+		with pytest.raises(ValueError):
+			method(0)
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), min_size=1, max_size=300))
+def test_multiset_snapshot(entries):
+	t = YFastTrie(max_trie_entry_size, multiset=True)
+	t.update(entries)
+	s = t.snapshot()
+	counts = Counter(entries)
+
+	for val in entries:
+		t -= val
+
+	assert len(t) == 0
+	assert list(s) == sorted(entries)
+
+	for (val, count) in counts.items():
+		assert s.count(val) == count
+
+
+@given(valid_int_entries)
+def test_map_snapshot(entries):
+	t = YFastTrieMap(max_trie_entry_size)
+	t.update((entry, entry) for entry in entries)
+	s = t.snapshot()
+
+	assert isinstance(s, YFastTrieMapSnapshot)
+
+	for entry in entries:
+		t[entry] = -entry
+
+	del t[entries[0]]
+
+	assert list(s.items()) == [(e, e) for e in sorted(entries)]
+	assert list(s.keys()) == sorted(entries)
+	assert list(s.values()) == sorted(entries)
+	assert s[entries[0]] == entries[0]
+	assert s.get(next(v for v in range(max_trie_value + 1) if v not in entries), "missing") == "missing"
+	assert t.get(entries[0]) is None
+	assert list(t.values()) == [-e for e in sorted(entries[1:])]
+
+	with pytest.raises(KeyError):
+		t[entries[0]]
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(16 * max_trie_entry_size), unique=True), valid_int_entries)
+def test_compact(entries, test_values):
+	t = YFastTrieMap(max_trie_entry_size)
+	t.update((entry, -entry) for entry in entries)
+	kept = sorted(entries[::5])
+
+	t.difference_update(entries[1::5] + entries[2::5] + entries[3::5] + entries[4::5])
+	subtrees = len(t._subtrees)
+	t.compact()
+
+	assert len(t._subtrees) <= subtrees
+	assert len(t._partitions) == len(t._subtrees)
+	assert list(t.items()) == [(e, -e) for e in kept]
+	assert (t.min, t.max) == (kept[0], kept[-1])
+
+	for (rep, tree) in t._subtrees.items():
+		assert rep in t._partitions
+		next_rep = t._partitions.successor(rep)
+		assert tree[-1] <= rep == (max_trie_value if next_rep is None else t._subtrees[next_rep.value][0] - 1)
+		assert len(tree) <= 2 * max_trie_entry_size
+		assert len(tree) >= max_trie_entry_size // 2 or len(t._subtrees) == 1
+		assert len(t._payloads[rep]) == len(tree)
+
+	for val in test_values:
+		assert (t < val) == max([e for e in kept if e < val], default=None)
+		assert (t > val) == min([e for e in kept if e > val], default=None)
+		assert t.rank(val) == len([e for e in kept if e < val])
+
+
+def test_compact_threshold():
+	with pytest.raises(ValueError):
+		YFastTrie(max_trie_entry_size, compact_threshold=1)
+
+	values = list(range(0, 200 * max_trie_entry_size, 3))
+	t = YFastTrie(max_trie_entry_size, compact_threshold=0.9)
+	t.update(values)
+	partitions = t._partitions
+
+	for val in values[::5] + values[1::5] + values[2::5] + values[3::5]:
+		t -= val
+
+		if len(t._subtrees) > 1:
+			assert len(t) >= 0.9 * t._target_subtree_size * len(t._subtrees)
+
+	assert t._partitions is not partitions
+	assert list(t) == values[4::5]
+
+
+def test_compact_fill():
+	values = list(range(0, 200 * max_trie_entry_size, 3))
+	t = YFastTrie(max_trie_entry_size)
+	t.build_parallel(values, workers=1)
+	subtrees = len(t._subtrees)
+
+	# Compacting a trie that isn't underfull never splits its subtrees up
+	t.compact()
+	assert len(t._subtrees) <= subtrees
+	assert list(t) == values
+
+	# Underfull ones are packed as close to the target size as that allows
+	t.difference_update(values[::4] + values[1::4] + values[2::4])
+	subtrees = len(t._subtrees)
+	t.compact()
+	assert len(t._subtrees) == min(subtrees, len(values[3::4]) // t._target_subtree_size)
+	assert all(t._target_subtree_size <= len(tree) <= t._max_subtree_size for tree in t._subtrees.values())
+	assert list(t) == values[3::4]
+
+
+@given(lists(integers(min_value=0, max_value=(4 * max_trie_entry_size)), min_size=1, max_size=300),
+	   integers(min_value=0, max_value=50))
+def test_pop(entries, count):
+	for multiset in (False, True):
+		t = YFastTrie(max_trie_entry_size, multiset=multiset)
+		t.update(entries)
+		values = sorted(entries) if multiset else sorted(set(entries))
+
+		assert t.pop_min_many(count) == values[:count]
+		del values[:count]
+
+		while values:
+			assert t.pop_max() == values.pop()
+
+			if values:
+				assert t.pop_min() == values.pop(0)
+
+			assert len(t) == len(values)
+			assert (t.min, t.max) == ((values[0], values[-1]) if values else (None, None))
+			assert list(t) == values
+
+		for method in (t.pop_min, t.pop_max):
+			with pytest.raises(ValueError):
+				method()
+
+		assert t.pop_min_many(count) == []
+
+
+@given(valid_int_entries, lists(valid_int_entry, min_size=1, max_size=50))
+def test_replace(entries, targets):
+	t = YFastTrieMap(max_trie_entry_size)
+	t.update((entry, -entry) for entry in entries)
+	expected = dict((entry, -entry) for entry in entries)
+
+	for (old, new) in zip(sorted(entries), targets):
+		t.replace(old, new)
+		expected[new] = expected.pop(old)
+
+		assert list(t.items()) == sorted(expected.items())
+		assert (t.min, t.max) == (min(expected), max(expected))
+		assert [t.rank(key) for key in sorted(expected)] == list(range(len(expected)))
+
+	with pytest.raises(ValueError):
+		t.replace(next(v for v in range(max_trie_value + 1) if v not in expected), 0)
+
+
+@given(lists(valid_int_entry, min_size=1, max_size=(16 * max_trie_entry_size), unique=True), valid_int_entries)
+def test_adaptive(entries, test_values):
+	t = YFastTrieMap(max_trie_entry_size, adaptive=True)
+	initial_length = min(max_trie_entry_size, ADAPTIVE_INITIAL_LENGTH)
+	half = len(entries) // 2
+
+	assert t._maxlen == t._partitions._maxlen == initial_length
+
+	for entry in entries[:half]:
+		t[entry] = -entry
+
+	snapshot = t.snapshot()
+
+	for entry in entries[half:]:
+		t[entry] = -entry
+		assert max(entry.bit_length(), initial_length) <= t._maxlen == t._partitions._maxlen
+
+	assert list(t.items()) == sorted((e, -e) for e in entries)
+	assert list(snapshot) == sorted(entries[:half])
+
+	for (rep, tree) in t._subtrees.items():
+		next_rep = t._partitions.successor(rep)
+		assert tree[-1] <= rep == (2 ** t._maxlen - 1 if next_rep is None else t._subtrees[next_rep.value][0] - 1)
+		assert len(tree) <= 2 * t._maxlen
+
+	for val in test_values:
+		assert t.rank(val) == len([e for e in entries if e < val])
+		assert t.successor(val) == min([e for e in entries if e > val], default=None)
+
+	with pytest.raises(ValueError):
+		t[max_trie_value + 1] = None
+
+	t.clear()
+	assert t._maxlen == t._partitions._maxlen == initial_length
+
+
+@given(lists(integers(min_value=0, max_value=2 ** ADAPTIVE_INITIAL_LENGTH - 1), min_size=1),
+	   lists(integers(min_value=2 ** ADAPTIVE_INITIAL_LENGTH, max_value=max_trie_value), min_size=1))
+def test_adaptive_queries(entries, wide_values):
+	t = YFastTrie(max_trie_entry_size, adaptive=True, prefilter_rate=0.01)
+	t.update(entries)
+	length = t._maxlen
+	subtrees = dict(t._subtrees)
+
+	# Queries for values too big for the trie's length neither widen nor rebuild it
+	for val in wide_values:
+		assert val not in t
+		assert t.count(val) == 0
+		assert t.rank(val) == len(set(entries))
+		assert t.predecessor(val) == t.floor(val) == t.nearest(val) == max(entries)
+		assert t.successor(val) is t.ceiling(val) is None
+		assert t.truncate_above(val) == 0
+
+		with pytest.raises(ValueError):
+			t.remove(val)
+
+	assert t.contains_many(wide_values) == [False] * len(wide_values)
+
+	# Nor do changes that fail validation or only remove them
+	with pytest.raises(ValueError):
+		t.apply_batch(inserts=wide_values, removes=[-1])
+
+	with pytest.raises(ValueError):
+		t.replace(wide_values[0], wide_values[-1])
+
+	t.apply_batch(removes=wide_values)
+	assert t._maxlen == t._partitions._maxlen == length
+	assert all(t._subtrees[rep] is tree for (rep, tree) in subtrees.items())
+
+	t.replace(max(entries), wide_values[0])
+	assert t._maxlen >= wide_values[0].bit_length()
+	assert list(t) == sorted((set(entries) - {max(entries)}) | {wide_values[0]})
+
+
+@given(lists(valid_int_entry, min_size=(4 * max_trie_entry_size), max_size=(16 * max_trie_entry_size), unique=True),
+	   valid_int_entries,
+	   integers(min_value=1, max_value=8))
+def test_freeze(entries, test_values, freeze_after):
+	t = YFastTrie(max_trie_entry_size, multiset=True, freeze_after=freeze_after, hot_subtrees=2)
+	expected = sorted(entries)
+
+	for entry in entries:
+		t += entry
+
+	snapshot = t.snapshot()
+
+	for val in test_values:
+		assert t.predecessor(val) == max([e for e in expected if e < val], default=None)
+		assert t.successor(val) == min([e for e in expected if e > val], default=None)
+		assert t.rank(val) == len([e for e in expected if e < val])
+		assert t.count(val) == expected.count(val)
+
+		# Modifying a frozen subtree thaws it first
+		if val in t:
+			t.remove(val)
+			expected.remove(val)
+		else:
+			t.insert(val)
+			expected = sorted(expected + [val])
+
+	assert len(t._decoded) <= 2
+	assert list(t) == expected
+	assert t[:] == expected
+	assert list(snapshot) == sorted(entries)
+
+	for (rep, tree) in t._subtrees.items():
+		if isinstance(tree, FrozenContainer):
+			assert rep not in t._warm
+
+
+def test_freeze_cold_subtrees():
+	with pytest.raises(ValueError):
+		YFastTrie(max_trie_entry_size, freeze_after=0)
+
+	with pytest.raises(ValueError):
+		YFastTrie(max_trie_entry_size, hot_subtrees=-1)
+
+	# Sparse values are frozen once they go a whole interval without being modified
+	t = YFastTrieMap(max_trie_entry_size, freeze_after=10)
+	entries = list(range(0, max_trie_value, max_trie_value // (8 * max_trie_entry_size)))
+	t.update((entry, -entry) for entry in entries)
+
+	for _ in range(19):
+		t[entries[-1]] = -entries[-1]
+
+	frozen = [rep for (rep, tree) in t._subtrees.items() if isinstance(tree, FrozenContainer)]
+
+	assert len(frozen) == len(t._subtrees) - 1
+	assert t.pred_item(entries[1]) == (entries[0], 0)
+	assert t.succ_item(entries[0]) == (entries[1], -entries[1])
+	assert len(t._decoded) == 1
+
+	del t[entries[0]]
+	assert not isinstance(t._subtrees[frozen[0]], FrozenContainer)
+	assert list(t.items())[:2] == [(entries[1], -entries[1]), (entries[2], -entries[2])]
+
+	# Dense values are already smaller than they would be frozen
+	t = YFastTrie(max_trie_entry_size, freeze_after=1)
+	t.update(range(8 * max_trie_entry_size))
+	t.insert(max_trie_value)
+	t.insert(max_trie_value - 1)
+
+	assert not any(isinstance(tree, FrozenContainer) for tree in t._subtrees.values())
+
+
+@settings(deadline=None)
+@given(lists(valid_int_entry, min_size=(8 * max_trie_entry_size), max_size=(16 * max_trie_entry_size), unique=True))
+def test_compact_frozen(entries):
+	t = YFastTrie(max_trie_entry_size, freeze_after=5)
+
+	for entry in entries:
+		t += entry
+
+	def thawed():
+		return [tree for tree in t._subtrees.values()
+				if not isinstance(tree, FrozenContainer) and FrozenContainer(tree)._size() < tree._size()]
+
+	# Compaction only leaves subtrees holding values from thawed ones thawed,
+	# and starts counting towards the next freeze afresh
+	thawed_values = set(chain.from_iterable(tree for tree in t._subtrees.values()
+											 if not isinstance(tree, FrozenContainer)))
+	t.compact()
+
+	assert t._warm == set()
+	assert t._until_freeze == 5
+	assert all(any(value in thawed_values for value in tree) for tree in thawed())
+	assert list(t) == sorted(entries)
+
+	# So the next freeze comes no sooner than usual
+	thawed_count = len(thawed())
+	t += entries[0]
+	t += entries[1]
+	assert t._until_freeze == 3
+	assert len(thawed()) >= thawed_count
+
+
+@settings(deadline=None)
+@given(valid_int_entries, lists(valid_int_entry, min_size=1, max_size=20), integers(min_value=1, max_value=20))
+def test_result_cache(entries, probes, cache_size):
+	def check(t, expected):
+		for val in probes:
+			assert (val in t) == (val in expected)
+
+			if not expected:
+				continue
+
+			below = [e for e in sorted(expected) if e < val]
+			above = [e for e in sorted(expected) if e > val]
+
+			assert t.predecessor(val) == (below[-1] if below else None)
+			assert t.successor(val) == (above[0] if above else None)
+
+	for ranged in (False, True):
+		t = YFastTrie(max_trie_entry_size, cache_size=cache_size, range_invalidation=ranged)
+		t.update(entries)
+		expected = set(entries)
+
+		# Every change to the trie is seen by results cached before it
+		for val in probes:
+			check(t, expected)
+
+			if val in expected:
+				t.remove(val)
+				expected.remove(val)
+			else:
+				t.insert(val)
+				expected.add(val)
+
+			check(t, expected)
+			assert len(t._cache) <= cache_size
+
+		if expected:
+			old = min(expected)
+			new = probes[0]
+
+			if new not in expected:
+				t.replace(old, new)
+				expected.remove(old)
+				expected.add(new)
+				check(t, expected)
+
+			expected.remove(t.pop_max())
+			check(t, expected)
+
+		low, high = sorted([probes[0], probes[-1]])
+		t.remove_range(low, high)
+		expected = {e for e in expected if not low <= e < high}
+		check(t, expected)
+
+		t.update(probes)
+		expected.update(probes)
+		check(t, expected)
+
+		t.pop_min_many(len(probes))
+		expected = set(sorted(expected)[len(probes):])
+		check(t, expected)
+
+
+def test_result_cache_hits():
+	with pytest.raises(ValueError):
+		YFastTrie(max_trie_entry_size, cache_size=-1)
+
+	t = YFastTrie(max_trie_entry_size, cache_size=4, range_invalidation=True)
+	t.update([10, 20, 30, 40])
+	conversions = []
+
+	def to_key(value, original=t._to_key):
+		conversions.append(value)
+		return original(value)
+
+	t._to_key = to_key
+
+	# Hits skip converting the value as well as the search
+	for _ in range(3):
+		assert t.predecessor(25) == 20
+		assert t.successor(5) == 10
+		assert 40 in t
+
+	assert conversions == [25, 5, 40]
+
+	# A change only drops the results for values between its neighbors
+	t.insert(22)
+	assert len(t._cache) == 2
+	assert t.predecessor(25) == 22
+	assert conversions == [25, 5, 40, 22, 25]
+
+	# Neither a value already in the trie nor an empty batch changes any result
+	epoch = t._cache.epoch
+	t.insert(22)
+	t.apply_batch([], [])
+	assert len(t._cache) == 3
+	assert t._cache.epoch == epoch
+
+	t.replace(10, 45)
+	assert len(t._cache) == 1
+	assert t.successor(5) == 20
+	assert 40 in t
+	assert t.predecessor(25) == 22
+	assert conversions[-2:] == [5, 40]
+
+	t.clear()
+	assert len(t._cache) == 0
+	assert 40 not in t
+
+	m = YFastTrieMap(max_trie_entry_size, cache_size=8)
+	m[1] = "a"
+	m[3] = "b"
+	assert m.predecessor(3) == 1
+
+	del m[1]
+	assert m.predecessor(3) is None
+	assert m._cache.epoch > 0
+
+
+@settings(deadline=None)
+@given(lists(valid_int_entry, max_size=(16 * max_trie_entry_size), unique=True),
+	   lists(valid_int_entry, min_size=1, max_size=100))
+def test_prefilter(entries, probes):
+	t = YFastTrie(max_trie_entry_size, prefilter_rate=0.01)
+	t.update(entries)
+	expected = set(entries)
+	probes = probes + entries[:50]
+
+	# The prefilter never turns away a value in the trie, however it got there
+	for (index, probe) in enumerate(probes):
+		if index % 3 == 0:
+			t.insert(probe)
+			expected.add(probe)
+		elif index % 3 == 1 and probe in expected:
+			t.remove(probe)
+			expected.remove(probe)
+
+		assert (probe in t) == (probe in expected)
+
+	assert t.contains_many(probes) == [probe in expected for probe in probes]
+
+	t.compact()
+	assert len(t._prefilter) <= len(expected)
+	assert t.contains_many(probes) == [probe in expected for probe in probes]
+
+	t.build_parallel(entries, workers=1)
+	assert all(entry in t for entry in entries)
+
+
+def test_prefilter_fill():
+	with pytest.raises(ValueError):
+		YFastTrie(max_trie_entry_size, prefilter_rate=1)
+
+	# A prefilter that fills up is replaced by a larger one holding every value
+	t = YFastTrieMap(max_trie_entry_size, prefilter_rate=0.05)
+	entries = list(range(0, max_trie_value, max_trie_value // 3000))
+
+	for entry in entries:
+		t[entry] = entry
+
+	assert t._prefilter.capacity >= len(entries)
+	assert all(entry in t for entry in entries)
+	assert sum(entry + 1 in t._prefilter for entry in entries) < 0.1 * len(entries)
+
+	t.clear()
+	assert len(t._prefilter) == 0
+	assert entries[0] not in t
+
+
+def test_prefilter_array_input():
+	numpy = pytest.importorskip("numpy")
+	t = YFastTrie(max_trie_entry_size, prefilter_rate=0.01)
+	entries = list(range(0, max_trie_value, max_trie_value // 500))
+	t.update(entries)
+
+	probes = entries[::3] + [entry + 1 for entry in entries[::3]]
+	expected = [probe in entries for probe in probes]
+
+	assert t.contains_many(numpy.array(probes, dtype=numpy.uint64)) == expected
+	assert t.contains_many(numpy.array(probes, dtype=numpy.int64)) == expected
+	assert YFastTrie(max_trie_entry_size).contains_many(numpy.array(probes)) == [False] * len(probes)
+
+	with pytest.raises(ValueError):
+		t.contains_many(numpy.array([-1]))
+
+
+@given(lists(valid_binary_entry, min_size=1, max_size=100, unique=True), lists(valid_binary_entry, min_size=1, max_size=50))
+def test_prefilter_byte_input(entries, probes):
+	numpy = pytest.importorskip("numpy")
+	t = YFastTrie(max_trie_entry_size, prefilter_rate=0.01)
+	t.update(entries)
+
+	stored = set(to_int(entry) for entry in entries)
+	probes = entries[::2] + probes
+	expected = [to_int(probe) in stored for probe in probes]
+
+	# Byte strings are converted before the prefilter sees them, whether listed or in an array
+	assert t.contains_many(probes) == expected
+	assert t.contains_many(numpy.array(probes, dtype=object)) == expected
+
+
 class YFastStateMachine(RuleBasedStateMachine):
 	def __init__(self):
 		super(YFastStateMachine, self).__init__()
 		self.t = YFastTrie(max_trie_entry_size)
+		self.snapshots = []
 
 	def teardown(self):
 		values = list(chain.from_iterable(self.t._subtrees.values()))
@@ -253,7 +1197,7 @@ class YFastStateMachine(RuleBasedStateMachine):
 			assert self.t.min == self.t.max
 		else:
 			for value in chain.from_iterable(self.t._subtrees.values()):
-				assert value is self.t.min or self.t.min < value
+				assert value == self.t.min or self.t.min < value
 
 	@invariant()
 	def valid_max(self):
@@ -263,7 +1207,7 @@ class YFastStateMachine(RuleBasedStateMachine):
 			assert self.t.max == self.t.min
 		else:
 			for value in chain.from_iterable(self.t._subtrees.values()):
-				assert value is self.t.min or self.t.min < value
+				assert value == self.t.min or self.t.min < value
 
 	@invariant()
 	def valid_representatives(self):
@@ -272,26 +1216,75 @@ class YFastStateMachine(RuleBasedStateMachine):
 			pred = rep.pred
 			succ = rep.succ
 
-			max(self.t._subtrees[rep.value]) <= rep.value
+			assert self.t._subtrees[rep.value][-1] <= rep.value
 
 			if pred is not None:
-				max(self.t._subtrees[pred.value]) < min(self.t._subtrees[rep.value])
+				assert pred.value < self.t._subtrees[rep.value][0]
 
-			if succ is not None:
-				min(self.t._subtrees[succ.value]) > max(self.t._subtrees[rep.value])
+			if succ is None:
+				assert rep.value == max_trie_value
 
 			rep = rep.succ
 
+	@invariant()
+	def unchanged_snapshots(self):
+		for (snapshot, values) in self.snapshots:
+			assert list(snapshot) == values
+
 	@invariant()
 	def valid_subtree_values(self):
 		for rep in self.t._subtrees.keys():
 			assert rep in self.t._partitions
-			assert YFastTrie._calculate_representative(rep, max_trie_entry_size) == rep
+			assert 0 < len(self.t._subtrees[rep]) <= 2 * max_trie_entry_size
+
+	@rule(inserts=lists(valid_int_entry, max_size=50), removes=lists(valid_int_entry, max_size=50))
+	def apply_batch(self, inserts, removes):
+		expected = (set(self.t) - set(removes)) | set(inserts)
+		self.t.apply_batch(inserts=inserts, removes=removes)
+		assert list(self.t) == sorted(expected)
 
 	@rule(val=valid_trie_entry)
 	def insert_value(self, val):
 		self.t += val
 
+	@rule(low=valid_int_entry, high=valid_int_entry)
+	def remove_range(self, low, high):
+		expected = len([v for v in self.t if low <= v < high])
+		assert self.t.remove_range(low, high) == expected
+		assert not [v for v in self.t if low <= v < high]
+
+	@rule()
+	def compact(self):
+		values = list(self.t)
+		self.t.compact()
+		assert list(self.t) == values
+
+	@rule()
+	def pop_edges(self):
+		if len(self.t) == 0:
+			with pytest.raises(ValueError):
+				self.t.pop_min()
+		else:
+			values = list(self.t)
+			assert self.t.pop_min() == values[0]
+
+			if len(values) > 1:
+				assert self.t.pop_max() == values[-1]
+
+	@rule(old=valid_int_entry, new=valid_int_entry)
+	def replace_value(self, old, new):
+		values = set(self.t)
+
+		if old in values:
+			self.t.replace(old, new)
+			values.remove(old)
+			values.add(new)
+			assert list(self.t) == sorted(values)
+
+	@rule()
+	def take_snapshot(self):
+		self.snapshots.append((self.t.snapshot(), list(self.t)))
+
 	@rule(val=valid_trie_entry)
 	def remove_value(self, val):
 		if val not in self.t: